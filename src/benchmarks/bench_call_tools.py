@@ -0,0 +1,123 @@
+"""
+Benchmark: pipelined call_tools batches vs. sequential session.call_tool.
+
+Starts the local mcp_server_sse server in a subprocess (or uses the SSE URL given), opens one
+session and makes the same calls one at a time and then through mcp_client.tool_batch.call_tools
+with several in-flight windows, reporting wall time and calls per second. Two tools are called:
+the built-in echo_tool, whose cost is mostly the transport's, and a tool that waits SLEEP_MS
+(registered through /dynamic/add_tool), standing in for tools that wait on I/O.
+
+Run from the src directory (with PYTHONPATH=src, as in the VS Code launch configs):
+    python benchmarks/bench_call_tools.py [calls] [sse_url]
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from mcp_client.tool_batch import call_tools
+
+WINDOWS = (4, 16, 64)
+SLEEP_MS = 20
+SLEEP_TOOL = {
+    "name": "bench_sleep",
+    "description": "Wait `ms` milliseconds.",
+    # `tag` only makes the calls distinct, so a server that shares identical calls cannot skew the numbers.
+    "code": "import asyncio\n\nasync def bench_sleep(ms: int, tag: int = 0) -> str:\n    await asyncio.sleep(ms / 1000)\n    return 'ok'\n",
+}
+SERVER_CODE = (
+    "import sys\n"
+    "from mcp_server import create_server\n"
+    "create_server({'host': '127.0.0.1', 'port': int(sys.argv[1]), 'log_level': 'WARNING'}, tools=None).run(transport='sse')\n"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=src_dir)
+    process = subprocess.Popen([sys.executable, "-c", SERVER_CODE, str(port)], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}.")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise TimeoutError("Server did not start within 30 seconds.")
+
+
+def report(label: str, calls: int, failed: int, elapsed: float) -> None:
+    print(f"{label:<12} calls={calls:<6} total={elapsed * 1000:8.1f} ms  "
+          f"per_call={elapsed / calls * 1000:6.2f} ms  calls/s={calls / elapsed:8.1f}  failed={failed}")
+
+
+async def compare(session: ClientSession, batch) -> None:
+    # Warm-up: the first call pays for lazy imports and tool wrapping on the server.
+    await session.call_tool(*batch[0])
+
+    start = time.perf_counter()
+    failed = 0
+    for name, arguments in batch:
+        try:
+            result = await session.call_tool(name, arguments)
+            failed += result.isError
+        except Exception:
+            failed += 1
+    report("sequential", len(batch), failed, time.perf_counter() - start)
+
+    for window in WINDOWS:
+        start = time.perf_counter()
+        outcomes = await call_tools(session, batch, window=window)
+        report(f"window={window}", len(batch), sum(not outcome.ok for outcome in outcomes),
+               time.perf_counter() - start)
+
+
+async def run(url: str, calls: int) -> None:
+    async with httpx.AsyncClient() as client:
+        response = await client.post(url.rsplit("/", 1)[0] + "/dynamic/add_tool", json=SLEEP_TOOL)
+        response.raise_for_status()
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            print("echo_tool")
+            await compare(session, [("echo_tool", {"message": f"message {i}"}) for i in range(calls)])
+            print(f"bench_sleep ({SLEEP_MS} ms)")
+            await compare(session, [("bench_sleep", {"ms": SLEEP_MS, "tag": i}) for i in range(calls)])
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    url = sys.argv[2] if len(sys.argv) > 2 else None
+    process = None
+    if url is None:
+        port = free_port()
+        process = start_server(port)
+        url = f"http://127.0.0.1:{port}/sse"
+    try:
+        asyncio.run(run(url, calls))
+    finally:
+        if process is not None:
+            # The server's SSE streams keep uvicorn from shutting down gracefully.
+            process.kill()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
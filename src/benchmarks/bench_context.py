@@ -0,0 +1,83 @@
+"""
+Benchmark: per-call cost of ExtendedMCP.create_context before and after SessionState.
+
+The legacy version copies the request headers and query parameters into new dicts and sets
+several attributes on the session on every call; the current one reuses the SessionState built
+once per session. Both run against the same Starlette request with a realistic header set.
+
+Run from the src directory (with PYTHONPATH=src, as in the VS Code launch configs):
+    python benchmarks/bench_context.py [calls]
+"""
+
+import asyncio
+import sys
+import time
+import tracemalloc
+import uuid
+from types import SimpleNamespace
+
+from mcp.server.lowlevel.server import request_ctx
+from mcp.shared.context import RequestContext
+from starlette.requests import Request
+
+from mcp_server.mcp_extension import ExtendedMCP
+
+
+def make_request() -> Request:
+    headers = [(b"x-session-id", b"bench-session"), (b"x-custom-variable", b"value")]
+    headers += [(f"x-header-{i}".encode(), f"value-{i}".encode()) for i in range(20)]
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/sse",
+        "headers": headers,
+        "query_string": b"client=bench&trace=1",
+    }
+    return Request(scope)
+
+
+async def legacy_create_context(server: ExtendedMCP, request: Request):
+    """The pre-SessionState create_context body."""
+    context = server.get_context()
+    session_context = context.request_context.session
+    if request.headers:
+        session_context.headers = dict(request.headers)
+    session_id = session_context.headers.get("x-session-id")
+    if not session_id:
+        session_id = str(uuid.uuid4())
+        session_context.headers["x-session-id"] = session_id
+    session_context.session_id = session_id
+    if hasattr(request, "query_params"):
+        session_context.query_params = dict(request.query_params)
+    custom_value = session_context.headers.get("x-custom-variable")
+    if custom_value:
+        session_context.custom_variable = custom_value
+    return context
+
+
+async def measure(label: str, create, server: ExtendedMCP, request: Request, calls: int) -> None:
+    session = SimpleNamespace()
+    token = request_ctx.set(RequestContext(request_id=1, meta=None, session=session, lifespan_context=None))  # type: ignore[arg-type]
+    try:
+        await create(server, request)  # warm-up: builds the session state once
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(calls):
+            await create(server, request)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        request_ctx.reset(token)
+    print(f"{label:>8}: {elapsed / calls * 1e6:7.2f} us/call, peak traced memory {peak / 1024:8.1f} KiB")
+
+
+async def main(calls: int) -> None:
+    server = ExtendedMCP("bench", load_persisted_tools=False, tool_code_cache_dir=None)
+    request = make_request()
+    await measure("legacy", legacy_create_context, server, request, calls)
+    await measure("state", ExtendedMCP.create_context, server, request, calls)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
@@ -0,0 +1,107 @@
+"""
+Benchmark: per-call environment overlay vs. the old os.environ-mutating tool wrapper.
+
+Runs many concurrent tool calls from different (fake) sessions through both wrappers and reports
+the wall time per call and how many calls observed another session's value.
+
+Run from the src directory (with PYTHONPATH=src, as in the VS Code launch configs):
+    python benchmarks/bench_env_overlay.py [sessions] [calls_per_session]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from mcp.server.lowlevel.server import request_ctx
+from mcp.shared.context import RequestContext
+
+from mcp_server.env_overlay import get_env
+from mcp_server.mcp_extension import ExtendedMCP
+
+ENV_KEY = "BENCH_SESSION_KEY"
+
+
+def legacy_wrap(fn):
+    """The pre-overlay wrapper: writes env_config into os.environ around the call."""
+    async def async_wrapper(*args, **kwargs):
+        context = kwargs.pop("context")
+        old_env = {}
+        env_config = context.session.config.get("env_config", {})
+        for key, value in env_config.items():
+            if key in os.environ:
+                old_env[key] = os.environ[key]
+            os.environ[key] = str(value)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            for key in env_config.keys():
+                if key in old_env:
+                    os.environ[key] = old_env[key]
+                else:
+                    os.environ.pop(key, None)
+    return async_wrapper
+
+
+async def legacy_tool(expected: str) -> bool:
+    first = os.environ.get(ENV_KEY)
+    await asyncio.sleep(0)
+    return first == expected and os.environ.get(ENV_KEY) == expected
+
+
+async def overlay_tool(expected: str) -> bool:
+    first = get_env(ENV_KEY)
+    await asyncio.sleep(0)
+    return first == expected and get_env(ENV_KEY) == expected
+
+
+def make_sessions(count: int):
+    return [
+        SimpleNamespace(config={"env_config": {ENV_KEY: f"session-{i}"}}, client_params=None)
+        for i in range(count)
+    ]
+
+
+async def run_legacy(sessions, calls: int):
+    wrapped = legacy_wrap(legacy_tool)
+
+    async def call(session, i):
+        context = SimpleNamespace(session=session)
+        return await wrapped(session.config["env_config"][ENV_KEY], context=context)
+
+    return await asyncio.gather(*(call(s, i) for s in sessions for i in range(calls)))
+
+
+async def run_overlay(sessions, calls: int):
+    server = ExtendedMCP(name="bench")
+    wrapped = server.wrap_tool_function(overlay_tool)
+
+    async def call(session, i):
+        # The lowlevel server sets this contextvar for every request it dispatches.
+        request_ctx.set(RequestContext(i, None, session, None))  # type: ignore
+        return await wrapped(session.config["env_config"][ENV_KEY])
+
+    return await asyncio.gather(*(call(s, i) for s in sessions for i in range(calls)))
+
+
+def report(label: str, results, elapsed: float):
+    total = len(results)
+    wrong = total - sum(results)
+    print(f"{label:<10} calls={total:<7} total={elapsed * 1000:8.1f} ms  "
+          f"per_call={elapsed / total * 1e6:6.2f} us  cross_session_reads={wrong}")
+
+
+def main():
+    sessions_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    sessions = make_sessions(sessions_count)
+
+    for label, runner in (("legacy", run_legacy), ("overlay", run_overlay)):
+        start = time.perf_counter()
+        results = asyncio.run(runner(sessions, calls))
+        report(label, results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
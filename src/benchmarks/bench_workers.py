@@ -0,0 +1,120 @@
+"""
+Benchmark: tool call throughput of one server process vs. N worker processes.
+
+Serves the server through mcp_server.workers.serve_workers in a subprocess, first with one worker
+and then with each worker count given, and runs the same load against each: `clients` concurrent
+SSE sessions, each making `calls` calls of a CPU-bound tool (bench_spin, which runs inline on the
+worker's event loop, as sync tools do by default). One process runs the calls of every session on
+one core; the workers spread the sessions over the cores.
+
+Run from the src directory (with PYTHONPATH=src, as in the VS Code launch configs):
+    python benchmarks/bench_workers.py [clients] [calls] [workers ...]
+"""
+
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+SPIN_N = 200_000
+SERVER_CODE = (
+    "import sys\n"
+    "from mcp_server.workers import serve_workers\n"
+    "serve_workers('benchmarks.bench_workers:build_server', workers=int(sys.argv[1]), host='127.0.0.1',\n"
+    "              port=int(sys.argv[2]), shared_state=sys.argv[3], log_level='WARNING')\n"
+)
+
+
+def bench_spin(n: int, tag: int = 0) -> int:
+    """Sum the squares below `n`: pure Python work that holds the GIL."""
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+def build_server():
+    """Worker factory: the default server without the tools package, plus bench_spin."""
+    from mcp_server import create_server
+
+    server = create_server({"log_level": "WARNING", "tool_code_cache_dir": None}, tools=None)
+    server.add_tool(bench_spin)
+    return server
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, shared_state: str) -> subprocess.Popen:
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=src_dir)
+    process = subprocess.Popen([sys.executable, "-c", SERVER_CODE, str(workers), str(port), shared_state],
+                               cwd=shared_state, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}.")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise TimeoutError("Server did not start within 60 seconds.")
+
+
+async def client(url: str, index: int, calls: int) -> int:
+    failed = 0
+    # Distinct session ids spread the sessions over the workers.
+    async with sse_client(url, headers={"x-session-id": f"bench-{index}"}) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for i in range(calls):
+                # Distinct arguments, so no call is served by another's result.
+                result = await session.call_tool("bench_spin", {"n": SPIN_N, "tag": index * calls + i})
+                failed += result.isError
+    return failed
+
+
+async def load(url: str, clients: int, calls: int):
+    start = time.perf_counter()
+    failed = await asyncio.gather(*(client(url, index, calls) for index in range(clients)))
+    return time.perf_counter() - start, sum(failed)
+
+
+def measure(workers: int, clients: int, calls: int) -> None:
+    port = free_port()
+    shared_state = tempfile.mkdtemp(prefix="bench-workers-")
+    process = start_server(workers, port, shared_state)
+    try:
+        elapsed, failed = asyncio.run(load(f"http://127.0.0.1:{port}/sse", clients, calls))
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(shared_state, ignore_errors=True)
+    total = clients * calls
+    print(f"workers={workers:<3} clients={clients:<4} calls={total:<6} total={elapsed * 1000:9.1f} ms  "
+          f"calls/s={total / elapsed:8.1f}  failed={failed}")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    counts = [int(arg) for arg in sys.argv[3:]] or [os.cpu_count() or 2]
+    for workers in [1] + [count for count in counts if count != 1]:
+        measure(workers, clients, calls)
+
+
+if __name__ == "__main__":
+    main()
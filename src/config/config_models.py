@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 class SSEConnection(BaseModel):
     url: str = Field(
@@ -20,6 +20,26 @@ class SSEConnection(BaseModel):
     )
     
 
+class ServerConnection(BaseModel):
+    """One server of an aggregating client (mcp_client.aggregator.MCPAggregator)."""
+    name: str = Field(
+        ...,
+        description="Namespace of the server's tools. Tools are exposed as '<name><separator><tool>', so it should only use letters, digits, '_' and '-'."
+    )
+    transport: Literal["sse", "stdio"] = Field(
+        default="sse",
+        description="The transport used to reach the server."
+    )
+    connection_params: Any = Field(
+        ...,
+        description="An SSEConnection for 'sse', or mcp's StdioServerParameters for 'stdio'."
+    )
+    context: Optional[dict[str, Any]] = Field(
+        default=None,
+        description="Optional session context (env_config) sent to the server with the handshake. It must be JSON serializable."
+    )
+
+
 class ClientSessionConfig(BaseModel):
     read_timeout_seconds: Optional[float] = Field(
          default=None,
@@ -4,6 +4,7 @@ from contextlib import AsyncExitStack
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp_client.tool_catalogue import ToolCatalogue
 
 from anthropic import Anthropic
 from dotenv import load_dotenv
@@ -15,6 +16,8 @@ class MCPClient:
         # Initialize session and client objects
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
+        # Tools are listed once and re-listed only after the server reports a change.
+        self.tool_catalogue = ToolCatalogue()
         self.anthropic = Anthropic()
     # methods will go here
     
@@ -38,13 +41,13 @@ class MCPClient:
 
         stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
         self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
+        self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write,
+                                                                                   message_handler=self.tool_catalogue.handle_message))
 
         await self.session.initialize()
 
         # List available tools
-        response = await self.session.list_tools()
-        tools = response.tools
+        tools = await self.tool_catalogue.list_tools(self.session)
         print("\nConnected to server with tools:", [tool.name for tool in tools])
         
     async def process_query(self, query: str) -> str:
@@ -56,12 +59,7 @@ class MCPClient:
             }
         ]
 
-        response = await self.session.list_tools()
-        available_tools = [{
-            "name": tool.name,
-            "description": tool.description,
-            "input_schema": tool.inputSchema
-        } for tool in response.tools]
+        available_tools = await self.tool_catalogue.anthropic_tools(self.session)
 
         # Initial Claude API call
         response = self.anthropic.messages.create(
@@ -1,10 +1,10 @@
 from typing import Any
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp_server.mcp_extension import ExtendedMCP
 
 
-# Initialize FastMCP server
-mcp = FastMCP("weather")
+# Initialize the server; ExtendedMCP for its result cache, since NWS data changes slowly.
+mcp = ExtendedMCP("weather", load_persisted_tools=False)
 
 # Constants
 NWS_API_BASE = "https://api.weather.gov"
@@ -34,7 +34,7 @@ Severity: {props.get('severity', 'Unknown')}
 Description: {props.get('description', 'No description available')}
 Instructions: {props.get('instruction', 'No specific instructions provided')}
 """
-@mcp.tool()
+@mcp.tool(cache={"ttl": 60}, coalesce=True)
 async def get_alerts(state: str) -> str:
     """Get weather alerts for a US state.
 
@@ -45,7 +45,8 @@ async def get_alerts(state: str) -> str:
     data = await make_nws_request(url)
 
     if not data or "features" not in data:
-        return "Unable to fetch alerts or no alerts found."
+        # Raised rather than returned, so a failed fetch is not cached.
+        raise RuntimeError("Unable to fetch alerts or no alerts found.")
 
     if not data["features"]:
         return "No active alerts for this state."
@@ -53,7 +54,7 @@ async def get_alerts(state: str) -> str:
     alerts = [format_alert(feature) for feature in data["features"]]
     return "\n---\n".join(alerts)
 
-@mcp.tool()
+@mcp.tool(cache={"ttl": 300}, coalesce=True)
 async def get_forecast(latitude: float, longitude: float) -> str:
     """Get weather forecast for a location.
 
@@ -66,14 +67,14 @@ async def get_forecast(latitude: float, longitude: float) -> str:
     points_data = await make_nws_request(points_url)
 
     if not points_data:
-        return "Unable to fetch forecast data for this location."
+        raise RuntimeError("Unable to fetch forecast data for this location.")
 
     # Get the forecast URL from the points response
     forecast_url = points_data["properties"]["forecast"]
     forecast_data = await make_nws_request(forecast_url)
 
     if not forecast_data:
-        return "Unable to fetch detailed forecast."
+        raise RuntimeError("Unable to fetch detailed forecast.")
 
     # Format the periods into a readable forecast
     periods = forecast_data["properties"]["periods"]
@@ -0,0 +1,257 @@
+"""
+One client over the tools of many MCP servers.
+
+MCPAggregator connects to every configured server in parallel, over SSE or stdio, and merges
+their tool catalogues under namespaces: tool `search` of server `docs` is exposed as
+`docs__search` (the separator is configurable; `__` keeps the names valid for the Anthropic
+and OpenAI tool name patterns; server names may not contain it, so that no two servers can
+produce the same namespaced name). call_tool routes a namespaced name through a routing table,
+built when a catalogue changes rather than per call.
+
+    servers = [
+        ServerConnection(name="docs", transport="sse", connection_params=SSEConnection(...)),
+        ServerConnection(name="local", transport="stdio", connection_params=StdioServerParameters(...)),
+    ]
+    async with MCPAggregator(servers, session_params) as aggregator:
+        tools = await aggregator.anthropic_tools()
+        result = await aggregator.call_tool("docs__search", {"query": "..."})
+
+A slow or dead server does not hold up the others:
+
+    - connect() waits at most `connect_timeout` seconds. Servers still connecting keep doing so in
+      the background and their tools are added to the routing table when they are ready; servers
+      that fail are reported by status() and left out.
+    - When a server's catalogue is invalidated (tools/list_changed), lookups re-list it, waiting
+      at most `list_timeout` seconds before using the tools they already have.
+    - A server whose connection drops (NaviClientSession.connection_lost) is marked failed and
+      its tools are removed; calls of its tools are rejected at once with a "not connected" error.
+
+Each session is opened and closed by a task of its own, as in mcp_client.session_pool.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional, Sequence, Tuple
+
+import mcp.types as types
+
+from config import ClientSessionConfig, ServerConnection
+from mcp_client.tool_batch import DEFAULT_WINDOW, ToolCall, ToolCallOutcome, call_tools
+from mcp_client.tool_catalogue import ToolCatalogue, anthropic_tool_schema
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEPARATOR = "__"
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_LIST_TIMEOUT = 5.0
+
+# Opens one initialized session: opener(transport, connection_params, session_params, context).
+SessionOpener = Callable[[str, Any, Any, Optional[dict]], AsyncContextManager[Any]]
+
+
+def _root_cause(error: BaseException) -> BaseException:
+    # Transports fail inside task groups; report the error rather than the group around it.
+    while len(getattr(error, "exceptions", ())) == 1:
+        error = error.exceptions[0]  # type: ignore[attr-defined]
+    return error
+
+
+class _Server:
+    __slots__ = ("connection", "status", "error", "session", "catalogue", "task", "ready", "closing")
+
+    def __init__(self, connection: ServerConnection):
+        self.connection = connection
+        self.status = "connecting"
+        self.error: Optional[BaseException] = None
+        self.session: Any = None
+        self.catalogue: Optional[ToolCatalogue] = None
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.ready = asyncio.Event()
+        self.closing = asyncio.Event()
+
+
+class MCPAggregator:
+    """Namespaced tools of several MCP servers behind one call_tool (see the module docstring)."""
+
+    def __init__(self, servers: Sequence[ServerConnection], session_params: Optional[ClientSessionConfig] = None,
+                 separator: str = DEFAULT_SEPARATOR, connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+                 list_timeout: Optional[float] = DEFAULT_LIST_TIMEOUT, opener: Optional[SessionOpener] = None):
+        names = [server.name for server in servers]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Server names must be unique: {names}")
+        if not separator:
+            raise ValueError("The namespace separator must not be empty.")
+        # Servers `a` and `a__b` would both expose a tool `b__x` of `a` and `x` of `a__b` as `a__b__x`.
+        clashing = [name for name in names if separator in name]
+        if clashing:
+            raise ValueError(f"Server names must not contain the separator {separator!r}: {clashing}")
+        self.session_params = session_params or ClientSessionConfig()
+        self.separator = separator
+        self.connect_timeout = connect_timeout
+        self.list_timeout = list_timeout
+        self.opener = opener
+        self._servers: Dict[str, _Server] = {server.name: _Server(server) for server in servers}
+        # Namespaced tool name -> (server name, tool name on that server).
+        self.routes: Dict[str, Tuple[str, str]] = {}
+        self._tools: List[types.Tool] = []
+        self._anthropic: Optional[List[Dict[str, Any]]] = None
+        self._refreshing: Dict[str, "asyncio.Task[Any]"] = {}
+
+    def _get_opener(self) -> SessionOpener:
+        if self.opener is None:
+            from mcp_client.detailed_client_sse import open_mcp_session
+            self.opener = open_mcp_session
+        return self.opener
+
+    def namespaced(self, server_name: str, tool_name: str) -> str:
+        return f"{server_name}{self.separator}{tool_name}"
+
+    async def __aenter__(self) -> "MCPAggregator":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def connect(self) -> Dict[str, Dict[str, Any]]:
+        """Connect to every server in parallel, waiting at most connect_timeout; returns status()."""
+        for server in self._servers.values():
+            if server.task is None:
+                server.task = asyncio.create_task(self._hold(server))
+        waiters = [asyncio.create_task(server.ready.wait()) for server in self._servers.values()]
+        _, pending = await asyncio.wait(waiters, timeout=self.connect_timeout)
+        for waiter in pending:
+            waiter.cancel()
+        slow = [name for name, server in self._servers.items() if server.status == "connecting"]
+        if slow:
+            logger.warning(f"Still connecting to {', '.join(slow)}; their tools are added once they are ready.")
+        return self.status()
+
+    async def _hold(self, server: _Server) -> None:
+        """Open the server's session and keep it open until close()."""
+        connection = server.connection
+        try:
+            async with self._get_opener()(connection.transport, connection.connection_params, self.session_params,
+                                          connection.context) as session:
+                catalogue = getattr(session, "tool_catalogue", None) or ToolCatalogue()
+                await catalogue.list_tools(session)
+                server.session, server.catalogue, server.status = session, catalogue, "connected"
+                self._rebuild_routes()
+                server.ready.set()
+                await self._wait_closing_or_lost(server, session)
+                if not server.closing.is_set():
+                    server.error = ConnectionError(f"Connection to MCP server {connection.name} was lost.")
+                    raise server.error
+        except Exception as e:
+            # Closing a session whose connection is gone may fail again; keep the first error.
+            server.error = server.error or _root_cause(e)
+            logger.warning(f"MCP server {connection.name} failed: {server.error!r}")
+        finally:
+            server.status = "closed" if server.closing.is_set() else "failed"
+            server.session = None
+            server.ready.set()
+            self._rebuild_routes()
+
+    @staticmethod
+    async def _wait_closing_or_lost(server: _Server, session: Any) -> None:
+        lost: Optional[asyncio.Event] = getattr(session, "connection_lost", None)
+        waiters = [asyncio.create_task(server.closing.wait())]
+        if lost is not None:
+            waiters.append(asyncio.create_task(lost.wait()))
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    def _rebuild_routes(self) -> None:
+        routes: Dict[str, Tuple[str, str]] = {}
+        tools: List[types.Tool] = []
+        for name, server in self._servers.items():
+            if server.status != "connected" or server.catalogue is None or server.catalogue.tools is None:
+                continue
+            for tool in server.catalogue.tools:
+                namespaced = self.namespaced(name, tool.name)
+                routes[namespaced] = (name, tool.name)
+                tools.append(tool.model_copy(update={"name": namespaced}))
+        self.routes = routes
+        self._tools = tools
+        self._anthropic = None
+
+    async def _refresh_stale(self) -> None:
+        """Re-list invalidated catalogues, waiting at most list_timeout for them."""
+        for name, server in self._servers.items():
+            if (server.status == "connected" and server.catalogue is not None and server.catalogue.stale
+                    and name not in self._refreshing):
+                self._refreshing[name] = asyncio.create_task(self._refresh(name, server))
+        if self._refreshing:
+            await asyncio.wait(list(self._refreshing.values()), timeout=self.list_timeout)
+
+    async def _refresh(self, name: str, server: _Server) -> None:
+        try:
+            assert server.catalogue is not None
+            await server.catalogue.list_tools(server.session)
+        except Exception as e:
+            logger.warning(f"Could not re-list the tools of {name}: {e}")
+        finally:
+            self._refreshing.pop(name, None)
+            self._rebuild_routes()
+
+    async def list_tools(self) -> List[types.Tool]:
+        """The namespaced tools of every connected server."""
+        await self._refresh_stale()
+        return self._tools
+
+    async def anthropic_tools(self) -> List[Dict[str, Any]]:
+        """The namespaced tools as Anthropic tool schemas."""
+        await self._refresh_stale()
+        if self._anthropic is None:
+            self._anthropic = [anthropic_tool_schema(tool) for tool in self._tools]
+        return self._anthropic
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> types.CallToolResult:
+        """Call a namespaced tool on the server that provides it."""
+        route = self.routes.get(name)
+        if route is None:
+            for server_name, server in self._servers.items():
+                if server.status != "connected" and name.startswith(self.namespaced(server_name, "")):
+                    raise RuntimeError(f"MCP server {server_name} is not connected ({server.status}).")
+            # The tool may have just been added to a server whose catalogue is stale.
+            await self._refresh_stale()
+            route = self.routes.get(name)
+            if route is None:
+                raise ValueError(f"Unknown tool {name!r}.")
+        server_name, tool_name = route
+        server = self._servers[server_name]
+        if server.session is None:
+            raise RuntimeError(f"MCP server {server_name} is not connected ({server.status}).")
+        return await server.session.call_tool(tool_name, arguments)
+
+    async def call_tools(self, calls: Sequence[ToolCall], window: int = DEFAULT_WINDOW,
+                         timeout: Optional[float] = None) -> List[ToolCallOutcome]:
+        """Run namespaced calls across the servers, `window` at a time (see mcp_client.tool_batch)."""
+        return await call_tools(self, calls, window, timeout)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "transport": server.connection.transport,
+                "status": server.status,
+                "tools": len(server.catalogue.tools or []) if server.catalogue is not None else 0,
+                "error": str(server.error) if server.error is not None else None,
+            }
+            for name, server in self._servers.items()
+        }
+
+    async def close(self) -> None:
+        """Close every session; servers still connecting are abandoned."""
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        tasks = []
+        for server in self._servers.values():
+            server.closing.set()
+            if server.task is not None:
+                if server.status == "connecting":
+                    server.task.cancel()
+                tasks.append(server.task)
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,20 +1,27 @@
 from typing import Dict
 import asyncio
+import logging
+import anyio
+import httpx
 from contextlib import asynccontextmanager
 from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client, StdioServerParameters
 from mcp import ClientSession
-from langchain_mcp_adapters.tools import load_mcp_tools
-from langchain_mcp_adapters.client import StdioConnection
 from typing import TypedDict, Union, Literal, Optional, Any
 from config import SSEConnection, ClientSessionConfig
 import mcp.types as types
 from mcp.shared.context import RequestContext
+from mcp.shared.exceptions import McpError
 from pydantic import BaseModel, Field
 from mcp_client.mcp_client_callbacks import *
 from mcp.shared.version import SUPPORTED_PROTOCOL_VERSIONS
+from mcp_client.session_pool import SessionPool
+from mcp_client.tool_catalogue import ToolCatalogue
+from mcp_client.tool_batch import DEFAULT_WINDOW, ToolCall, ToolCallOutcome, call_tools, call_tools_as_completed
 
 
+logger = logging.getLogger(__name__)
+
 # You have to create a connection params object like this
 connection_params = SSEConnection(**{"url":"http://localhost:8010/sse",
                                       "headers": {},
@@ -65,88 +72,204 @@ session_params = ClientSessionConfig(
 #     """Create a notification object for sending to the server."""
 #     return ConfigNotification(params=config_params)  # type: ignore
     
+# progressToken of the notifications/progress that carry in-band session config changes;
+# must match SESSION_CONFIG_TOKEN in mcp_server.mcp_extension.
+SESSION_CONFIG_TOKEN = "client/session_config"
+# JSON-RPC error code of the requests failed because the connection closed (as in later mcp releases).
+CONNECTION_CLOSED = -32000
+# Seconds to wait for the InitializeResult when the session has no read_timeout_seconds of its own.
+INITIALIZE_TIMEOUT = 30.0
+
+
 class NaviClientSession(ClientSession):
-    """A subclass of ClientSession that adds custom functionality."""
-    def __init__(self,  *args, config_params: Optional[Dict[str, str]] = None, **kwargs):
+    """
+    A subclass of ClientSession that adds custom functionality.
+
+    The env_config (config_params) is sent as an extra field of the single initialize request.
+    With a `server_key` (e.g. the server URL), the server's InitializeResult is cached per server:
+    once it is known, initialize() writes the initialize request, then the initialized
+    notification, and returns the cached result without waiting for the server, which then
+    answers in the background and refreshes the cache. change_context() updates the config in-band,
+    without a new handshake.
+
+    The session's tools are cached in `tool_catalogue` (see mcp_client.tool_catalogue): tools(),
+    anthropic_tools() and langchain_tools() list them from the server only after a
+    tools/list_changed notification, and convert them once per catalogue version.
+
+    call_tools() and call_tools_as_completed() run many independent tool calls concurrently over
+    the session, within a bounded in-flight window (see mcp_client.tool_batch).
+
+    When the server's stream ends (the server exited or the connection dropped), `connection_lost`
+    is set and the requests still waiting for a response fail with a CONNECTION_CLOSED McpError
+    instead of waiting forever.
+    """
+
+    # server_key -> InitializeResult of the last handshake with that server.
+    server_capabilities_cache: Dict[str, types.InitializeResult] = {}
+
+    def __init__(self,  *args, config_params: Optional[Dict[str, str]] = None, server_key: Optional[str] = None, **kwargs):
         
         super().__init__(*args, **kwargs)
         self.session_config = config_params
-        
-    async def initialize(self) -> types.InitializeResult:
-        # Custom initialization logic here
-        print("Custom session initialization with config:", self.session_config)
-        # Call the parent class's initialize method
-        result = await super().initialize()
-        sampling = types.SamplingCapability()
-        roots = types.RootsCapability(
-            # TODO: Should this be based on whether we
-            # _will_ send notifications, or only whether
-            # they're supported?
-            listChanged=True,
-        )
+        self.server_key = server_key
+        self.server_info: Optional[types.InitializeResult] = None
+        self._initialize_task: Optional[asyncio.Task] = None
+        self.tool_catalogue = ToolCatalogue()
+        self.connection_lost = asyncio.Event()
+
+    def _initialize_request(self) -> types.ClientRequest:
         init_request = types.InitializeRequestParams(
                         protocolVersion=types.LATEST_PROTOCOL_VERSION,
                         capabilities=types.ClientCapabilities(
-                            sampling=sampling,
+                            sampling=types.SamplingCapability(),
                             experimental=None,
-                            roots=roots,
+                            roots=types.RootsCapability(listChanged=True),
                         ),
                         clientInfo=types.Implementation(name="mcp", version="0.1.0"),
                     )
         init_request.env_config = self.session_config #type: ignore
-        result = await self.send_request(
-            types.ClientRequest(
-                types.InitializeRequest(
-                    method="initialize",
-                    params= init_request
-                )
-            ),
-            types.InitializeResult,
-        )
+        return types.ClientRequest(types.InitializeRequest(method="initialize", params=init_request))
+
+    def _handshake_done(self, result: types.InitializeResult) -> types.InitializeResult:
         if result.protocolVersion not in SUPPORTED_PROTOCOL_VERSIONS:
+            if self.server_key is not None:
+                self.server_capabilities_cache.pop(self.server_key, None)
             raise RuntimeError(
                 "Unsupported protocol version from the server: "
                 f"{result.protocolVersion}"
             )
+        self.server_info = result
+        if self.server_key is not None:
+            self.server_capabilities_cache[self.server_key] = result
+        return result
 
+    async def _send_initialized(self) -> None:
         await self.send_notification(
             types.ClientNotification(
                 types.InitializedNotification(method="notifications/initialized")
             )
         )
 
-        return result
+    async def _write_initialize(self) -> tuple:
+        """
+        Write the initialize request and return (request id, response stream, reader), as
+        send_request does before it waits; the caller must pass them to _await_initialize.
+        """
+        request_id = self._request_id
+        self._request_id = request_id + 1
+        response_stream, response_reader = anyio.create_memory_object_stream[Union[types.JSONRPCResponse, types.JSONRPCError]](1)
+        self._response_streams[request_id] = response_stream
+        request = types.JSONRPCRequest(
+            jsonrpc="2.0", id=request_id,
+            **self._initialize_request().model_dump(by_alias=True, mode="json", exclude_none=True),
+        )
+        try:
+            await self._write_stream.send(types.JSONRPCMessage(request))
+        except BaseException:
+            self._response_streams.pop(request_id, None)
+            await response_stream.aclose()
+            await response_reader.aclose()
+            raise
+        return request_id, response_stream, response_reader
+
+    async def _await_initialize(self, request_id: Any, response_stream: Any, response_reader: Any) -> types.InitializeResult:
+        """Wait for the response to a request written by _write_initialize and complete the handshake."""
+        timeout = self._read_timeout_seconds.total_seconds() if self._read_timeout_seconds is not None else INITIALIZE_TIMEOUT
+        try:
+            with anyio.fail_after(timeout):
+                response = await response_reader.receive()
+        except TimeoutError:
+            raise McpError(types.ErrorData(
+                code=httpx.codes.REQUEST_TIMEOUT,
+                message=f"Timed out while waiting for the InitializeResult. Waited {timeout} seconds.",
+            ))
+        finally:
+            self._response_streams.pop(request_id, None)
+            await response_stream.aclose()
+            await response_reader.aclose()
+        if isinstance(response, types.JSONRPCError):
+            raise McpError(response.error)
+        return self._handshake_done(types.InitializeResult.model_validate(response.result))
+
+    async def initialize(self) -> types.InitializeResult:
+        """One initialize round trip carrying the env_config, or none when the server's result is cached."""
+        cached = self.server_capabilities_cache.get(self.server_key) if self.server_key is not None else None
+        pending = await self._write_initialize()
+        if cached is None:
+            result = await self._await_initialize(*pending)
+            await self._send_initialized()
+            return result
+
+        # The server reads a connection's messages in order and the request is already written,
+        # so the initialized notification can follow it without waiting for the response.
+        await self._send_initialized()
+
+        async def refresh() -> None:
+            try:
+                await self._await_initialize(*pending)
+            except Exception as e:
+                logger.warning(f"Background initialize for {self.server_key} failed: {e}")
+
+        self._initialize_task = asyncio.create_task(refresh())
+        self.server_info = cached
+        return cached
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._initialize_task is not None and not self._initialize_task.done():
+            self._initialize_task.cancel()
+        return await super().__aexit__(exc_type, exc_val, exc_tb)
+
+    async def _receive_loop(self) -> None:
+        try:
+            await super()._receive_loop()
+        finally:
+            self.connection_lost.set()
+            # mcp 1.6 leaves pending requests waiting when the read stream ends; answer them here.
+            pending, self._response_streams = self._response_streams, {}
+            for request_id, stream in pending.items():
+                error = types.JSONRPCError(jsonrpc="2.0", id=request_id, error=types.ErrorData(
+                    code=CONNECTION_CLOSED, message="Connection closed"))
+                try:
+                    stream.send_nowait(error)
+                except (anyio.WouldBlock, anyio.BrokenResourceError, anyio.ClosedResourceError):
+                    pass
+
+    async def _received_notification(self, notification: types.ServerNotification) -> None:
+        await self.tool_catalogue.handle_message(notification)
+        await super()._received_notification(notification)
+
+    async def tools(self) -> list[types.Tool]:
+        """The server's tools, from the catalogue cache."""
+        return await self.tool_catalogue.list_tools(self)
+
+    async def anthropic_tools(self) -> list[dict]:
+        """The server's tools as Anthropic tool schemas, from the catalogue cache."""
+        return await self.tool_catalogue.anthropic_tools(self)
+
+    async def langchain_tools(self) -> list:
+        """The server's tools as LangChain tools bound to this session, from the catalogue cache."""
+        return await self.tool_catalogue.langchain_tools(self)
+
+    async def call_tools(self, calls: list[ToolCall], window: int = DEFAULT_WINDOW,
+                         timeout: Optional[float] = None) -> list[ToolCallOutcome]:
+        """Pipeline `calls` over this session, `window` at a time; outcomes in call order (see mcp_client.tool_batch)."""
+        return await call_tools(self, calls, window, timeout)
+
+    def call_tools_as_completed(self, calls: list[ToolCall], window: int = DEFAULT_WINDOW,
+                                timeout: Optional[float] = None):
+        """Pipeline `calls` over this session, `window` at a time, yielding outcomes as they complete."""
+        return call_tools_as_completed(self, calls, window, timeout)
 
-    # async def send_custom_init(self):
-    #     """Configure this method to set everything besides just the configuration on the server side from client"""
-    #     await self.set_session_config(self.session_config)
-
-    # async def set_session_config(self, config: Optional[Dict[str, str]] = None):
-    #     if not config:
-    #         config = self.session_config
-    #     if not config:
-    #         raise ValueError("No configuration provided to set.")
-    #     notification = create_config_notification_object(config_params = config)
-    #     await self.send_notification(notification) #type: ignore
-    #     """Set the client configuration."""
-    #     # Custom logic to set the client configuration
-    #     if config != self.session_config:
-    #         self.session_config = config
-    #     print("Client configuration set:", config)
-        
     async def change_context(self, context: Dict[str, str]):
-        """Change the context of the session."""
+        """Change the context (env_config) of the session in-band; the server applies it to the next requests."""
         if not context:
             raise ValueError("No context provided to change.")
-        # Custom logic to change the session context
         self.session_config = context
-        print("Session context changed:", context)
-        #! TODO - Should send a notification to the server that the context has changed and the server should also implement the same on its side
-        await self.initialize()
-        # Reinitialize the session with the new context
-    
+        params = types.ProgressNotificationParams(progressToken=SESSION_CONFIG_TOKEN, progress=0, env_config=context)  # type: ignore[call-arg]
+        await self.send_notification(
+            types.ClientNotification(types.ProgressNotification(method="notifications/progress", params=params))
+        )
 
-    
     # async def send_custom_init_message(self):
     #     # Custom internal session init message
     #     from mcp.types import ClientNotification
@@ -161,29 +284,55 @@ class NaviClientSession(ClientSession):
 
 
 @asynccontextmanager
-async def get_an_mcp_session(transport : Literal["sse", "stdio"], connection_params: Union[SSEConnection, StdioServerParameters], session_params: ClientSessionConfig, context: Optional[dict] = None):
-    """Async context manager that yields an MCP session.
-    The session is created using the asynchronous sse_client.
-    """
+async def open_mcp_session(transport : Literal["sse", "stdio"], connection_params: Union[SSEConnection, StdioServerParameters], session_params: ClientSessionConfig, context: Optional[dict] = None):
+    """Async context manager that opens a new connection and yields an initialized MCP session."""
     if transport == "sse":
         # if context:
         #     connection_params.headers.update(context) #type: ignore
         #     # session_params.context = context #type: ignore
         async with sse_client(**connection_params.model_dump()) as (read, write): #type: ignore
             # session_params.config_params = context
-            async with NaviClientSession(read, write, config_params=context,**session_params.model_dump()) as session: #type: ignore
+            async with NaviClientSession(read, write, config_params=context, server_key=connection_params.url, **session_params.model_dump()) as session: #type: ignore
                 await session.initialize()
-                print("Session is now initialized")
+                logger.debug(f"Session with {connection_params.url} initialized")  # type: ignore[union-attr]
                 yield session
     else:
         async with stdio_client(server=connection_params) as (read, write): #type: ignore
-            async with ClientSession(read, write, **session_params.model_dump()) as session:
+            async with NaviClientSession(read, write, config_params=context, **session_params.model_dump()) as session:
                 await session.initialize()
-                print("Session is now initialized")
+                logger.debug(f"Session with {connection_params.command} initialized")  # type: ignore[union-attr]
                 yield session
 
+
+_default_pool: Optional[SessionPool] = None
+
+
+def get_session_pool() -> SessionPool:
+    """The process-wide session pool used by get_an_mcp_session(..., pool=True)."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = SessionPool(open_mcp_session)
+    return _default_pool
+
+
+@asynccontextmanager
+async def get_an_mcp_session(transport : Literal["sse", "stdio"], connection_params: Union[SSEConnection, StdioServerParameters], session_params: ClientSessionConfig, context: Optional[dict] = None,
+                             pool: Union[SessionPool, bool, None] = None):
+    """Async context manager that yields an MCP session.
+    The session is created using the asynchronous sse_client.
+    With `pool` (a SessionPool, or True for the default pool) an already-initialized session for the
+    same connection params and context is borrowed and returned to the pool on exit, instead of a
+    connection and handshake per use (see mcp_client.session_pool).
+    """
+    if pool:
+        session_pool = get_session_pool() if pool is True else pool
+        async with session_pool.session(transport, connection_params, session_params, context) as session:
+            yield session
+        return
+    async with open_mcp_session(transport, connection_params, session_params, context) as session:
+        yield session
+
 async def example_call():
-    from pprint import pprint
     # NOTE : This custom context should be completely JSON Serializable, else it won't work.
     custom_context = {
         "custom_key": "custom_value"}
@@ -195,7 +344,8 @@ async def example_call():
         # tools = await session.list_tools()
         # print("Tools:", tools)
         # # Alternatively, you can directly load langchain tools
-        langchain_tools = await load_mcp_tools(session)
+        # Listed and converted once per session; reused until the server's tool list changes.
+        langchain_tools = await session.langchain_tools()
         print("LangChain Tools:", langchain_tools)
 
         tools_result = await session.call_tool("echo_tool", arguments={"message": "Hello, World!"})
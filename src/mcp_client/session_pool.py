@@ -0,0 +1,303 @@
+"""
+Pool of initialized MCP client sessions.
+
+Opening a session costs a connection (an SSE stream, or a server subprocess for stdio) and an
+initialize handshake. SessionPool keeps sessions open between uses, keyed by the connection
+parameters, the session params (their values, and the identity of their callbacks) and a hash of
+the session context, so a caller borrows a session that is already initialized and returns it
+when done:
+
+    pool = SessionPool(max_size=8)
+    async with pool.session("sse", connection_params, session_params, context) as session:
+        await session.call_tool(...)
+
+Per key, at most `max_size` sessions exist; further borrowers wait for one to be returned.
+`min_size` sessions are opened as soon as a key is first used and kept through idle eviction,
+which closes sessions unused for `idle_timeout` seconds. A session idle for more than
+`health_check_after` seconds, or returned after its borrower raised, is pinged before it is
+lent again and replaced if the ping fails. A session whose context was changed while it was
+borrowed (NaviClientSession.change_context) no longer matches its key and is closed on return.
+
+Every session is opened and closed by a task of its own, since the transports' context managers
+must be exited by the task that entered them.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 4
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_HEALTH_CHECK_AFTER = 30.0
+DEFAULT_PING_TIMEOUT = 5.0
+
+# Opens one initialized session: opener(transport, connection_params, session_params, context).
+SessionOpener = Callable[[str, Any, Any, Optional[dict]], AsyncContextManager[Any]]
+
+
+def _dump(value: Any) -> Any:
+    return value.model_dump() if hasattr(value, "model_dump") else value
+
+
+def context_hash(context: Optional[dict]) -> str:
+    """Stable hash of a JSON-serializable session context."""
+    return hashlib.sha256(json.dumps(context or {}, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _identity(value: Any) -> str:
+    # Callbacks and other objects are told apart by identity; the pool keeps them alive while the key exists.
+    function = getattr(value, "__func__", None)
+    if function is not None:
+        # A bound method is a new object on every attribute access; use what it binds.
+        return f"{type(value).__qualname__}@{id(value.__self__)}.{id(function)}"
+    return f"{type(value).__qualname__}@{id(value)}"
+
+
+def pool_key(transport: str, connection_params: Any, context: Optional[dict], session_params: Any = None) -> str:
+    """Key of the sessions that can serve a (transport, connection params, context, session params) combination."""
+    params = json.dumps([_dump(connection_params), _dump(session_params)], sort_keys=True, default=_identity)
+    return f"{transport}:{hashlib.sha256(params.encode()).hexdigest()}:{context_hash(context)}"
+
+
+class PooledSession:
+    """An open session, owned by the task that holds its transport open."""
+
+    __slots__ = ("session", "task", "closing", "last_used", "needs_check")
+
+    def __init__(self, session: Any, task: "asyncio.Task[None]", closing: asyncio.Event):
+        self.session = session
+        self.task = task
+        self.closing = closing
+        self.last_used = time.monotonic()
+        self.needs_check = False
+
+    async def close(self) -> None:
+        self.closing.set()
+        try:
+            await self.task
+        except Exception as e:
+            logger.debug(f"Error while closing a pooled session: {e}")
+
+
+class _KeyPool:
+    def __init__(self, open_args: Tuple[Any, ...]):
+        self.open_args = open_args
+        self.idle: List[PooledSession] = []
+        self.size = 0
+        self.available = asyncio.Condition()
+
+
+class SessionPool:
+    """Borrowable, initialized client sessions per connection and context (see the module docstring)."""
+
+    def __init__(self, opener: Optional[SessionOpener] = None, min_size: int = 0, max_size: int = DEFAULT_MAX_SIZE,
+                 idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT,
+                 health_check_after: float = DEFAULT_HEALTH_CHECK_AFTER, ping_timeout: float = DEFAULT_PING_TIMEOUT):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool sizes: min_size={min_size}, max_size={max_size}.")
+        self.opener = opener
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.ping_timeout = ping_timeout
+        self._pools: Dict[str, _KeyPool] = {}
+        self._reaper: Optional["asyncio.Task[None]"] = None
+        self._closed = False
+        self.opened = 0
+        self.reused = 0
+        self.evicted = 0
+        self.failed_checks = 0
+
+    def _get_opener(self) -> SessionOpener:
+        if self.opener is None:
+            from mcp_client.detailed_client_sse import open_mcp_session
+            self.opener = open_mcp_session
+        return self.opener
+
+    async def _open(self, pool: _KeyPool) -> PooledSession:
+        """Open and initialize a session in a task of its own; the slot must already be counted in pool.size."""
+        opener = self._get_opener()
+        ready: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        closing = asyncio.Event()
+
+        async def hold() -> None:
+            try:
+                async with opener(*pool.open_args) as session:
+                    ready.set_result(session)
+                    await closing.wait()
+            except BaseException as e:
+                if not ready.done():
+                    ready.set_exception(e)
+                raise
+
+        task = asyncio.create_task(hold())
+        try:
+            session = await ready
+        except BaseException:
+            task.cancel()
+            raise
+        self.opened += 1
+        return PooledSession(session, task, closing)
+
+    async def _healthy(self, pooled: PooledSession) -> bool:
+        if pooled.task.done():
+            return False
+        if not pooled.needs_check and time.monotonic() - pooled.last_used < self.health_check_after:
+            return True
+        try:
+            await asyncio.wait_for(pooled.session.send_ping(), self.ping_timeout)
+            pooled.needs_check = False
+            return True
+        except Exception as e:
+            logger.info(f"Pooled session failed its health check: {e}")
+            self.failed_checks += 1
+            return False
+
+    async def _discard(self, pool: _KeyPool, pooled: PooledSession) -> None:
+        async with pool.available:
+            pool.size -= 1
+            pool.available.notify()
+        await pooled.close()
+
+    async def acquire(self, transport: str, connection_params: Any, session_params: Any,
+                      context: Optional[dict] = None) -> Tuple[str, PooledSession]:
+        """Borrow a session; give it back with release(). Prefer the session() context manager."""
+        if self._closed:
+            raise RuntimeError("The session pool is closed.")
+        key = pool_key(transport, connection_params, context, session_params)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _KeyPool((transport, connection_params, session_params, context))
+            self._start_background(pool)
+        while True:
+            async with pool.available:
+                while not pool.idle and pool.size >= self.max_size:
+                    await pool.available.wait()
+                if pool.idle:
+                    # Most recently used first: it is the least likely to need a health check.
+                    pooled = pool.idle.pop()
+                else:
+                    pooled = None
+                    pool.size += 1
+            if pooled is None:
+                try:
+                    return key, await self._open(pool)
+                except BaseException:
+                    async with pool.available:
+                        pool.size -= 1
+                        pool.available.notify()
+                    raise
+            if await self._healthy(pooled):
+                self.reused += 1
+                return key, pooled
+            await self._discard(pool, pooled)
+
+    async def release(self, key: str, pooled: PooledSession, failed: bool = False) -> None:
+        """
+        Return a borrowed session. After a failure it is health-checked before its next use; if its
+        context no longer matches the key's, it is closed instead.
+        """
+        pool = self._pools.get(key)
+        if pool is None or self._closed or pooled.task.done() or not self._matches(pool, pooled):
+            if pool is not None:
+                await self._discard(pool, pooled)
+            else:
+                await pooled.close()
+            return
+        pooled.last_used = time.monotonic()
+        pooled.needs_check = pooled.needs_check or failed
+        async with pool.available:
+            pool.idle.append(pooled)
+            pool.available.notify()
+
+    @staticmethod
+    def _matches(pool: _KeyPool, pooled: PooledSession) -> bool:
+        if not hasattr(pooled.session, "session_config"):
+            return True
+        return context_hash(pooled.session.session_config) == context_hash(pool.open_args[3])
+
+    @asynccontextmanager
+    async def session(self, transport: str, connection_params: Any, session_params: Any,
+                      context: Optional[dict] = None) -> AsyncIterator[Any]:
+        """Borrow an initialized session for the duration of the block."""
+        key, pooled = await self.acquire(transport, connection_params, session_params, context)
+        failed = True
+        try:
+            yield pooled.session
+            failed = False
+        finally:
+            await self.release(key, pooled, failed)
+
+    def _start_background(self, pool: _KeyPool) -> None:
+        if self.min_size:
+            asyncio.create_task(self._fill(pool))
+        if self.idle_timeout is not None and self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def _fill(self, pool: _KeyPool) -> None:
+        """Open sessions until the key has min_size of them."""
+        while True:
+            async with pool.available:
+                if pool.size >= self.min_size or self._closed:
+                    return
+                pool.size += 1
+            try:
+                pooled = await self._open(pool)
+            except Exception as e:
+                logger.warning(f"Could not pre-open a pooled session: {e}")
+                async with pool.available:
+                    pool.size -= 1
+                    # A borrower waiting for a free slot may open a session itself now.
+                    pool.available.notify()
+                return
+            async with pool.available:
+                pool.idle.append(pooled)
+                pool.available.notify()
+
+    async def _reap(self) -> None:
+        """Close sessions idle for longer than idle_timeout, keeping min_size per key."""
+        assert self.idle_timeout is not None
+        while not self._closed:
+            await asyncio.sleep(max(self.idle_timeout / 2, 1.0))
+            now = time.monotonic()
+            for pool in list(self._pools.values()):
+                expired: List[PooledSession] = []
+                async with pool.available:
+                    # idle is ordered by release time, oldest first.
+                    while (pool.idle and pool.size > self.min_size
+                           and now - pool.idle[0].last_used > self.idle_timeout):
+                        expired.append(pool.idle.pop(0))
+                        pool.size -= 1
+                    pool.available.notify(len(expired))
+                for pooled in expired:
+                    self.evicted += 1
+                    await pooled.close()
+
+    async def close(self) -> None:
+        """Close every idle session. Sessions still borrowed are closed when they are returned."""
+        self._closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for pool in self._pools.values():
+            async with pool.available:
+                idle, pool.idle = pool.idle, []
+                pool.size -= len(idle)
+            await asyncio.gather(*(pooled.close() for pooled in idle))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self._pools),
+            "open": sum(pool.size for pool in self._pools.values()),
+            "idle": sum(len(pool.idle) for pool in self._pools.values()),
+            "opened": self.opened,
+            "reused": self.reused,
+            "evicted": self.evicted,
+            "failed_checks": self.failed_checks,
+        }
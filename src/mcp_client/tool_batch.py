@@ -0,0 +1,109 @@
+"""
+Pipelined batches of tool calls over one client session.
+
+Awaiting session.call_tool once per call pays a full round trip, plus the tool's run time, per
+call. The server handles the requests of a session concurrently, so independent calls can share
+the connection instead: call_tools_as_completed keeps up to `window` calls in flight, starting
+the next call as soon as one finishes, and yields each call's outcome when it completes;
+call_tools returns the outcomes in the order of the calls.
+
+    outcomes = await call_tools(session, [("search", {"query": q}) for q in queries], window=16)
+    for outcome in outcomes:
+        print(outcome.name, outcome.result if outcome.ok else outcome.error)
+
+A call that fails (an MCP error response, a transport error or its `timeout`) does not fail the
+batch: its outcome carries the exception in `error`. A timed-out call is not cancelled on the
+server (mcp 1.6 servers fail the whole session when a request is cancelled mid-call); its late
+response is dropped. Tool errors reported by the tool itself arrive as results with isError
+set. Closing the as-completed iterator early cancels the calls still in flight.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import mcp.types as types
+
+DEFAULT_WINDOW = 16
+
+# A call: (tool name, arguments) or {"name": ..., "arguments": ...}.
+ToolCall = Union[Tuple[str, Optional[Dict[str, Any]]], Dict[str, Any]]
+
+
+class ToolCallOutcome:
+    """The result, or the error, of one call of a batch."""
+
+    __slots__ = ("index", "name", "arguments", "result", "error", "elapsed")
+
+    def __init__(self, index: int, name: str, arguments: Optional[Dict[str, Any]]):
+        self.index = index
+        self.name = name
+        self.arguments = arguments
+        self.result: Optional[types.CallToolResult] = None
+        self.error: Optional[BaseException] = None
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True when the call returned a result that is not a tool error."""
+        return self.error is None and self.result is not None and not self.result.isError
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else repr(self.error) if self.error is not None else "tool error"
+        return f"ToolCallOutcome({self.index}, {self.name!r}, {status}, {self.elapsed * 1000:.1f} ms)"
+
+
+def _outcomes(calls: Iterable[ToolCall]) -> Iterator[ToolCallOutcome]:
+    for index, call in enumerate(calls):
+        if isinstance(call, dict):
+            yield ToolCallOutcome(index, call["name"], call.get("arguments"))
+        else:
+            name, arguments = call
+            yield ToolCallOutcome(index, name, arguments)
+
+
+async def _run(session: Any, outcome: ToolCallOutcome, timeout: Optional[float]) -> ToolCallOutcome:
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        outcome.result = await asyncio.wait_for(session.call_tool(outcome.name, outcome.arguments), timeout)
+    except Exception as e:
+        outcome.error = e
+    outcome.elapsed = loop.time() - start
+    return outcome
+
+
+async def call_tools_as_completed(session: Any, calls: Iterable[ToolCall], window: int = DEFAULT_WINDOW,
+                                  timeout: Optional[float] = None) -> AsyncIterator[ToolCallOutcome]:
+    """Run `calls` with at most `window` in flight, yielding each outcome as its call completes."""
+    if window < 1:
+        raise ValueError(f"Invalid window {window}; it must be at least 1.")
+    pending_calls = _outcomes(calls)
+    in_flight: Set["asyncio.Task[ToolCallOutcome]"] = set()
+
+    def fill() -> None:
+        while len(in_flight) < window:
+            outcome = next(pending_calls, None)
+            if outcome is None:
+                return
+            in_flight.add(asyncio.create_task(_run(session, outcome, timeout)))
+
+    try:
+        fill()
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.difference_update(done)
+            fill()
+            for task in done:
+                yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def call_tools(session: Any, calls: Sequence[ToolCall], window: int = DEFAULT_WINDOW,
+                     timeout: Optional[float] = None) -> List[ToolCallOutcome]:
+    """Run `calls` with at most `window` in flight and return their outcomes in the order of the calls."""
+    outcomes: List[Optional[ToolCallOutcome]] = [None] * len(calls)
+    async for outcome in call_tools_as_completed(session, calls, window, timeout):
+        outcomes[outcome.index] = outcome
+    return outcomes  # type: ignore[return-value]
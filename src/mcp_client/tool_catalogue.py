@@ -0,0 +1,118 @@
+"""
+Client-side cache of a server's tool catalogue.
+
+Agents look the tools up on every query (to hand their schemas to the model), although the
+server's tool list only changes when a tool is added or removed. ToolCatalogue keeps the tools
+of one session together with their converted forms (Anthropic tool schemas, LangChain tools)
+and keeps serving them until either
+
+    - the server sends notifications/tools/list_changed (see invalidate() and handle_message()),
+      or
+    - a revalidation finds that the server's registry version differs from the cached one.
+
+Listings from ExtendedMCP carry the registry version in `_meta.registryVersion`. The catalogue
+sends the version it holds with every tools/list it makes, and the server answers with an
+empty `notModified` listing when nothing changed, so revalidating costs a round trip but no
+catalogue transfer. Servers without versions are simply listed again when revalidated.
+
+    catalogue = ToolCatalogue()
+    session = ClientSession(read, write, message_handler=catalogue.handle_message)
+    tools = await catalogue.anthropic_tools(session)   # listed once, then served from memory
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import mcp.types as types
+
+logger = logging.getLogger(__name__)
+
+# Must match REGISTRY_VERSION_META in mcp_server.mcp_extension.
+REGISTRY_VERSION_META = "registryVersion"
+
+
+def anthropic_tool_schema(tool: types.Tool) -> Dict[str, Any]:
+    """The Anthropic Messages API `tools` entry of an MCP tool."""
+    return {"name": tool.name, "description": tool.description or "", "input_schema": tool.inputSchema}
+
+
+class ToolCatalogue:
+    """The cached tool list of one session, with its converted schemas (see the module docstring)."""
+
+    def __init__(self):
+        self.tools: Optional[List[types.Tool]] = None
+        self.version: Any = None
+        self.stale = True
+        self.listings = 0
+        self.not_modified = 0
+        self._anthropic: Optional[List[Dict[str, Any]]] = None
+        self._langchain: Optional[List[Any]] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Mark the catalogue stale; the next lookup revalidates it against the server."""
+        self.stale = True
+
+    async def handle_message(self, message: Any) -> None:
+        """ClientSession message_handler invalidating the catalogue on tools/list_changed."""
+        if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+            logger.debug("Tool list changed on the server; invalidating the tool catalogue.")
+            self.invalidate()
+
+    async def refresh(self, session: Any) -> List[types.Tool]:
+        """Revalidate against the server, replacing the tools only if its registry version changed."""
+        params = types.RequestParams(_meta={REGISTRY_VERSION_META: self.version}) if self.version is not None else None
+        # Cleared before the request: a list_changed arriving while it is in flight marks it stale again.
+        self.stale = False
+        try:
+            result = await session.send_request(
+                types.ClientRequest(types.ListToolsRequest(method="tools/list", params=params)),
+                types.ListToolsResult,
+            )
+        except BaseException:
+            self.stale = True
+            raise
+        self.listings += 1
+        meta = result.meta or {}
+        if meta.get("notModified") and self.tools is not None:
+            self.not_modified += 1
+            return self.tools
+        self.tools = result.tools
+        self.version = meta.get(REGISTRY_VERSION_META)
+        self._anthropic = None
+        self._langchain = None
+        return self.tools
+
+    async def list_tools(self, session: Any) -> List[types.Tool]:
+        """The session's tools, listed from the server only when the catalogue is stale."""
+        async with self._lock:
+            if self.stale or self.tools is None:
+                await self.refresh(session)
+            assert self.tools is not None
+            return self.tools
+
+    async def anthropic_tools(self, session: Any) -> List[Dict[str, Any]]:
+        """The tools as Anthropic tool schemas, converted once per catalogue version."""
+        tools = await self.list_tools(session)
+        if self._anthropic is None:
+            self._anthropic = [anthropic_tool_schema(tool) for tool in tools]
+        return self._anthropic
+
+    async def langchain_tools(self, session: Any) -> List[Any]:
+        """The tools as LangChain tools calling `session`, converted once per catalogue version."""
+        from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+
+        tools = await self.list_tools(session)
+        if self._langchain is None:
+            self._langchain = [convert_mcp_tool_to_langchain_tool(session, tool) for tool in tools]
+        return self._langchain
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tools": len(self.tools) if self.tools is not None else None,
+            "version": self.version,
+            "stale": self.stale,
+            "listings": self.listings,
+            "not_modified": self.not_modified,
+        }
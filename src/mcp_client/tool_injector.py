@@ -33,9 +33,11 @@ def extract_imports(source: str) -> list:
     return imports
 
 def extract_env_dependencies(source: str) -> list:
-    """Extract environment variable keys from os.environ usage."""
+    """Extract environment variable keys from os.environ and get_env usage."""
     pattern = r'os\.environ\[(?:\'|\")([^\'"]+)(?:\'|\")\]'
     matches = re.findall(pattern, source)
+    overlay_pattern = r'get_env\(\s*(?:\'|\")([^\'"]+)(?:\'|\")'
+    matches += re.findall(overlay_pattern, source)
     return list(set(matches))
 
 def extract_bound_variables(func) -> dict:
@@ -116,6 +118,31 @@ async def add_langchain_tool_to_server(server_url: str, tool_obj: Tool, config:
                     print(line.decode('utf-8').strip())
 
 
+async def add_langchain_tools_bulk_to_server(server_url: str, tool_objs: list, config: dict, persist: bool):
+    """Register several LangChain Tool instances with one request to the bulk endpoint.
+       Returns the per-tool results reported by the server.
+    """
+    definitions = []
+    for tool_obj in tool_objs:
+        func = tool_obj.func
+        if not callable(func):
+            raise ValueError(f"Tool function is not defined for {tool_obj.name}.")
+        definitions.append({
+            "name": tool_obj.name,
+            "func_name": func.__name__,
+            "description": tool_obj.description,
+            "config": config,
+            "persist": persist,
+            "code": extract_tool_source(func),
+            "metadata": profile_tool_metadata(func),
+        })
+    async with aiohttp.ClientSession() as session:
+        url = f"{server_url}/dynamic/add_tools"
+        async with session.post(url, json={"tools": definitions, "persist": persist}) as resp:
+            data = await resp.json()
+            return data.get("results", [])
+
+
 # Example tool to be injected.
 def dynamic_example_tool(arg1: str) -> str:
     """
@@ -123,11 +150,11 @@ def dynamic_example_tool(arg1: str) -> str:
     It returns a message with the provided argument and checks for an environment key.
     Also demonstrates usage of a bound variable.
     """
-    import os
+    from mcp_server.env_overlay import get_env
     def helper():
         return "helper value"
     bound_value = helper()
-    required_key = os.environ.get("EXAMPLE_CONFIG", "default")
+    required_key = get_env("EXAMPLE_CONFIG", "default")
     return f"Dynamic tool received: {arg1} with config {required_key} and bound value {bound_value}"
 
 
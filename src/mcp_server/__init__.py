@@ -1,9 +1,19 @@
-from .mcp_server_sse import mcp, ExtendedMCPType
+"""
+The MCP server package. Importing it has no side effects: the server is built by
+create_server(), or on first access of `mcp_server.mcp` / get_server().
+"""
 
+from typing import Any
 
-
-__all__ = ["mcp", "ExtendedMCPType"]
+__all__ = ["mcp", "ExtendedMCPType", "create_server", "get_server"]
 __version__ = "0.0.1"
 __author__ = "sheshank.joshi@gmail.com"
 __license__ = "MIT"
 __copyright__ = "2023 Agentic AI"
+
+
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        from . import mcp_server_sse
+        return getattr(mcp_server_sse, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,108 @@
+"""
+Admission control for tool calls.
+
+A ConcurrencyLimiter lets at most `limit` calls run at once and parks up to `max_queue` more in a
+FIFO queue; a call arriving when the queue is full is rejected immediately with an McpError
+carrying a SERVER_OVERLOADED ErrorData, so clients get a JSON-RPC error they can back off on
+instead of piling work onto a saturated server. ExtendedMCP applies a limiter per tool (declared
+with max_concurrency/max_queue on add_tool) and optionally one global limiter in front of every
+tools/call request.
+
+Limiters are asyncio primitives and must be used from the server's event loop.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+# JSON-RPC reserves -32000..-32099 for implementation-defined server errors.
+SERVER_OVERLOADED = -32001
+DEFAULT_MAX_QUEUE = 64
+
+
+class ConcurrencyLimiter:
+    """A FIFO semaphore with a bounded wait queue and wait-time metrics."""
+
+    def __init__(self, name: str, limit: int, max_queue: Optional[int] = DEFAULT_MAX_QUEUE):
+        # max_queue=None queues without bound; 0 rejects whenever all slots are busy.
+        if limit < 1:
+            raise ValueError(f"Concurrency limit of {name} must be at least 1, got {limit}.")
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self._active = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.waited = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _overloaded(self) -> McpError:
+        return McpError(ErrorData(
+            code=SERVER_OVERLOADED,
+            message=f"{self.name} is overloaded ({self._active} running, {len(self._waiters)} queued); retry later.",
+            data={"limiter": self.name, "limit": self.limit, "queued": len(self._waiters)},
+        ))
+
+    async def acquire(self) -> None:
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return
+        if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise self._overloaded()
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on.
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.waited += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+        self.admitted += 1
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter; the active count is unchanged.
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "waited": self.waited,
+            "wait_time_total": self.wait_time_total,
+            "wait_time_max": self.wait_time_max,
+        }
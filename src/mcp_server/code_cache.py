@@ -0,0 +1,147 @@
+"""
+Content-hash bytecode cache for dynamically loaded tool code.
+
+Tools injected through add_tool_dynamically arrive as source code. Compiling that source is the
+dominant cost when thousands of tools are registered or reloaded from the registry at startup, so:
+
+    - compiled code objects are marshalled to disk, keyed by a hash of the source and the
+      interpreter's bytecode magic number (the same scheme importlib uses for .pyc files), and
+    - the resulting function objects are kept in an in-memory LRU keyed by (source hash, name).
+
+A cache entry written by a different Python version is simply never looked up, and a corrupt or
+truncated entry is recompiled and overwritten.
+"""
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_CODE_CACHE_DIR = ".tool_code_cache"
+DEFAULT_MAX_FUNCTIONS = 1024
+
+
+def source_hash(source: str) -> str:
+    """Hash of a tool's source code, independent of the interpreter version."""
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def compile_to_bytes(source: str, filename: str) -> bytes:
+    """Compile `source` and return the marshalled code object. Top-level so process pools can run it."""
+    return marshal.dumps(compile(source, filename, "exec"))
+
+
+class CodeCache:
+    """Two-level cache: marshalled code objects on disk, function objects in memory."""
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CODE_CACHE_DIR, max_functions: int = DEFAULT_MAX_FUNCTIONS):
+        # cache_dir=None disables the disk level.
+        self.cache_dir = cache_dir
+        self.max_functions = max_functions
+        self._functions: "OrderedDict[Tuple[str, str], Callable[..., Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _cache_path(self, digest: str) -> str:
+        # The interpreter's cache tag and magic number keep entries from different versions apart.
+        key = hashlib.sha256(importlib.util.MAGIC_NUMBER + digest.encode("ascii")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.{sys.implementation.cache_tag}.bin")  # type: ignore[arg-type]
+
+    def _read_code(self, path: str) -> Optional[CodeType]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        magic = importlib.util.MAGIC_NUMBER
+        if not data.startswith(magic):
+            return None
+        try:
+            code = marshal.loads(data[len(magic):])
+        except (EOFError, ValueError, TypeError):
+            return None
+        return code if isinstance(code, CodeType) else None
+
+    def _write_code(self, path: str, code: CodeType) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file and rename, so readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(importlib.util.MAGIC_NUMBER)
+                f.write(marshal.dumps(code))
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def is_cached(self, digest: str) -> bool:
+        """True if the disk level already holds the code for this source hash."""
+        return bool(self.cache_dir) and os.path.exists(self._cache_path(digest))
+
+    def store_compiled(self, digest: str, data: bytes) -> None:
+        """Store code marshalled elsewhere (see compile_to_bytes) under its source hash."""
+        if self.cache_dir:
+            self._write_code(self._cache_path(digest), marshal.loads(data))
+
+    def compile(self, source: str, filename: str = "<dynamic_tool>", digest: Optional[str] = None) -> CodeType:
+        """Return the code object for `source`, from the disk cache when possible."""
+        digest = digest or source_hash(source)
+        path = self._cache_path(digest) if self.cache_dir else None
+        if path is not None:
+            code = self._read_code(path)
+            if code is not None:
+                self.disk_hits += 1
+                return code
+        code = compile(source, filename, "exec")
+        if path is not None:
+            self._write_code(path, code)
+        return code
+
+    def load_function(self, source: str, name: str, filename: Optional[str] = None) -> Optional[Callable[..., Any]]:
+        """
+        Execute `source` and return the object it binds to `name` (None if it defines no such name).
+        Compile errors and exceptions raised by the module body propagate to the caller.
+        """
+        digest = source_hash(source)
+        key = (digest, name)
+        with self._lock:
+            func = self._functions.get(key)
+            if func is not None:
+                self._functions.move_to_end(key)
+                self.hits += 1
+                return func
+        self.misses += 1
+        code = self.compile(source, filename or f"<dynamic_tool:{name}>", digest)
+        # A single namespace, so module-level imports are visible inside the tool function.
+        namespace: Dict[str, Any] = {"__name__": f"dynamic_tool_{name}"}
+        exec(code, namespace)
+        func = namespace.get(name)
+        if func is None:
+            return None
+        with self._lock:
+            self._functions[key] = func
+            self._functions.move_to_end(key)
+            while len(self._functions) > self.max_functions:
+                self._functions.popitem(last=False)
+        return func
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = len(self._functions)
+        return {"size": size, "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        """Drop the in-memory level; the disk level is content-addressed and never stale."""
+        with self._lock:
+            self._functions.clear()
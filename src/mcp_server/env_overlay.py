@@ -0,0 +1,107 @@
+"""
+Per-call environment overlay for tools.
+
+Tools used to receive their session's ``env_config`` by having the server write it into
+the process-wide ``os.environ`` around every call. That is not safe once calls from different
+sessions interleave (or run in worker threads), so instead the values for the current call are
+held in a ``contextvars.ContextVar`` and tools read them through ``get_env``.
+
+Usage:
+    from mcp_server.env_overlay import get_env
+
+    def my_tool(arg: str) -> str:
+        api_key = get_env("API_KEY", "")
+        ...
+
+Lookups fall back to the real ``os.environ`` so tools keep working when called outside the server.
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping, Optional
+
+EMPTY_ENV: Mapping[str, str] = MappingProxyType({})
+
+_env_overlay: ContextVar[Mapping[str, str]] = ContextVar("tool_env_overlay", default=EMPTY_ENV)
+
+# Attribute used to cache the parsed env_config on a server session object.
+_SESSION_ENV_ATTR = "_env_overlay_cache"
+
+
+def get_env(key: str, default: Optional[str] = None) -> Optional[str]:
+    """Return the value of `key` for the current tool call, falling back to os.environ."""
+    overlay = _env_overlay.get()
+    if key in overlay:
+        return overlay[key]
+    return os.environ.get(key, default)
+
+
+def current_env() -> Mapping[str, str]:
+    """Return the read-only overlay active for the current call (without os.environ)."""
+    return _env_overlay.get()
+
+
+def freeze_env_config(env_config: Optional[Mapping[str, Any]]) -> Mapping[str, str]:
+    """Convert an env_config dict into an immutable mapping of strings."""
+    if not env_config:
+        return EMPTY_ENV
+    return MappingProxyType({str(k): str(v) for k, v in env_config.items()})
+
+
+def merge_env(base: Mapping[str, str], override: Mapping[str, str]) -> Mapping[str, str]:
+    """Merge two frozen overlays, values in `override` win. Avoids copying when one side is empty."""
+    if not base:
+        return override
+    if not override:
+        return base
+    return MappingProxyType({**base, **override})
+
+
+@contextmanager
+def env_overlay(values: Mapping[str, str]) -> Iterator[Mapping[str, str]]:
+    """Activate `values` on top of the current overlay for the duration of the block."""
+    merged = merge_env(_env_overlay.get(), values)
+    token = _env_overlay.set(merged)
+    try:
+        yield merged
+    finally:
+        _env_overlay.reset(token)
+
+
+def session_env(session: Any) -> Mapping[str, str]:
+    """
+    Return the frozen env_config for a server session, parsing it only once per session.
+
+    The config set through the session config handlers (``session.config["env_config"]``) takes
+    precedence over the ``env_config`` sent as an extra field of the initialize request.
+    """
+    cached = getattr(session, _SESSION_ENV_ATTR, None)
+    if cached is not None:
+        return cached
+
+    env_config: Any = None
+    session_config = getattr(session, "config", None)
+    if isinstance(session_config, dict):
+        env_config = session_config.get("env_config")
+    client_params = getattr(session, "client_params", None)
+    if not env_config and client_params is not None:
+        env_config = (getattr(client_params, "model_extra", None) or {}).get("env_config")
+
+    frozen = freeze_env_config(env_config) if isinstance(env_config, dict) else EMPTY_ENV
+    # Before the handshake completes there is nothing to cache yet.
+    if client_params is not None or session_config is not None:
+        try:
+            setattr(session, _SESSION_ENV_ATTR, frozen)
+        except AttributeError:
+            pass
+    return frozen
+
+
+def invalidate_session_env(session: Any) -> None:
+    """Drop the cached overlay of a session, e.g. after its config changed."""
+    try:
+        setattr(session, _SESSION_ENV_ATTR, None)
+    except AttributeError:
+        pass
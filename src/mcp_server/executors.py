@@ -0,0 +1,164 @@
+"""
+Execution policies for tool functions.
+
+Sync tools registered on ExtendedMCP used to run directly on the server's event loop, so a single
+slow call (e.g. rendering a presentation) stalled every connected session. Each tool can now
+declare an execution policy when it is registered; tools that do not declare one keep running
+inline, since moving a thread-unsafe tool to a pool would silently change its behavior:
+
+    - inline:  call the function on the event loop (cheap, non-blocking sync tools and all async tools).
+    - thread:  run the function in a shared, bounded thread pool (blocking I/O, C extensions).
+    - process: run the function in a shared, bounded process pool (CPU-bound pure Python).
+
+The per-call environment overlay (see mcp_server.env_overlay) is carried into the worker, so
+get_env returns the calling session's values in every policy.
+"""
+
+import contextvars
+import os
+import pickle
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+import asyncio
+
+from mcp_server.env_overlay import env_overlay
+
+DEFAULT_THREAD_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+DEFAULT_PROCESS_WORKERS = os.cpu_count() or 1
+
+
+class ExecutionPolicy(str, Enum):
+    """Where a tool function is executed."""
+    INLINE = "inline"
+    THREAD = "thread"
+    PROCESS = "process"
+
+    @classmethod
+    def coerce(cls, value: Union["ExecutionPolicy", str, None], default: "ExecutionPolicy") -> "ExecutionPolicy":
+        if value is None:
+            return default
+        try:
+            return cls(value)
+        except ValueError:
+            raise ValueError(f"Unknown execution policy {value!r}; expected one of {[p.value for p in cls]}")
+
+
+def _call_with_env(fn: Callable[..., Any], env: Mapping[str, str], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+    """Run fn with `env` as the active overlay. Top-level so it can be pickled for process pools."""
+    with env_overlay(env):
+        return fn(*args, **kwargs)
+
+
+class PoolStats:
+    """Thread-safe counters describing the load on one worker pool.
+       Process pools cannot report when a job starts, so their `queued` count includes running jobs.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+
+    def on_submit(self) -> None:
+        with self._lock:
+            self.submitted += 1
+
+    def on_start(self) -> None:
+        with self._lock:
+            self.started += 1
+
+    def on_done(self, failed: bool) -> None:
+        with self._lock:
+            self.completed += 1
+            if failed:
+                self.failed += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            finished = self.completed
+            return {
+                "max_workers": self.max_workers,
+                "submitted": self.submitted,
+                "completed": finished,
+                "failed": self.failed,
+                # Jobs handed to the pool that no worker has picked up yet.
+                "queued": self.submitted - max(self.started, finished),
+                "running": max(self.started - finished, 0),
+            }
+
+
+class ToolExecutor:
+    """Lazily created thread and process pools shared by all tools of one server."""
+
+    def __init__(self, max_threads: Optional[int] = None, max_processes: Optional[int] = None):
+        self.max_threads = max_threads or DEFAULT_THREAD_WORKERS
+        self.max_processes = max_processes or DEFAULT_PROCESS_WORKERS
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.thread_stats = PoolStats(self.max_threads)
+        self.process_stats = PoolStats(self.max_processes)
+
+    def _get_pool(self, policy: ExecutionPolicy) -> Executor:
+        with self._pool_lock:
+            if policy is ExecutionPolicy.THREAD:
+                if self._thread_pool is None:
+                    self._thread_pool = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="mcp-tool")
+                return self._thread_pool
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_processes)
+            return self._process_pool
+
+    def _run_in_thread(self, ctx: contextvars.Context, fn: Callable[..., Any], env: Mapping[str, str],
+                       args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        self.thread_stats.on_start()
+        return ctx.run(_call_with_env, fn, env, args, kwargs)
+
+    async def run(self, policy: ExecutionPolicy, fn: Callable[..., Any], env: Mapping[str, str],
+                  args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        """Execute a sync fn according to `policy` and await its result."""
+        if policy is ExecutionPolicy.INLINE:
+            return _call_with_env(fn, env, args, kwargs)
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool(policy)
+        stats = self.thread_stats if policy is ExecutionPolicy.THREAD else self.process_stats
+        stats.on_submit()
+        if policy is ExecutionPolicy.THREAD:
+            # Copy the caller's contextvars (request context, overlay) into the worker thread.
+            future = loop.run_in_executor(pool, self._run_in_thread, contextvars.copy_context(), fn, env, args, kwargs)
+        else:
+            future = loop.run_in_executor(pool, _call_with_env, fn, dict(env), args, kwargs)
+        failed = True
+        try:
+            result = await future
+            failed = False
+            return result
+        finally:
+            stats.on_done(failed)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return queue and worker metrics for both pools."""
+        return {"thread": self.thread_stats.snapshot(), "process": self.process_stats.snapshot()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._pool_lock:
+            for pool in (self._thread_pool, self._process_pool):
+                if pool is not None:
+                    pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._thread_pool = None
+            self._process_pool = None
+
+
+def is_picklable(fn: Callable[..., Any]) -> bool:
+    """Process pools can only run functions that pickle by reference (module-level functions)."""
+    try:
+        pickle.dumps(fn)
+        return True
+    except Exception:
+        return False
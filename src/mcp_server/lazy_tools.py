@@ -0,0 +1,61 @@
+"""
+Lazily resolved tools.
+
+A LazyTool is advertised in list_tools with a name, description and argument schema that are known
+up front (e.g. from the persisted tool index), while the function behind it is only compiled or
+imported on the first call. The loader returns the fully built Tool, which then serves every call.
+It runs in a worker thread, so a slow import or compile does not stall the event loop for the
+other sessions.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, Optional
+
+from mcp.server.fastmcp.tools import Tool
+from pydantic import PrivateAttr
+
+
+async def _unresolved(**kwargs: Any) -> Any:
+    raise RuntimeError("Lazy tool called before it was resolved.")
+
+
+class LazyTool(Tool):
+    """A Tool whose function is resolved on first use by `loader`."""
+
+    _loader: Optional[Callable[[], Tool]] = PrivateAttr(default=None)
+    _resolved: Optional[Tool] = PrivateAttr(default=None)
+    _lock: Optional[asyncio.Lock] = PrivateAttr(default=None)
+
+    @classmethod
+    def create(cls, name: str, description: str, parameters: Dict[str, Any], loader: Callable[[], Tool]) -> "LazyTool":
+        # fn_metadata is only needed once the real tool exists, so validation is skipped here.
+        tool = cls.model_construct(
+            fn=_unresolved,
+            name=name,
+            description=description,
+            parameters=parameters,
+            fn_metadata=None,
+            is_async=True,
+            context_kwarg=None,
+        )
+        tool._loader = loader
+        return tool
+
+    @property
+    def resolved(self) -> bool:
+        return self._resolved is not None
+
+    async def resolve(self) -> Tool:
+        """Build the real tool once, off the event loop; concurrent callers wait for the first resolution."""
+        if self._resolved is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._resolved is None:
+                    assert self._loader is not None, "LazyTool created without a loader"
+                    self._resolved = await asyncio.to_thread(self._loader)
+        return self._resolved
+
+    async def run(self, arguments: Dict[str, Any], context: Any = None) -> Any:
+        tool = await self.resolve()
+        return await tool.run(arguments, context=context)
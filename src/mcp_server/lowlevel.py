@@ -0,0 +1,149 @@
+"""
+Low-level MCP server used by ExtendedMCP.
+
+The stock mcp.server.lowlevel.Server creates a ServerSession per connection inside run() and
+never exposes it, so the server has no way to reach its connected clients outside of a request.
+SessionTrackingServer keeps the live sessions in a set so ExtendedMCP can broadcast
+notifications (e.g. tools/list_changed) and run callbacks when a client connects or disconnects.
+
+Every session gets a `state` (see session_state.SessionState) and its `session_id`: the state the
+transport put in `connection_state` for the connection (ExtendedMCP.sse_app builds it from the
+SSE request), or an empty state with a fresh id. Callbacks in `on_session_opened` run once the
+session exists, e.g. to restore the config stored under a server-issued session id.
+
+run(..., stateless=True) serves one exchange of ExtendedMCP's stateless HTTP transport: the
+session starts out initialized, is not tracked, and its close callbacks do not run, since the
+client's session outlives it.
+
+While a client notification is handled, `notifying_session` holds the session that sent it.
+
+When its `tracer` is enabled, every request is traced as an "mcp.request" span (continuing the
+client's trace if the request's _meta carries a traceparent) with the response send as a child.
+"""
+
+import inspect
+import logging
+from contextlib import AsyncExitStack
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import anyio
+from mcp.server.lowlevel.server import NotificationOptions, Server
+from mcp.server.models import InitializationOptions
+from mcp.server.session import InitializationState, ServerSession
+
+from mcp_server.session_state import SessionState
+from mcp_server.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+SessionCallback = Callable[[ServerSession], Any]
+
+# State built by the transport for the connection being served, read once in run().
+connection_state: ContextVar[Optional[SessionState]] = ContextVar("connection_state", default=None)
+# The session whose notification is being handled; lowlevel notification handlers only get the notification.
+notifying_session: ContextVar[Optional[ServerSession]] = ContextVar("notifying_session", default=None)
+
+
+class PreserializedResult:
+    """
+    A request result dumped to JSON-ready data once and reused for many responses.
+    BaseSession._send_response only calls model_dump() on a result, so this stands in for the
+    ServerResult model without re-serializing it on every request.
+    """
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+
+    def model_dump(self, **kwargs: Any) -> Dict[str, Any]:
+        return self.payload
+
+
+class SessionTrackingServer(Server):
+    """A lowlevel Server that tracks its connected sessions and advertises list_changed support."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.sessions: Set[ServerSession] = set()
+        self.on_session_opened: List[SessionCallback] = []
+        self.on_session_closed: List[SessionCallback] = []
+        self.notification_options = NotificationOptions(tools_changed=True, prompts_changed=True, resources_changed=True)
+        self.tracer = Tracer()
+
+    def create_initialization_options(self, notification_options=None, experimental_capabilities=None) -> InitializationOptions:
+        return super().create_initialization_options(notification_options or self.notification_options, experimental_capabilities)
+
+    async def _run_callbacks(self, callbacks: List[SessionCallback], session: ServerSession) -> None:
+        for callback in callbacks:
+            try:
+                result = callback(session)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error in session callback: {e}")
+
+    async def run(self, read_stream, write_stream, initialization_options, raise_exceptions: bool = False,
+                  stateless: bool = False):
+        # Same flow as Server.run, with the session registered for the lifetime of the connection.
+        async with AsyncExitStack() as stack:
+            lifespan_context = await stack.enter_async_context(self.lifespan(self))
+            session = await stack.enter_async_context(
+                ServerSession(read_stream, write_stream, initialization_options)
+            )
+            if stateless:
+                session._initialization_state = InitializationState.Initialized
+            state = connection_state.get() or SessionState()
+            session.state = state  # type: ignore[attr-defined]
+            session.session_id = state.session_id  # type: ignore[attr-defined]
+            await self._run_callbacks(self.on_session_opened, session)
+            if not stateless:
+                self.sessions.add(session)
+            try:
+                async with anyio.create_task_group() as tg:
+                    async for message in session.incoming_messages:
+                        logger.debug(f"Received message: {message}")
+                        tg.start_soon(self._handle_message, message, session, lifespan_context, raise_exceptions)
+            finally:
+                if not stateless:
+                    self.sessions.discard(session)
+                    await self._run_callbacks(self.on_session_closed, session)
+
+    async def _handle_message(self, message, session, lifespan_context, raise_exceptions=False):
+        token = notifying_session.set(session)
+        try:
+            await super()._handle_message(message, session, lifespan_context, raise_exceptions)
+        finally:
+            notifying_session.reset(token)
+
+    async def _handle_request(self, message, req, session, lifespan_context, raise_exceptions):
+        if not self.tracer.enabled:
+            return await super()._handle_request(message, req, session, lifespan_context, raise_exceptions)
+        meta = message.request_meta
+        traceparent = (meta.model_extra or {}).get("traceparent") if meta is not None else None
+        attributes = {
+            "method": getattr(req, "method", type(req).__name__),
+            "request_id": message.request_id,
+            "session_id": getattr(session, "session_id", None),
+        }
+        with self.tracer.span("mcp.request", attributes, traceparent=traceparent):
+            respond = message.respond
+
+            async def traced_respond(response):
+                with self.tracer.span("mcp.transport.send"):
+                    await respond(response)
+
+            message.respond = traced_respond
+            await super()._handle_request(message, req, session, lifespan_context, raise_exceptions)
+
+    async def broadcast(self, send: Callable[[ServerSession], Awaitable[Any]]) -> int:
+        """Call `send` for every connected session, ignoring sessions that have gone away."""
+        delivered = 0
+        for session in list(self.sessions):
+            try:
+                await send(session)
+                delivered += 1
+            except Exception as e:
+                logger.debug(f"Dropping notification for a closed session: {e}")
+        return delivered
@@ -1,22 +1,76 @@
-import json
 import os
-import time
-import re
-from typing import Any, Dict, Literal, Optional, Awaitable, Callable
-from httpx import request
-from lmstudio import BaseModel
+import functools
+import importlib
+import itertools
+import secrets
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Literal, Mapping, Optional, Awaitable, Callable, Tuple
 from mcp import ClientNotification
 from mcp.server.fastmcp import FastMCP, Context
 from mcp.shared.context import RequestContext
-import uuid
+import time
 import asyncio
-from pydantic import Field
-from starlette.routing import Route
+import anyio
+import inspect
+import logging
+from pydantic import BaseModel, Field
+from starlette.routing import Mount, Route
+from starlette.requests import Request
+from starlette.responses import Response
+from mcp.server.sse import SseServerTransport
 from starlette.applications import Starlette
 from starlette_context.middleware import ContextMiddleware
-from mcp.types import ErrorData, INVALID_REQUEST, ServerResult, EmptyResult, NotificationParams, Notification, ProgressNotification
+from mcp.types import CallToolRequest, ListPromptsRequest, ListResourcesRequest, ListResourceTemplatesRequest, ListToolsRequest, ErrorData, INVALID_REQUEST, EmptyResult, NotificationParams, Notification, ProgressNotification
+from mcp_server.env_overlay import EMPTY_ENV, env_overlay, freeze_env_config, invalidate_session_env, merge_env, session_env
+from mcp_server.executors import ExecutionPolicy, ToolExecutor, is_picklable
+from mcp_server.code_cache import CodeCache, DEFAULT_CODE_CACHE_DIR
+from mcp_server.lazy_tools import LazyTool
+from mcp_server.tool_stubs import ToolStub
+from mcp_server.registry_store import TOOLS_SQLITE_FILE, RegistryStore, SQLiteRegistryStore, create_registry_store
+from mcp_server.module_store import ModuleStore
+from mcp_server.lowlevel import PreserializedResult, SessionTrackingServer, connection_state, notifying_session
+from mcp_server.session_state import SessionState
+from mcp_server.result_cache import ResultCache, call_key
+from mcp_server.single_flight import SingleFlight
+from mcp_server.admission import ConcurrencyLimiter, DEFAULT_MAX_QUEUE
+from mcp_server.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, PrometheusText, ToolMetrics
+from mcp_server.tracing import create_tracer
+from mcp_server.streaming import ChunkAggregator, ChunkSender, chunk_sender
+from mcp_server.stateless_http import DEFAULT_STREAMABLE_HTTP_PATH, StatelessHTTPTransport
+from mcp.server.fastmcp.server import _convert_to_content
+from contextvars import ContextVar
+from mcp_server.session_store import BoundedSessionStore, SQLiteSessionStore, DEFAULT_MAX_SESSIONS, DEFAULT_SESSION_TTL
+from mcp_server.code_cache import compile_to_bytes, source_hash
+from mcp.server.fastmcp.tools import Tool
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULT_CACHE_DIR = ".tool_result_cache"
+
+# _meta key carrying the registry version in list responses, and in list requests of clients that
+# already hold that version (they get an empty, notModified listing back).
+REGISTRY_VERSION_META = "registryVersion"
+
+# Environment variable naming the shared state directory; set by mcp_server.workers for its workers.
+SHARED_STATE_ENV = "MCP_SHARED_STATE"
+SESSIONS_SQLITE_FILE = "sessions.db"
+# Seconds between the checks of a worker for tools the other workers added to the shared registry.
+SHARED_REGISTRY_POLL_INTERVAL = 1.0
+
+# progressToken of the notifications/progress that carry in-band session config changes.
+SESSION_CONFIG_TOKEN = "client/session_config"
+
+# Returned by next() when a sync generator tool is exhausted.
+_END_OF_CHUNKS = object()
+
+# When the tool manager started running the current call; argument validation ends at the wrapper.
+_tool_run_started: ContextVar[Optional[int]] = ContextVar("tool_run_started", default=None)
+
+def _takes_context(fn: Callable[..., Any]) -> bool:
+    """True if fn has a Context parameter, which FastMCP fills with the calling request's context."""
+    return any(p.annotation is Context for p in inspect.signature(fn).parameters.values())
 
-TOOLS_PERSISTENCE_FILE = "registered_tools.json"
 
 class SessionConfig(BaseModel):
     """Data model for session configuration."""
@@ -41,43 +95,212 @@ class ConfigNotification(Notification):
 
 class ExtendedMCP(FastMCP):
     def __init__(self, *args, **kwargs):
+        # Worker pools for sync tools; sizes default to the concurrent.futures defaults.
+        tool_thread_workers: Optional[int] = kwargs.pop("tool_thread_workers", None)
+        tool_process_workers: Optional[int] = kwargs.pop("tool_process_workers", None)
+        # Policy for sync tools that do not declare one: inline, so existing tools keep running on the
+        # event loop unless they opt in to a pool. Async tools always run on the event loop.
+        self.default_sync_execution = ExecutionPolicy.coerce(kwargs.pop("default_sync_execution", None), ExecutionPolicy.INLINE)
+        # Compiled dynamic tool code is cached on disk (None disables) and in an in-memory LRU.
+        self.code_cache = CodeCache(kwargs.pop("tool_code_cache_dir", DEFAULT_CODE_CACHE_DIR),
+                                    kwargs.pop("tool_code_cache_size", 1024))
+        load_persisted = kwargs.pop("load_persisted_tools", True)
+        # Directory of the SQLite databases shared by the worker processes of a multi-worker server
+        # (see mcp_server.workers). With it, session config and the dynamic tool registry live there.
+        self.shared_state: Optional[str] = kwargs.pop("shared_state", None) or os.environ.get(SHARED_STATE_ENV) or None
+        registry_store = kwargs.pop("registry_store", None)
+        if self.shared_state:
+            os.makedirs(self.shared_state, exist_ok=True)
+            registry_store = registry_store or SQLiteRegistryStore(os.path.join(self.shared_state, TOOLS_SQLITE_FILE))
+        # Persistent registry backend: "journal" (default), "sqlite" or a RegistryStore instance.
+        self.registry_store: RegistryStore = create_registry_store(registry_store)
+        # Set when sync_shared_registry picks up another worker's change; cleared once the sessions are told.
+        self._shared_registry_changed = False
+        # Content-addressed store of persisted tool source (defaults to .tool_modules, outside the tools package).
+        self.module_store = ModuleStore(kwargs.pop("persist_tools_dir", None))
+        # Config of stateless HTTP sessions, by server-issued id. SSE sessions keep theirs on the session
+        # object. Bounded: LRU beyond session_store_size, expired after session_ttl idle seconds.
+        session_store_size = kwargs.pop("session_store_size", DEFAULT_MAX_SESSIONS)
+        session_ttl = kwargs.pop("session_ttl", DEFAULT_SESSION_TTL)
+        if self.shared_state:
+            self.session_config_store = SQLiteSessionStore(os.path.join(self.shared_state, SESSIONS_SQLITE_FILE),
+                                                           session_store_size, session_ttl)
+        else:
+            self.session_config_store = BoundedSessionStore(session_store_size, session_ttl)
+        # Directory of the disk level of tool result caches declared with cache={"disk": True}.
+        self.tool_result_cache_dir: str = kwargs.pop("tool_result_cache_dir", DEFAULT_RESULT_CACHE_DIR)
+        # Identical concurrent calls share one execution only for tools that opt in with coalesce=True
+        # (or, with coalesce_tool_calls=True, for every tool that does not opt out).
+        self.coalesce_tool_calls: bool = kwargs.pop("coalesce_tool_calls", False)
+        # Global admission control: at most max_concurrent_tools calls run, max_queued_tools more wait.
+        max_concurrent_tools: Optional[int] = kwargs.pop("max_concurrent_tools", None)
+        max_queued_tools: Optional[int] = kwargs.pop("max_queued_tools", DEFAULT_MAX_QUEUE)
+        # Path of the Prometheus metrics route added to the SSE app (None disables it).
+        metrics_path: Optional[str] = kwargs.pop("metrics_path", "/metrics")
+        # Path of the stateless streamable-HTTP endpoint, served next to SSE by sse_app (None disables it).
+        self.streamable_http_path: Optional[str] = kwargs.pop("streamable_http_path", DEFAULT_STREAMABLE_HTTP_PATH)
+        # Span tracing of the call path: None (off), a JSONL path, {"path", "sample_rate"} or a Tracer.
+        self.tracer = create_tracer(kwargs.pop("tracing", None))
         super().__init__(*args, **kwargs)
+        # Swap in a lowlevel server that tracks connected sessions, so notifications can be broadcast.
+        self._mcp_server = SessionTrackingServer(
+            name=self._mcp_server.name,
+            instructions=self._mcp_server.instructions,
+            lifespan=self._mcp_server.lifespan,
+        )
+        self._mcp_server.tracer = self.tracer
+        self._setup_handlers()
+        self.global_limiter: Optional[ConcurrencyLimiter] = (
+            ConcurrencyLimiter("server", max_concurrent_tools, max_queued_tools) if max_concurrent_tools else None
+        )
+        self.tool_limiters: Dict[str, ConcurrencyLimiter] = {}
+        self._install_admission_control()
+        # Bumped on every change to the tools, prompts or resources; list responses are cached per version.
+        # The random epoch keeps a version from matching one of another process (a restarted server,
+        # another worker) that happens to have counted the same number of changes.
+        self._registry_epoch = secrets.token_hex(8)
+        self._registry_changes = itertools.count(1)
+        self.registry_version = f"{self._registry_epoch}-0"
+        self._listings: Dict[str, Any] = {}
+        self._install_listing_cache()
+        self._mcp_server.on_session_opened.append(self._restore_session_state)
+        self.tool_executor = ToolExecutor(tool_thread_workers, tool_process_workers)
         self.tool_registry: Dict[str, Dict[str, Any]] = {}
-        # self.load_persisted_tools()
+        self.result_caches: Dict[str, ResultCache] = {}
+        # Declared and prepared options of advertised stubs, until their tool is registered for real.
+        self._stub_options: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self.single_flights: Dict[str, SingleFlight] = {}
         self.tools_loaded_persist = False
         self._extra_paths = {}
-        self.session_config_store: Dict[str, Dict[str, Any]] = {}
-        # self._mcp_server.notification_handlers[ProgressNotification] = self.handle_session_config_notification #type: ignore
+        self.tool_metrics = ToolMetrics()
+        self._sse_transport: Optional[SseServerTransport] = None
+        if metrics_path:
+            self.route(metrics_path, methods=["GET"])(self.metrics_endpoint)
+        self._mcp_server.notification_handlers[ProgressNotification] = self.handle_session_config_notification
         # Additional configuration here
         # self._mcp_server.request_handlers[SessionConfig] = self.handle_session_config
         # self._mcp_server.request_handlers[ToolConfig] = self.handle_tool_config
+        if load_persisted:
+            # Only the compact index is read here; tool code is compiled on first invocation.
+            self.load_persisted_tools()
 
     def load_persisted_tools(self):
-        """Load persisted tools from a JSON file and register them."""
-        if os.path.exists(TOOLS_PERSISTENCE_FILE):
-            with open(TOOLS_PERSISTENCE_FILE, "r") as f:
-                data = json.load(f)
-                for tool_name, tool_info in data.items():
-                    # Decide if we are using an imported function or the provided code.
-                    if "code" in tool_info and tool_info["code"]:
-                        func = self._load_tool_from_code(tool_info["code"], tool_name)
-                    else:
-                        func = self.lookup_tool_function(tool_info["func_name"])
-                    if func is None:
-                        raise ValueError(
-                            f"Function {tool_info['func_name']} not found. Either send the code inline, or place the module on the server and update the mapping"
-                        )
-                    # Register the tool with its function.
-                    self._register_tool(
-                        tool_name,
-                        func,
-                        tool_info.get("description", ""),
-                        tool_info.get("config", {}),
-                    )
-                    # Save metadata if available.
-                    tool_info.setdefault("metadata", {})
-                    self.tool_registry[tool_name] = tool_info
-            self.tools_loaded_persist = True
+        """
+        Advertise the persisted tools from the compact index without compiling them.
+        Each tool is registered as a LazyTool whose function is compiled (or looked up in the
+        tool mapping) on first invocation. Entries written before the index stored argument
+        schemas are loaded eagerly.
+        """
+        for tool_name, index_entry in self.registry_store.index().items():
+            if self._tool_manager.get_tool(tool_name) is not None:
+                continue
+            if index_entry.get("parameters") is None:
+                self._resolve_persisted_tool(tool_name)
+                continue
+            self._tool_manager._tools[tool_name] = LazyTool.create(
+                name=tool_name,
+                description=index_entry.get("description", ""),
+                parameters=index_entry["parameters"],
+                loader=functools.partial(self._resolve_persisted_tool, tool_name),
+            )
+            self.tool_registry[tool_name] = index_entry
+        self.tools_loaded_persist = True
+        self._bump_registry_version()
+
+    def sync_shared_registry(self) -> bool:
+        """
+        Advertise the tools other worker processes added to the shared registry since the last
+        check. Cheap when nothing changed (one PRAGMA query). Returns True if the registry changed.
+        """
+        if not self.registry_store.changed():
+            return False
+        self.load_persisted_tools()
+        self._shared_registry_changed = True
+        return True
+
+    async def poll_shared_registry(self, interval: float = SHARED_REGISTRY_POLL_INTERVAL) -> None:
+        """
+        Sync the shared registry every `interval` seconds and send tools/list_changed to this
+        process's sessions when another worker changed it. Runs for the life of sse_app().
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.sync_shared_registry()
+                # Also covers changes a listing or call picked up since the last poll.
+                if self._shared_registry_changed:
+                    self._shared_registry_changed = False
+                    await self.notify_tools_list_changed()
+            except Exception as e:
+                logger.warning(f"Could not sync the shared tool registry: {e}")
+
+    def _resolve_persisted_tool(self, tool_name: str) -> Tool:
+        """Compile or import a persisted tool and install it in place of its lazy stub."""
+        tool_info = self.registry_store.get(tool_name)
+        if tool_info is None:
+            raise ValueError(f"Tool {tool_name} is not in the persisted registry.")
+        # Decide if we are using an imported function or the provided code.
+        code = tool_info.get("code") or (
+            self.module_store.read(tool_info["code_hash"]) if tool_info.get("code_hash") else None
+        )
+        if code:
+            func = self._load_tool_from_code(code, tool_name)
+        else:
+            func = self.lookup_tool_function(tool_info["func_name"])
+        if func is None:
+            raise ValueError(
+                f"Function {tool_info['func_name']} not found. Either send the code inline, or place the module on the server and update the mapping"
+            )
+        tool = Tool.from_function(
+            self.wrap_tool_function(func, tool_info.get("config", {}), tool_info.get("execution"), name=tool_name,
+                                    single_flight=self._single_flight_for(tool_name, tool_info.get("coalesce"), func)),
+            name=tool_name,
+            description=tool_info.get("description", ""),
+        )
+        self._tool_manager._tools[tool_name] = tool
+        self._bump_registry_version()
+        # Save metadata if available.
+        tool_info.setdefault("metadata", {})
+        self.tool_registry[tool_name] = tool_info
+        return tool
+
+    def add_tool_stub(self, stub: ToolStub) -> None:
+        """
+        Advertise a tool from its AST-derived stub (see mcp_server.tool_stubs) without importing
+        its module. The module is imported on the first call; the stub's admission limits and
+        result cache apply from registration, so the first calls are limited like the later ones.
+        """
+        if self._tool_manager.get_tool(stub.name) is not None:
+            return
+        options = dict(stub.options)
+        ExecutionPolicy.coerce(options.get("execution"), self.default_sync_execution)
+        result_cache = ResultCache.from_option(options.get("cache"), self.tool_result_cache_dir)
+        if result_cache is not None:
+            # add_tool receives the instance on import, so the cache and its stats carry over.
+            options["cache"] = self.result_caches[stub.name] = result_cache
+        self._set_tool_limiter(stub.name, options.get("max_concurrency"), options.get("max_queue", DEFAULT_MAX_QUEUE))
+        self._stub_options[stub.name] = (stub.options, options)
+        self._tool_manager._tools[stub.name] = LazyTool.create(
+            name=stub.name,
+            description=stub.description,
+            parameters=stub.parameters,
+            loader=functools.partial(self._import_stub_tool, stub, options),
+        )
+        self.tool_registry[stub.name] = {"name": stub.name, "description": stub.description, "module": stub.module}
+        self._bump_registry_version()
+
+    def _import_stub_tool(self, stub: ToolStub, options: Dict[str, Any]) -> Tool:
+        """Import the module behind a stub and return the tool it registers (or register it here)."""
+        module = importlib.import_module(stub.module)
+        tool = self._tool_manager._tools.get(stub.name)
+        if tool is not None and not isinstance(tool, LazyTool):
+            # A @tool decorator on this server registered it while the module was imported.
+            return tool
+        fn = getattr(module, stub.func_name, None)
+        if fn is None:
+            raise ValueError(f"Function {stub.func_name} not found in module {stub.module}.")
+        self.add_tool(fn, name=stub.name, description=stub.description, **options)
+        return self._tool_manager._tools[stub.name]
 
     def lookup_tool_function(self, func_name: str):
         """Lookup a tool function by name from known modules.
@@ -89,27 +312,21 @@ class ExtendedMCP(FastMCP):
     def _load_tool_from_code(self, code: str, tool_name: str):
         """Dynamically compile and load a tool function from source code.
            The code should define a function called 'dynamic_tool' (or similar).
+           Compiled code is looked up in the content-hash code cache first (see mcp_server.code_cache).
         """
-        local_scope = {}
         try:
-            exec(code, {}, local_scope)
             # Expect that the tool function is named f"{tool_name}_tool" or simply "dynamic_tool"
-            ret_value = local_scope.get(f"{tool_name}")
-            return ret_value
+            return self.code_cache.load_function(code, tool_name)
         except Exception as e:
             print(f"Error loading tool {tool_name} from code: {e}")
             return None
 
-    def _register_tool(self, name: str, func, description: str, config: Dict[str, Any]):
-        """Internal helper to register a tool with custom configuration."""
-        @self.tool(name=name, description=description)
-        def wrapped_tool(*args, context: Context, **kwargs):
-            # Inject custom configuration if provided.
-            if config:
-                for k, v in config.items():
-                    os.environ[k] = str(v)
-            return func(*args, **kwargs)
-        return wrapped_tool
+    def _register_tool(self, name: str, func, description: str, config: Dict[str, Any], execution: Optional[str] = None):
+        """Internal helper to register a tool with custom configuration.
+           The config is applied as a per-call environment overlay (see mcp_server.env_overlay).
+        """
+        self.add_tool(func, name=name, description=description, config=config, execution=execution)
+        return func
 
     def add_tool_dynamically(
         self,
@@ -120,12 +337,30 @@ class ExtendedMCP(FastMCP):
         persist: bool = False,
         code: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        execution: Optional[str] = None,
     ):
         """Dynamically add a new tool.
            If 'code' is provided, compile it to get the function.
-           If persist is True, the tool definition (including code and metadata if any)
-           is saved to a JSON file and the function code is appended to a persist_tools sub-package.
+           'execution' selects the execution policy ("inline", "thread" or "process") for sync tools.
+           If persist is True, the tool definition (including metadata if any) is saved to the
+           registry store and the code to the content-addressed module store. With shared state,
+           a tool that is not persisted is still published to the other workers, as an ephemeral entry.
         """
+        tool_entry = self._register_dynamic_tool(name, func_name, description, config, code, metadata, execution)
+        if persist or self.shared_state:
+            self._persist_tool_entries({name: tool_entry}, ephemeral=not persist)
+
+    def _register_dynamic_tool(
+        self,
+        name: str,
+        func_name: str,
+        description: str,
+        config: Optional[Dict[str, Any]] = None,
+        code: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        execution: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Compile (or look up) and register a dynamic tool. Returns its registry entry."""
         if not self.tools_loaded_persist:
             self.load_persisted_tools()
 
@@ -139,7 +374,7 @@ class ExtendedMCP(FastMCP):
             if func is None:
                 raise ValueError(f"Function {func_name} not found.")
         # Register the tool
-        self._register_tool(name, func, description, config)
+        self._register_tool(name, func, description, config, execution)
         # Build the tool entry.
         tool_entry = {
             "func_name": func_name,
@@ -148,67 +383,248 @@ class ExtendedMCP(FastMCP):
             "code": code or "",
             "metadata": metadata or {},
         }
+        if execution:
+            tool_entry["execution"] = execution
+        registered = self._tool_manager.get_tool(name)
+        if registered is not None:
+            # Stored in the index so the tool can be advertised on restart without compiling it.
+            tool_entry["parameters"] = registered.parameters
         self.tool_registry[name] = tool_entry
-        # Persist only if requested.
-        if persist:
-            # Write to persistence JSON file.
-            with open(TOOLS_PERSISTENCE_FILE, "w") as f:
-                json.dump(self.tool_registry, f, indent=2)
-            # Instead of appending the tool code to __init__.py, create a unique module for the tool.
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            persist_dir = os.path.join(base_dir, "tools", "persist_tools")
-            if not os.path.exists(persist_dir):
-                os.makedirs(persist_dir)
-            # Generate a unique module name using timestamp.
-            timestamp = int(time.time())
-            unique_module_name = f"{name}_{timestamp}.py"
-            persist_file = os.path.join(persist_dir, unique_module_name)
-            # Write the given code into the unique module file as is.
-            try:
-                with open(persist_file, "w") as f:
-                    f.write(f"# Auto-generated on {time.ctime(timestamp)}\n")
-                    f.write(code if code else f"# No code provided for tool {name}.\n")
-            except Exception as e:
-                print(f"Error writing tool code to {persist_file}: {e}")
+        return tool_entry
+
+    def _persist_tool_entries(self, entries: Dict[str, Dict[str, Any]], ephemeral: bool = False):
+        """
+        Persist several tool entries with one module store write and one registry write. Ephemeral
+        entries (non-persistent tools published to the other workers) keep their code inline.
+        """
+        persisted = {name: dict(entry) for name, entry in entries.items()}
+        sources = {} if ephemeral else {name: entry["code"] for name, entry in entries.items() if entry.get("code")}
+        previous = set()
+        if sources:
+            manifest = self.module_store.manifest()
+            previous = {manifest[name] for name in sources if name in manifest}
+            # The source goes to the content-addressed module store; the registry keeps its hash.
+            for name, digest in self.module_store.put_many(sources, release=False).items():
+                persisted[name]["code_hash"] = digest
+                persisted[name]["code"] = ""
+        # Append to the registry store (only tools that were asked to be persisted, or published).
+        self.registry_store.put_many(persisted, ephemeral=ephemeral)
+        # Only once the registry points at the new code may the modules it referenced before go.
+        if previous:
+            self.module_store.release(previous)
+
+    async def _precompile_sources(self, sources: List[str]) -> Dict[str, str]:
+        """
+        Compile sources that are not in the code cache yet in the process pool, in parallel, and
+        store the results in the cache. Returns source hash -> error message for sources that failed.
+        """
+        errors: Dict[str, str] = {}
+        pending = {}
+        for source in sources:
+            digest = source_hash(source)
+            if digest not in pending and not self.code_cache.is_cached(digest):
+                pending[digest] = source
+        if not pending or not self.code_cache.cache_dir:
+            return errors
+        loop = asyncio.get_running_loop()
+        pool = self.tool_executor._get_pool(ExecutionPolicy.PROCESS)
+        digests = list(pending)
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, compile_to_bytes, pending[d], "<dynamic_tool>") for d in digests),
+            return_exceptions=True,
+        )
+        for digest, result in zip(digests, results):
+            if isinstance(result, BaseException):
+                errors[digest] = str(result)
+            else:
+                self.code_cache.store_compiled(digest, result)
+        return errors
+
+    async def add_tools_bulk(self, definitions: List[Dict[str, Any]], persist: bool = False) -> List[Dict[str, Any]]:
+        """
+        Register many dynamic tools at once without blocking the event loop.
+
+        Each definition takes the keys of add_tool_dynamically (name, func_name, description, config,
+        persist, code, metadata, execution); 'persist' defaults to the `persist` argument. Sources are
+        compiled in parallel in the process pool, registration runs in a worker thread, the persisted
+        entries are written once and connected clients get a single tools/list_changed notification.
+
+        Returns one {"name", "status", "message"} result per definition, in order.
+        """
+        results: List[Dict[str, Any]] = [{} for _ in definitions]
+        compile_errors = await self._precompile_sources([d["code"] for d in definitions if d.get("code")])
+
+        def register_all() -> None:
+            to_persist, to_publish = {}, {}
+            for i, definition in enumerate(definitions):
+                name = definition.get("name")
+                try:
+                    if not name:
+                        raise ValueError("Tool definition without a name.")
+                    code = definition.get("code") or None
+                    if code and source_hash(code) in compile_errors:
+                        raise ValueError(f"Unable to compile tool code: {compile_errors[source_hash(code)]}")
+                    entry = self._register_dynamic_tool(
+                        name,
+                        definition.get("func_name", ""),
+                        definition.get("description", ""),
+                        definition.get("config"),
+                        code,
+                        definition.get("metadata"),
+                        definition.get("execution"),
+                    )
+                    if definition.get("persist", persist):
+                        to_persist[name] = entry
+                        to_publish.pop(name, None)
+                    elif self.shared_state:
+                        to_publish[name] = entry
+                        to_persist.pop(name, None)
+                    results[i] = {"name": name, "status": "success", "message": f"Tool {name} added."}
+                except Exception as e:
+                    results[i] = {"name": name, "status": "error", "message": str(e)}
+            for entries, ephemeral in ((to_persist, False), (to_publish, True)):
+                if not entries:
+                    continue
+                try:
+                    self._persist_tool_entries(entries, ephemeral=ephemeral)
+                except Exception as e:
+                    for result in results:
+                        if result.get("name") in entries:
+                            result.update(status="error", message=f"Tool registered but not persisted: {e}")
+
+        await asyncio.to_thread(register_all)
+        if any(result["status"] == "success" for result in results):
+            await self.notify_tools_list_changed()
+        return results
+
+    async def notify_tools_list_changed(self) -> int:
+        """Send notifications/tools/list_changed to every connected session. Returns the number reached."""
+        return await self._mcp_server.broadcast(lambda session: session.send_tool_list_changed())
+
+    def gc_persisted_modules(self):
+        """Delete persisted tool modules that no registered tool name references any more."""
+        return self.module_store.gc()
 
     def sse_app(self):
         """This is going to add some extra paths to the Starlette app, with underlying mechanism"""
-        app = super().sse_app()
+        sse = self._sse_transport = SseServerTransport(self.settings.message_path)
+
+        async def handle_sse(request: Request) -> None:
+            # Captured once per connection; the client's x-session-id (if any) becomes the session id.
+            connection_state.set(SessionState.from_scope(request.scope))
+            async with sse.connect_sse(
+                request.scope,
+                request.receive,
+                request._send,  # type: ignore[reportPrivateUsage]
+            ) as streams:
+                await self._mcp_server.run(
+                    streams[0],
+                    streams[1],
+                    self._mcp_server.create_initialization_options(),
+                )
+
+        routes = [
+            Route(self.settings.sse_path, endpoint=handle_sse),
+            Mount(self.settings.message_path, app=self._traced_post_message(sse)),
+        ]
+        if self.streamable_http_path:
+            routes.append(self._streamable_http_route())
+        app = Starlette(debug=self.settings.debug, routes=routes,
+                        lifespan=self._shared_registry_lifespan if self.shared_state else None)
         app.add_middleware(ContextMiddleware)
         self.append_extra_routes(app)
         return app
+
+    @asynccontextmanager
+    async def _shared_registry_lifespan(self, app: Starlette) -> AsyncIterator[None]:
+        poller = asyncio.create_task(self.poll_shared_registry())
+        try:
+            yield
+        finally:
+            poller.cancel()
+            await asyncio.gather(poller, return_exceptions=True)
+
+    def _streamable_http_route(self, json_response: bool = True) -> Route:
+        # The transport is an ASGI app, which Route calls as is; it answers GET with 405 and DELETE ends a session.
+        return Route(self.streamable_http_path or DEFAULT_STREAMABLE_HTTP_PATH,
+                     endpoint=StatelessHTTPTransport(self._mcp_server, json_response, self.session_config_store),
+                     methods=["GET", "POST", "DELETE"])
+
+    def streamable_http_app(self, json_response: bool = True):
+        """
+        Starlette app serving only the stateless streamable-HTTP endpoint (see mcp_server.stateless_http),
+        with the extra routes and ContextMiddleware. json_response=False answers with an event stream
+        carrying the requests' notifications before their responses.
+        """
+        app = Starlette(debug=self.settings.debug, routes=[self._streamable_http_route(json_response)])
+        app.add_middleware(ContextMiddleware)
+        self.append_extra_routes(app)
+        return app
+
+    async def run_streamable_http_async(self) -> None:
+        """Run the server with only the stateless streamable-HTTP transport."""
+        import uvicorn
+
+        config = uvicorn.Config(
+            self.streamable_http_app(),
+            host=self.settings.host,
+            port=self.settings.port,
+            log_level=self.settings.log_level.lower(),
+        )
+        await uvicorn.Server(config).serve()
     
-    async def create_context(self, request) -> Context:
-        # Call the base method to create the default context.
-        context = await super().create_context(request)  # type: ignore
-        session_context = context.request_context.session
-
-        # Capture incoming headers from the request.
-        if request.headers:
-            session_context.headers = dict(request.headers)
-        
-        # If a session id is provided in the headers, use it; otherwise, generate a new one.
-        session_id = session_context.headers.get("x-session-id")
-        if not session_id:
-            session_id = str(uuid.uuid4())
-            # Optionally, you may update the headers with the new session id.
-            session_context.headers["x-session-id"] = session_id
-        
-        # Store the session id in the session context.
-        session_context.session_id = session_id
-        
-        # Optionally, you can extract query parameters or any other data from the request.
-        if hasattr(request, "query_params"):
-            session_context.query_params = dict(request.query_params)
-        
-        # Here you can set any additional variables that you want available for a particular tool call.
-        # For example, you might want to extract a custom header:
-        custom_value = session_context.headers.get("x-custom-variable")
-        if custom_value:
-            session_context.custom_variable = custom_value
+    def _traced_post_message(self, sse: SseServerTransport):
+        """The transport's POST endpoint, traced as "mcp.transport.receive" when tracing is on."""
+        if not self.tracer.enabled:
+            return sse.handle_post_message
+
+        async def handle_post_message(scope, receive, send):
+            session_id = Request(scope).query_params.get("session_id")
+            with self.tracer.span("mcp.transport.receive", {"transport_session_id": session_id}):
+                await sse.handle_post_message(scope, receive, send)
+        return handle_post_message
 
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        """Call a tool by name with arguments; traces context creation, the call and result conversion."""
+        if self.shared_state and self._tool_manager.get_tool(name) is None:
+            self.sync_shared_registry()
+        tracer = self.tracer
+        if not tracer.enabled:
+            return await super().call_tool(name, arguments)
+        with tracer.span("mcp.create_context"):
+            context = self.get_context()
+        with tracer.span("mcp.tool.run", {"tool": name}):
+            token = _tool_run_started.set(time.time_ns())
+            try:
+                result = await self._tool_manager.call_tool(name, arguments, context=context)
+            finally:
+                _tool_run_started.reset(token)
+        with tracer.span("mcp.serialize"):
+            return _convert_to_content(result)
+
+    async def create_context(self, request) -> Context:
+        """
+        Return the current request context. Connection data (headers, query parameters, session id)
+        lives in the SessionState attached to the session when it was created, exposed as
+        context.request_context.session.state; it is only built here for sessions without one.
+        """
+        context = self.get_context()
+        self.session_state_of(context.request_context.session, request)
         return context
 
+    @staticmethod
+    def session_state_of(session: Any, request: Any = None) -> SessionState:
+        """The SessionState of `session`, created from `request` (or empty) on first use."""
+        state = getattr(session, "state", None)
+        if state is None:
+            scope = getattr(request, "scope", None)
+            state = SessionState.from_scope(scope) if scope is not None else SessionState()
+            if getattr(session, "session_id", None):
+                state.session_id = session.session_id
+            session.state = state
+            session.session_id = state.session_id
+        return state
+
     def route(self, path: str, methods=["GET"]):
         """
         Decorator that adds a new HTTP route to the given MCP instance.
@@ -233,67 +649,38 @@ class ExtendedMCP(FastMCP):
             else:
                 return ErrorData(code=INVALID_REQUEST, message="Invalid config format")
         if method == "client/session_config":
-            session_id = context.request_id
             if not isinstance(params, dict):
                 return give_result("Invalid config format")
 
-            self.session_config_store[str(session_id)] = params
             context.session.config = params
+            invalidate_session_env(context.session)
+            self._store_session_config(context.session, params)
         return give_result("success")
     
     
-    # Currently we are handling on progress notification. We are not handling anything else.
-    async def handle_session_config_notification(self, context: Context, notification: ProgressNotification) -> None:
+    async def handle_session_config_notification(self, notification: ProgressNotification) -> None:
         """
-        Notification handler for session configuration.
-    
-        Expects a ConfigNotification with method "client/session_config" and a dict of parameters.
-        If valid, updates (or appends) the session configuration in the underlying session context.
-        """
-        # Extract method and parameters. If notification.params is a ConfigNotificationParams instance,
-        # call .dict() to convert it to a dict.
-        method = notification.method
-        params = notification.params.dict() if hasattr(notification.params, "dict") else notification.params
+        Notification handler for in-band session configuration changes.
 
-        if method != "client/session_config":
-            await context.error(f"Unexpected method {method} in session config notification.")
+        Clients send a notifications/progress whose progressToken is SESSION_CONFIG_TOKEN and whose
+        extra params are the config to merge into the session's config (e.g. {"env_config": {...}}).
+        The change applies to the session's next requests without a new handshake. Other progress
+        notifications are ignored.
+        """
+        params = notification.params
+        if params.progressToken != SESSION_CONFIG_TOKEN:
             return
-
-        if not isinstance(params, dict):
-            await context.error("Invalid config format in session config notification; expected dict.")
+        session = notifying_session.get()
+        if session is None:
             return
-
-        # Get current session configuration from the context; update or assign anew.
-        current_config = getattr(context.session, "config", {}) or {}
-        if not isinstance(current_config, dict):
-            current_config = {}
-        current_config.update(params)
-        
-        # Optionally, store the configuration in the server's session_config_store.
-        self.session_config_store[str(context.request_id)] = current_config
-        
-        await context.info(f"Session config updated for request {context.request_id}: {current_config}")
-
-    # In __init__ or appropriate setup add the handler to notification_handlers:
-    # self.notification_handlers[<NotificationType>] = self.handle_session_config_notification
-    # For example, if using the "session/config" method for notifications, you can assign a dummy type:
-    # self.notification_handlers["session/config"] = self.handle_session_config_notification
-
-
-    # async def handle_notification2(self, context: RequestContext, method: str, params: Any):
-    #     if method == "session/config":
-    #         session_id = context.request_id
-    #         if not isinstance(params, dict):
-    #             return ErrorData(code=INVALID_REQUEST, message="Invalid config format")
-
-    #         self.session_config_store[session_id] = params
-    #         context.session.config = params  # optionally make it available through context
-    #         print(f"Stored config for session {session_id}: {params}")
-    #         return
-
-        # return await super().handle_notification(context, method, params)
-
-
+        update = params.model_extra or {}
+        current_config = getattr(session, "config", None)
+        current_config = dict(current_config) if isinstance(current_config, dict) else {}
+        current_config.update(update)
+        session.config = current_config  # type: ignore[attr-defined]
+        invalidate_session_env(session)
+        self._store_session_config(session, current_config)
+        logger.debug(f"Session config updated for session {self.session_id_of(session)}: {sorted(update)}")
 
     def append_extra_routes(self, app: Starlette):
         """Append extra routes stored by the route decorator to the Starlette app."""
@@ -301,71 +688,506 @@ class ExtendedMCP(FastMCP):
             app.router.routes.append(Route(path, info["fn"], methods=info["methods"]))
             
             
-    def wrap_tool_function(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+    def _current_session_env(self) -> Mapping[str, str]:
+        """Return the parsed env_config of the session that issued the current request."""
+        try:
+            session = self._mcp_server.request_context.session
+        except LookupError:
+            return EMPTY_ENV
+        return session_env(session)
+
+    def _resolve_execution(self, fn: Callable[..., Any], execution: Optional[str]) -> ExecutionPolicy:
+        """Validate the execution policy requested for fn."""
+        if asyncio.iscoroutinefunction(fn) or inspect.isasyncgenfunction(fn):
+            policy = ExecutionPolicy.coerce(execution, ExecutionPolicy.INLINE)
+            if policy is not ExecutionPolicy.INLINE:
+                raise ValueError(f"Async tool {fn.__name__} must use the inline execution policy, got {policy.value!r}.")
+            return policy
+        policy = ExecutionPolicy.coerce(execution, self.default_sync_execution)
+        if policy is ExecutionPolicy.PROCESS:
+            if _takes_context(fn):
+                raise ValueError(f"Tool {fn.__name__} takes a Context and cannot run in a process pool.")
+            if not is_picklable(fn):
+                # Functions exec'd from source have no importable module to be pickled by reference.
+                logger.warning(f"Tool {fn.__name__} cannot be sent to a process pool; running it in the thread pool instead.")
+                policy = ExecutionPolicy.THREAD
+            elif inspect.isgeneratorfunction(fn):
+                # A generator cannot be resumed across processes, chunk by chunk.
+                logger.warning(f"Generator tool {fn.__name__} cannot run in a process pool; running it in the thread pool instead.")
+                policy = ExecutionPolicy.THREAD
+        return policy
+
+    def wrap_tool_function(
+        self,
+        fn: Callable[..., Any],
+        config: Optional[Dict[str, Any]] = None,
+        execution: Optional[str] = None,
+        cache: Optional[ResultCache] = None,
+        name: Optional[str] = None,
+        single_flight: Optional[SingleFlight] = None,
+        aggregate: Optional[str] = None,
+    ) -> Callable[..., Any]:
         """
-        Returns a wrapped version of fn that, when invoked with a context,
-        injects environment variables from the client's env_config and restores them afterward.
+        Returns a wrapped version of fn that, when invoked within a request, exposes the client's
+        env_config (layered over the tool's own `config`) through the per-call environment overlay.
+        Tools read these values with mcp_server.env_overlay.get_env; os.environ is never modified,
+        so concurrent calls from different sessions cannot see each other's values.
+
+        Sync tools are dispatched according to their execution policy (see mcp_server.executors):
+        with "thread" or "process" the returned wrapper is a coroutine function, so the event loop
+        is never blocked by the tool body.
+
+        With a `cache`, results are looked up by the call arguments and the effective env overlay
+        (`name` is the tool name used in the key) before the tool runs. With a `single_flight`,
+        identical calls that arrive while one is running wait for it instead of running again;
+        this applies to coroutine wrappers only, since inline sync calls never overlap on the loop.
+
+        Sync and async generator tools stream every chunk to the caller as it is produced and
+        return the chunks combined according to `aggregate` (see mcp_server.streaming).
         """
-        if asyncio.iscoroutinefunction(fn):
+        tool_env = freeze_env_config(config)
+        policy = self._resolve_execution(fn, execution)
+
+        if inspect.isasyncgenfunction(fn) or inspect.isgeneratorfunction(fn):
+            wrapper = self._streaming_wrapper(fn, tool_env, policy, name or fn.__name__, aggregate)
+        elif asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
             async def async_wrapper(*args, **kwargs):
-                context: Optional[Context] = kwargs.get("context")
-                old_env = {}
-                env_config = {}
-                if context is not None and hasattr(context.session, "config"):
-                    session_config = context.session.config
-                    if isinstance(session_config, dict):
-                        env_config = session_config.get("env_config", {})
-                # Pre-call: set env variables from env_config.
-                for key, value in env_config.items():
-                    if key in os.environ:
-                        old_env[key] = os.environ[key]
-                    os.environ[key] = str(value)
-                try:
-                    result = await fn(*args, **kwargs)
-                finally:
-                    # Post-call: restore the original environment.
-                    for key in env_config.keys():
-                        if key in old_env:
-                            os.environ[key] = old_env[key]
-                        else:
-                            os.environ.pop(key, None)
-                return result
-            return async_wrapper
-        else:
+                with env_overlay(merge_env(tool_env, self._current_session_env())), self.tracer.span("mcp.tool.body"):
+                    return await fn(*args, **kwargs)
+            wrapper = async_wrapper
+        elif policy is ExecutionPolicy.INLINE:
+            @functools.wraps(fn)
             def sync_wrapper(*args, **kwargs):
-                context: Optional[Context] = kwargs.get("context")
-                old_env = {}
-                env_config = {}
-                if context is not None and hasattr(context.session, "config"):
-                    session_config = context.session.config
-                    if isinstance(session_config, dict):
-                        env_config = session_config.get("env_config", {})
-                # Pre-call: set environment variables.
-                for key, value in env_config.items():
-                    if key in os.environ:
-                        old_env[key] = os.environ[key]
-                    os.environ[key] = str(value)
+                with env_overlay(merge_env(tool_env, self._current_session_env())), self.tracer.span("mcp.tool.body"):
+                    return fn(*args, **kwargs)
+            wrapper = sync_wrapper
+        else:
+            @functools.wraps(fn)
+            async def offloaded_wrapper(*args, **kwargs):
+                env = merge_env(tool_env, self._current_session_env())
+                with self.tracer.span("mcp.tool.body", {"execution": policy.value}):
+                    return await self.tool_executor.run(policy, fn, env, args, kwargs)
+            wrapper = offloaded_wrapper
+
+        if not asyncio.iscoroutinefunction(wrapper):
+            single_flight = None
+        if cache is not None or single_flight is not None:
+            wrapper = self._with_call_sharing(wrapper, name or fn.__name__, tool_env, cache, single_flight)
+        return self._with_metrics(wrapper, name or fn.__name__)
+
+    def _chunk_sender(self, tool_name: str) -> Optional[ChunkSender]:
+        """Where the chunks of the current call go, or None outside of a request."""
+        try:
+            context = self._mcp_server.request_context
+        except LookupError:
+            return None
+        progress_token = context.meta.progressToken if context.meta is not None else None
+        return chunk_sender(context.session, tool_name, progress_token)
+
+    def _streaming_wrapper(self, fn: Callable[..., Any], tool_env: Mapping[str, str], policy: ExecutionPolicy,
+                           tool_name: str, aggregate: Optional[str]) -> Callable[..., Any]:
+        """Coroutine wrapper running a generator tool, streaming its chunks and returning their aggregate."""
+        ChunkAggregator(aggregate)  # Reject an invalid mode at registration.
+
+        @functools.wraps(fn)
+        async def streaming_wrapper(*args, **kwargs):
+            env = merge_env(tool_env, self._current_session_env())
+            send = self._chunk_sender(tool_name)
+            aggregator = ChunkAggregator(aggregate)
+            with self.tracer.span("mcp.tool.body", {"execution": policy.value, "streaming": True}) as span:
+                if inspect.isasyncgenfunction(fn):
+                    with env_overlay(env):
+                        chunks = fn(*args, **kwargs)
+                        try:
+                            async for chunk in chunks:
+                                if send is not None:
+                                    await send(aggregator.count, chunk)
+                                aggregator.add(chunk)
+                        finally:
+                            await chunks.aclose()
+                else:
+                    chunks = fn(*args, **kwargs)
+                    try:
+                        while True:
+                            # Each step runs in the worker thread (or inline), with the env overlay.
+                            chunk = await self.tool_executor.run(policy, next, env, (chunks, _END_OF_CHUNKS), {})
+                            if chunk is _END_OF_CHUNKS:
+                                break
+                            if send is not None:
+                                await send(aggregator.count, chunk)
+                            aggregator.add(chunk)
+                    finally:
+                        chunks.close()
+                if span is not None:
+                    span.set_attribute("chunks", aggregator.count)
+            return aggregator.result()
+        return streaming_wrapper
+
+    def _trace_validation(self) -> None:
+        # Time between the tool manager starting the call and the wrapper being entered.
+        started = _tool_run_started.get()
+        if started is not None:
+            self.tracer.record("mcp.validate_arguments", started)
+
+    def _with_metrics(self, wrapper: Callable[..., Any], tool_name: str) -> Callable[..., Any]:
+        """
+        Count calls, errors and in-flight calls of `wrapper` and record its latency. With tracing on,
+        argument validation and the wrapper layers (cache, coalescing, env injection) get spans too.
+        """
+        metrics = self.tool_metrics
+        tracer = self.tracer
+
+        if asyncio.iscoroutinefunction(wrapper):
+            @functools.wraps(wrapper)
+            async def timed_async_wrapper(*args, **kwargs):
+                if tracer.enabled:
+                    self._trace_validation()
+                metrics.started(tool_name)
+                start = time.perf_counter()
+                failed = True
                 try:
-                    result = fn(*args, **kwargs)
+                    with tracer.span("mcp.tool.wrapper"):
+                        result = await wrapper(*args, **kwargs)
+                    failed = False
+                    return result
                 finally:
-                    # Post-call: restore original environment.
-                    for key in env_config.keys():
-                        if key in old_env:
-                            os.environ[key] = old_env[key]
-                        else:
-                            os.environ.pop(key, None)
+                    metrics.finished(tool_name, time.perf_counter() - start, failed)
+            return timed_async_wrapper
+
+        @functools.wraps(wrapper)
+        def timed_sync_wrapper(*args, **kwargs):
+            if tracer.enabled:
+                self._trace_validation()
+            metrics.started(tool_name)
+            start = time.perf_counter()
+            failed = True
+            try:
+                with tracer.span("mcp.tool.wrapper"):
+                    result = wrapper(*args, **kwargs)
+                failed = False
                 return result
-            return sync_wrapper
+            finally:
+                metrics.finished(tool_name, time.perf_counter() - start, failed)
+        return timed_sync_wrapper
+
+    def _with_call_sharing(self, wrapper: Callable[..., Any], tool_name: str, tool_env: Mapping[str, str],
+                           cache: Optional[ResultCache], single_flight: Optional[SingleFlight]) -> Callable[..., Any]:
+        """
+        Serve calls of `wrapper` from `cache` and/or coalesce identical concurrent calls through
+        `single_flight`, both keyed by the arguments and the effective env overlay.
+        """
+        def key_of(args, kwargs):
+            return call_key(tool_name, args, kwargs, merge_env(tool_env, self._current_session_env()))
 
-    def add_tool(self, fn: Callable[..., Any], name: Optional[str]=None, description: Optional[str] = None):
+        if asyncio.iscoroutinefunction(wrapper):
+            @functools.wraps(wrapper)
+            async def shared_async_wrapper(*args, **kwargs):
+                key = key_of(args, kwargs)
+                if cache is not None:
+                    value = cache.get(key)
+                    if not cache.missing(value):
+                        return value
+                if single_flight is not None:
+                    value = await single_flight.do(key, lambda: wrapper(*args, **kwargs))
+                else:
+                    value = await wrapper(*args, **kwargs)
+                if cache is not None:
+                    cache.put(key, value)
+                return value
+            return shared_async_wrapper
+
+        assert cache is not None
+        @functools.wraps(wrapper)
+        def cached_sync_wrapper(*args, **kwargs):
+            key = key_of(args, kwargs)
+            value = cache.get(key)
+            if cache.missing(value):
+                value = wrapper(*args, **kwargs)
+                cache.put(key, value)
+            return value
+        return cached_sync_wrapper
+
+    def tool(self, name: Optional[str] = None, description: Optional[str] = None, **options: Any):
+        """
+        Decorator to register a tool. Accepts the same extra keyword options as add_tool,
+        e.g. @mcp.tool(execution="process").
+        """
+        if callable(name):
+            raise TypeError(
+                "The @tool decorator was used incorrectly. "
+                "Did you forget to call it? Use @tool() instead of @tool"
+            )
+
+        def decorator(fn):
+            self.add_tool(fn, name=name, description=description, **options)
+            return fn
+        return decorator
+
+    def add_tool(
+        self,
+        fn: Callable[..., Any],
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        config: Optional[Dict[str, Any]] = None,
+        execution: Optional[str] = None,
+        cache: Any = None,
+        coalesce: Optional[bool] = None,
+        max_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = DEFAULT_MAX_QUEUE,
+        aggregate: Optional[str] = None,
+    ):
         """
         Wrap the tool function to inject environment configuration on each call, and then use the
         default add_tool mechanism from the underlying ToolManager.
+
+        Parameters:
+            config: Static environment values for this tool, overridden by the session's env_config.
+            execution: "inline", "thread" or "process" for sync tools (defaults to default_sync_execution).
+            cache: Opt-in result cache for idempotent tools: True, a TTL in seconds, a dict such as
+                   {"ttl": 30, "max_size": 512, "disk": True} or a ResultCache (see mcp_server.result_cache).
+            coalesce: Share one execution between identical concurrent calls with the same env
+                      overlay (defaults to coalesce_tool_calls, off by default). Only for idempotent
+                      tools; tools that take a Context or stream chunks never coalesce.
+            max_concurrency: Maximum number of concurrent calls of this tool; further calls wait in a
+                             queue of at most `max_queue` (None for unbounded), beyond which they are
+                             rejected with a SERVER_OVERLOADED error (see mcp_server.admission).
+            aggregate: For generator tools, how the streamed chunks make up the final result:
+                       "concat" (default), "list", "last" or "none" (see mcp_server.streaming).
         """
+        tool_name = name or fn.__name__
+        stub_options = self._stub_options.pop(tool_name, None)
+        if stub_options is not None and cache is not None and cache == stub_options[0].get("cache"):
+            # The module's own decorator registers the tool its stub advertised, with the cache option
+            # the stub was read from: keep the cache the stub set up, and the results it holds.
+            cache = stub_options[1].get("cache")
+        result_cache = ResultCache.from_option(cache, self.tool_result_cache_dir)
+        if tool_name in self._tool_manager._tools:
+            # FastMCP keeps the first tool of a name and ignores later ones; a re-registration (or the
+            # real registration of an advertised stub) replaces it instead, so the process serves the
+            # code that was registered, and persisted, last.
+            del self._tool_manager._tools[tool_name]
+            previous_cache = self.result_caches.pop(tool_name, None)
+            if previous_cache is not None and previous_cache is not result_cache:
+                previous_cache.clear()
+        single_flight = self._single_flight_for(tool_name, coalesce, fn)
         # Wrap the function:
-        wrapped_fn = self.wrap_tool_function(fn)
+        wrapped_fn = self.wrap_tool_function(fn, config, execution, result_cache, tool_name, single_flight, aggregate)
         # Call the base (or underlying tool manager) add_tool:
         super().add_tool(wrapped_fn, name=name, description=description)
         # Optionally, update your local tool registry.
         self.tool_registry[name] = {"name": name, "description": description} #type: ignore
+        self._bump_registry_version()
+        if result_cache is not None:
+            self.result_caches[tool_name] = result_cache
+        self._set_tool_limiter(tool_name, max_concurrency, max_queue)
+
+    def _set_tool_limiter(self, tool_name: str, max_concurrency: Optional[int], max_queue: Optional[int]) -> None:
+        """Install (or drop) the tool's limiter, keeping an existing one with the same limits and its queue."""
+        if not max_concurrency:
+            self.tool_limiters.pop(tool_name, None)
+            return
+        limiter = self.tool_limiters.get(tool_name)
+        if limiter is None or (limiter.limit, limiter.max_queue) != (max_concurrency, max_queue):
+            self.tool_limiters[tool_name] = ConcurrencyLimiter(f"tool {tool_name}", max_concurrency, max_queue)
+
+    def _install_admission_control(self) -> None:
+        """
+        Put the per-tool and global concurrency limiters in front of the tools/call handler.
+        Rejections are raised as McpError so the client receives a JSON-RPC error response
+        rather than a tool result with isError set.
+        """
+        call_tool = self._mcp_server.request_handlers[CallToolRequest]
+
+        async def admitted_call_tool(req: CallToolRequest):
+            tool_limiter = self.tool_limiters.get(req.params.name)
+            if tool_limiter is None and self.global_limiter is None:
+                return await call_tool(req)
+            async with AsyncExitStack() as stack:
+                if tool_limiter is not None:
+                    await stack.enter_async_context(tool_limiter.slot())
+                if self.global_limiter is not None:
+                    await stack.enter_async_context(self.global_limiter.slot())
+                return await call_tool(req)
+
+        self._mcp_server.request_handlers[CallToolRequest] = admitted_call_tool
+
+    def _bump_registry_version(self) -> None:
+        self.registry_version = f"{self._registry_epoch}-{next(self._registry_changes)}"
+
+    def _install_listing_cache(self) -> None:
+        """Serve tools/prompts/resources listings from per-version, pre-serialized responses."""
+        listings = (
+            (ListToolsRequest, "tools", self.list_tools),
+            (ListPromptsRequest, "prompts", self.list_prompts),
+            (ListResourcesRequest, "resources", self.list_resources),
+            (ListResourceTemplatesRequest, "resourceTemplates", self.list_resource_templates),
+        )
+        for request_type, key, build in listings:
+            self._mcp_server.request_handlers[request_type] = self._listing_handler(key, build)
+
+    def _listing_handler(self, key: str, build: Callable[[], Awaitable[List[Any]]]):
+        async def handler(req: Any) -> PreserializedResult:
+            if self.shared_state and key == "tools":
+                self.sync_shared_registry()
+            version = self.registry_version
+            meta = req.params.meta if req.params is not None else None
+            if meta is not None and (meta.model_extra or {}).get(REGISTRY_VERSION_META) == version:
+                return PreserializedResult({key: [], "_meta": {REGISTRY_VERSION_META: version, "notModified": True}})
+            cached = self._listings.get(key)
+            if cached is None or cached[0] != version:
+                items = await build()
+                payload = {
+                    key: [item.model_dump(by_alias=True, mode="json", exclude_none=True) for item in items],
+                    "_meta": {REGISTRY_VERSION_META: version},
+                }
+                # Stored under the version read before building, so a concurrent change forces a rebuild.
+                cached = self._listings[key] = (version, PreserializedResult(payload))
+            return cached[1]
+        return handler
+
+    def add_prompt(self, prompt) -> None:
+        super().add_prompt(prompt)
+        self._bump_registry_version()
+
+    def add_resource(self, resource) -> None:
+        super().add_resource(resource)
+        self._bump_registry_version()
+
+    def resource(self, uri: str, cache: Any = None, **kwargs: Any):
+        """
+        FastMCP.resource, also bumping the registry version for resource templates. `cache` takes
+        the values of add_tool's and caches what the function returns by URI parameters and env
+        overlay; its stats are reported as "resource <uri>".
+        """
+        register = super().resource(uri, **kwargs)
+
+        def decorator(fn):
+            result_cache = ResultCache.from_option(cache, self.tool_result_cache_dir)
+            if result_cache is None:
+                register(fn)
+            else:
+                cache_name = f"resource {uri}"
+                register(self._with_call_sharing(fn, cache_name, EMPTY_ENV, result_cache, None))
+                self.result_caches[cache_name] = result_cache
+            self._bump_registry_version()
+            return fn
+        return decorator
 
+    def session_id_of(self, session: Any) -> str:
+        """The id SessionTrackingServer (or create_context) assigned to `session`."""
+        return getattr(session, "session_id", None) or self.session_state_of(session).session_id
+
+    def _restore_session_state(self, session: Any) -> None:
+        """
+        on_session_opened callback: give a session the config its transport found under the
+        server-issued session id it presented (see mcp_server.stateless_http). Client-chosen ids
+        such as x-session-id never select stored config.
+        """
+        config = session.state.stored_config
+        if isinstance(config, dict):
+            session.config = dict(config)
+
+    def _store_session_config(self, session: Any, config: Dict[str, Any]) -> None:
+        """Keep a session's config for its next requests, if the server issued the session its id."""
+        state = self.session_state_of(session)
+        if state.server_issued:
+            self.session_config_store[state.session_id] = config
+
+    def session_store_stats(self) -> Dict[str, Any]:
+        """Return size and eviction counters of the session config store."""
+        return self.session_config_store.stats()
+
+    def result_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return hit/miss and eviction counters of every result cache, by tool name (or "resource <uri>")."""
+        return {name: cache.stats() for name, cache in self.result_caches.items()}
+
+    def _single_flight_for(self, tool_name: str, coalesce: Optional[bool], fn: Callable[..., Any]) -> Optional[SingleFlight]:
+        """
+        A new SingleFlight for the tool, or None if it does not coalesce. Tools that take a Context
+        or stream chunks never do: their log messages, progress and chunks go to the session that
+        started the call, so the sessions sharing its result would not get theirs.
+        """
+        enabled = self.coalesce_tool_calls if coalesce is None else coalesce
+        if enabled and (_takes_context(fn) or inspect.isgeneratorfunction(fn) or inspect.isasyncgenfunction(fn)):
+            if coalesce:
+                logger.warning(f"Tool {tool_name} takes a Context or streams chunks; its calls are not coalesced.")
+            enabled = False
+        if not enabled:
+            self.single_flights.pop(tool_name, None)
+            return None
+        single_flight = self.single_flights[tool_name] = SingleFlight()
+        return single_flight
+
+    def coalescing_stats(self) -> Dict[str, Dict[str, int]]:
+        """Return, by tool name, how many calls executed and how many were coalesced into a running one."""
+        return {name: flight.stats() for name, flight in self.single_flights.items()}
+
+    def admission_stats(self) -> Dict[str, Any]:
+        """Return active calls, queue depth, rejections and wait times of the concurrency limiters."""
+        return {
+            "global": self.global_limiter.stats() if self.global_limiter is not None else None,
+            "tools": {name: limiter.stats() for name, limiter in self.tool_limiters.items()},
+        }
+
+    def render_metrics(self) -> str:
+        """Render tool, session, queue and pool metrics in the Prometheus text format."""
+        out = PrometheusText()
+        tools = self.tool_metrics.snapshot()
+        out.family("mcp_tool_calls_total", "counter", "Completed tool calls.",
+                   (({"tool": name}, t["calls"]) for name, t in tools.items()))
+        out.family("mcp_tool_errors_total", "counter", "Tool calls that raised an exception.",
+                   (({"tool": name}, t["errors"]) for name, t in tools.items()))
+        out.family("mcp_tool_in_flight", "gauge", "Tool calls currently running.",
+                   (({"tool": name}, t["in_flight"]) for name, t in tools.items()))
+        out.histogram("mcp_tool_latency_seconds", "Tool call latency.",
+                      (({"tool": name}, t["latency_buckets"], t["latency_sum"]) for name, t in tools.items()))
+
+        sessions = list(self._mcp_server.sessions)
+        out.family("mcp_sessions", "gauge", "Connected MCP sessions.", [({}, len(sessions))])
+        out.family("mcp_session_requests_in_flight", "gauge", "Client requests being processed, over all sessions.",
+                   [({}, sum(len(getattr(session, "_in_flight", ())) for session in sessions))])
+        if self._sse_transport is not None:
+            writers = list(self._sse_transport._read_stream_writers.values())
+            out.family("mcp_sse_connections", "gauge", "Open SSE connections.", [({}, len(writers))])
+            out.family("mcp_sse_pending_messages", "gauge", "Posted client messages waiting for their session to read them.",
+                       [({}, sum(writer.statistics().tasks_waiting_send for writer in writers))])
+
+        pools = self.executor_stats()
+        out.family("mcp_executor_queued", "gauge", "Tool jobs waiting for a pool worker.",
+                   (({"pool": pool}, stats["queued"]) for pool, stats in pools.items()))
+        out.family("mcp_executor_running", "gauge", "Tool jobs running in a pool worker.",
+                   (({"pool": pool}, stats["running"]) for pool, stats in pools.items()))
+
+        limiters = dict(self.admission_stats()["tools"])
+        if self.global_limiter is not None:
+            limiters["*"] = self.global_limiter.stats()
+        out.family("mcp_admission_queued", "gauge", "Tool calls waiting for a concurrency slot.",
+                   (({"tool": name}, stats["queued"]) for name, stats in limiters.items()))
+        out.family("mcp_admission_rejected_total", "counter", "Tool calls rejected because the wait queue was full.",
+                   (({"tool": name}, stats["rejected"]) for name, stats in limiters.items()))
+        out.family("mcp_admission_wait_seconds_total", "counter", "Time tool calls spent waiting for a concurrency slot.",
+                   (({"tool": name}, stats["wait_time_total"]) for name, stats in limiters.items()))
+        return out.render()
+
+    async def metrics_endpoint(self, request: Request) -> Response:
+        """The /metrics route."""
+        return Response(self.render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+    def executor_stats(self) -> Dict[str, Dict[str, int]]:
+        """Return queue and worker metrics of the tool execution pools."""
+        return self.tool_executor.stats()
+
+    def run(self, transport: Literal["stdio", "sse", "streamable-http"] = "stdio") -> None:
+        """Run the server and release the tool worker pools, registry store and tracer when it stops."""
+        try:
+            if transport == "streamable-http":
+                anyio.run(self.run_streamable_http_async)
+            else:
+                super().run(transport)
+        finally:
+            self.tool_executor.shutdown(wait=False)
+            self.registry_store.close()
+            if isinstance(self.session_config_store, SQLiteSessionStore):
+                self.session_config_store.close()
+            self.tracer.close()
@@ -1,16 +1,16 @@
-from attr import has
 from starlette.applications import Starlette
 from starlette.routing import Mount, Route
+from starlette.responses import JSONResponse
 from mcp.server.fastmcp import Context as MCPContext
 from mcp_server.mcp_extension import ExtendedMCP
+from mcp_server.env_overlay import current_env
 from starlette_context.middleware import ContextMiddleware
-from typing import TYPE_CHECKING, TypeVar
+from typing import Any, Dict, Optional, TypeVar
 import logging
+import asyncio
 
 ExtendedMCPType = TypeVar("ExtendedMCPType", bound="ExtendedMCP")
 
-logging.basicConfig(level=logging.DEBUG)
-
 mcp_settings = {
     "host": "127.0.0.1",
     "port": 8010,
@@ -19,73 +19,139 @@ mcp_settings = {
     "log_level": "DEBUG"
 }
 
-# Instantiate our extended MCP server.
-mcp = ExtendedMCP(name = "Detailed MCP Server", instructions=None,  **mcp_settings)
-
-
-# Register static tools.
-@mcp.tool()
-async def echo_tool(message: str, context: MCPContext) -> str:
-    """A simple echo tool that returns the message prefixed with 'Echo:'."""
-    logging.debug(f"echo_tool invoked with message: {message}")
-    # nonlocal context
-    print("The context here is :", context)
-    await context.info("Info from echo tool")	
-    await context.warning("Warning from echo tool")
-    print("=======1==========")
-    # headers =  context.request_context.session.headers
-    client_parameters = context.session.client_params
-    if hasattr(client_parameters, "model_extra"):
-        # If the client_params has model_extra, we can access it
-        session_env = client_parameters.model_extra["env_config"]
-    print("session meta is :", session_env)
-    print("========3=========")
-    return f"Echo: {message}"
-
-@mcp.tool()
-def langchain_search(query: str) -> str:
-    """A simulated search tool that returns dummy search results."""
-    return f"Simulated search results for query: {query}"
-
-@mcp.prompt()
-def agent_prompt(message: str) -> str:
-    """A prompt used by agents to process a message."""
-    return f"Agent, please process the following message:\n{message}"
-
-@mcp.resource("resource://echo/{message}")
-def echo_resource(message: str) -> str:
-    """A resource that echoes a message."""
-    return f"Resource echo: {message}"
-
-@mcp.route("/health", methods=["GET"])
-async def health_check(request):
-    """Health check endpoint."""
-    return {"status": "healthy"}
-
-@mcp.route("/dynamic/add_tool", methods=["POST"])
-async def add_tool_endpoint(request):
-    data = await request.json()
-    # Expected keys: name, func_name, description, config (optional), persist (bool),
-    # code (optional), and metadata (optional)
-    tool_name = data.get("name")
-    func_name = data.get("func_name", "")
-    description = data.get("description", "")
-    config = data.get("config", {})
-    persist = data.get("persist", False)
-    code = data.get("code", "")
-    metadata = data.get("metadata", {})
-    try:
-        mcp.add_tool_dynamically(tool_name, func_name, description, config, persist, code, metadata)
-        logging.info(f"Tool {tool_name} added dynamically")
-        return {"status": "success", "message": f"Tool {tool_name} added."}
-    except Exception as e:
-        logging.error(f"Error adding tool {tool_name}: {e}")
-        return {"status": "error", "message": str(e)}
+_server: Optional[ExtendedMCP] = None
+
+
+def register_builtins(mcp: ExtendedMCP) -> None:
+    """Register the server's own tools, prompts, resources and HTTP routes on `mcp`."""
+    # Register static tools.
+    @mcp.tool()
+    async def echo_tool(message: str, context: MCPContext) -> str:
+        """A simple echo tool that returns the message prefixed with 'Echo:'."""
+        logging.debug(f"echo_tool invoked with message: {message}")
+        # nonlocal context
+        print("The context here is :", context)
+        await context.info("Info from echo tool")	
+        await context.warning("Warning from echo tool")
+        print("=======1==========")
+        # headers =  context.request_context.session.headers
+        # The session's env_config is parsed once per session and exposed as a per-call overlay.
+        session_env = dict(current_env())
+        print("session meta is :", session_env)
+        print("========3=========")
+        return f"Echo: {message}"
+
+    @mcp.tool(cache={"ttl": 30}, coalesce=True)
+    def langchain_search(query: str) -> str:
+        """A simulated search tool that returns dummy search results."""
+        return f"Simulated search results for query: {query}"
+
+    @mcp.prompt()
+    def agent_prompt(message: str) -> str:
+        """A prompt used by agents to process a message."""
+        return f"Agent, please process the following message:\n{message}"
+
+    @mcp.resource("resource://echo/{message}", cache={"ttl": 60})
+    def echo_resource(message: str) -> str:
+        """A resource that echoes a message."""
+        return f"Resource echo: {message}"
+
+    @mcp.route("/health", methods=["GET"])
+    async def health_check(request):
+        """Health check endpoint."""
+        return JSONResponse({"status": "healthy", "sessions": mcp.session_store_stats()})
+
+    @mcp.route("/dynamic/add_tool", methods=["POST"])
+    async def add_tool_endpoint(request):
+        data = await request.json()
+        # Expected keys: name, func_name, description, config (optional), persist (bool),
+        # code (optional), metadata (optional) and execution (optional: inline, thread or process)
+        tool_name = data.get("name")
+        func_name = data.get("func_name", "")
+        description = data.get("description", "")
+        config = data.get("config", {})
+        persist = data.get("persist", False)
+        code = data.get("code", "")
+        metadata = data.get("metadata", {})
+        execution = data.get("execution")
+        try:
+            # Compiling and persisting happen in a worker thread, off the event loop.
+            await asyncio.to_thread(mcp.add_tool_dynamically, tool_name, func_name, description, config, persist, code, metadata, execution)
+            await mcp.notify_tools_list_changed()
+            logging.info(f"Tool {tool_name} added dynamically")
+            return JSONResponse({"status": "success", "message": f"Tool {tool_name} added."})
+        except Exception as e:
+            logging.error(f"Error adding tool {tool_name}: {e}")
+            return JSONResponse({"status": "error", "message": str(e)})
+
+    @mcp.route("/dynamic/add_tools", methods=["POST"])
+    async def add_tools_bulk_endpoint(request):
+        data = await request.json()
+        # Expected keys: tools (a list of /dynamic/add_tool payloads) and persist (optional default
+        # for definitions that do not set it themselves).
+        definitions = data.get("tools", [])
+        if not isinstance(definitions, list):
+            return JSONResponse({"status": "error", "message": "'tools' must be a list of tool definitions."}, status_code=400)
+        results = await mcp.add_tools_bulk(definitions, persist=data.get("persist", False))
+        failed = sum(1 for result in results if result["status"] != "success")
+        logging.info(f"Bulk registration: {len(results) - failed} tools added, {failed} failed")
+        status = "success" if not failed else ("error" if failed == len(results) else "partial")
+        return JSONResponse({"status": status, "results": results})
+
+
+def create_server(settings: Optional[Dict[str, Any]] = None, tools: Optional[str] = "lazy") -> ExtendedMCP:
+    """
+    Build the Detailed MCP Server. Nothing is built when this module is imported.
+
+    Parameters:
+        settings: FastMCP settings (defaults to mcp_settings).
+        tools: How to add the tools of the `tools` package: "lazy" advertises them from their
+               AST-derived stubs and imports each module on first call, "eager" imports and registers
+               them now (tools.load_tools), None leaves them out.
+
+    The first server created becomes the process default returned by get_server() (and
+    mcp_server.mcp), which is the server tool modules register with through @mcp.tool.
+    """
+    global _server
+    mcp = ExtendedMCP(name="Detailed MCP Server", instructions=None, **(settings or mcp_settings))
+    if _server is None:
+        _server = mcp
+    register_builtins(mcp)
+    if tools == "lazy":
+        from tools import register_tool_stubs
+        register_tool_stubs(mcp)
+    elif tools == "eager":
+        from tools import load_tools
+        load_tools(mcp)
+    elif tools is not None:
+        raise ValueError(f"Unknown tools mode {tools!r}; expected 'lazy', 'eager' or None.")
+    return mcp
+
+
+def get_server() -> ExtendedMCP:
+    """The process-wide server, created on first use."""
+    if _server is None:
+        create_server()
+    assert _server is not None
+    return _server
+
+
+def __getattr__(name: str) -> Any:
+    # `mcp` is built on first access rather than at import time.
+    if name == "mcp":
+        return get_server()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Build the SSE app using mcp.sse_app()
 
-#TODO - mcp serving extra routes only over SSE. It doesn't allow the serving on local for extra paths. This needs fixing
+# The extra routes are served by both sse_app() and streamable_http_app(); sse_app() also serves the
+# stateless streamable-HTTP endpoint at streamable_http_path (/mcp). stdio serves no routes.
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
     logging.info("Starting MCP server")
-    mcp.run(transport="sse")
+    # Go through the package so tool modules (`from mcp_server import mcp`) see this same server.
+    # MCP_WORKERS > 1 serves from that many processes (see mcp_server.workers).
+    from mcp_server.workers import run_sse
+    run_sse("mcp_server:get_server")
@@ -0,0 +1,139 @@
+"""
+Tool call metrics and Prometheus text exposition.
+
+ToolMetrics records, per tool, the number of calls, the number that raised, the calls currently
+running and a latency histogram. ExtendedMCP feeds it from wrap_tool_function and serves it,
+together with session, queue and pool gauges, on its /metrics route in the Prometheus text
+format (version 0.0.4), so no client library is needed.
+"""
+
+import bisect
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Mapping[str, str]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense. Not thread-safe on its own."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class _ToolSeries:
+    __slots__ = ("calls", "errors", "in_flight", "latency")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency = Histogram(buckets)
+
+
+class ToolMetrics:
+    """Per-tool counters, in-flight gauges and latency histograms."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, _ToolSeries] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, tool: str) -> _ToolSeries:
+        series = self._series.get(tool)
+        if series is None:
+            series = self._series.setdefault(tool, _ToolSeries(self.buckets))
+        return series
+
+    def started(self, tool: str) -> None:
+        with self._lock:
+            self._get(tool).in_flight += 1
+
+    def finished(self, tool: str, duration: float, failed: bool) -> None:
+        with self._lock:
+            series = self._get(tool)
+            series.in_flight -= 1
+            series.calls += 1
+            if failed:
+                series.errors += 1
+            series.latency.observe(duration)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                tool: {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "in_flight": s.in_flight,
+                    "latency_sum": s.latency.sum,
+                    "latency_buckets": s.latency.cumulative(),
+                }
+                for tool, s in self._series.items()
+            }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class PrometheusText:
+    """Builds a Prometheus text exposition one metric family at a time."""
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Labels, float]]) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self._lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def histogram(self, name: str, help_text: str, series: Iterable[Tuple[Labels, List[Tuple[float, int]], float]]) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} histogram")
+        for labels, buckets, total in series:
+            for bound, count in buckets:
+                bucket_labels = {**labels, "le": _format_value(bound)}
+                self._lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+            count = buckets[-1][1] if buckets else 0
+            self._lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            self._lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
@@ -0,0 +1,191 @@
+"""
+Content-addressed store for the source of persisted tools.
+
+Persisted tool code used to be written to tools/persist_tools/{name}_{timestamp}.py, which created
+a new file for every re-registration (and collided for two registrations within the same second).
+Modules are now named after the SHA-256 of their source, so identical code is stored once however
+many tool names point at it. A manifest maps tool names to source hashes, and modules that no
+name references any more are garbage collected.
+
+The store lives outside the tools package (by default in .tool_modules in the working directory,
+next to the registry files), so tools.load_tools and scan_tool_stubs never import or scan the
+stored modules as tool modules of their own.
+
+The worker processes of a multi-worker server (mcp_server.workers) share one store directory.
+Every mutation therefore re-reads the manifest and writes it back under an exclusive lock on
+manifest.lock (fcntl.flock; on platforms without fcntl the lock only covers the threads of one
+process), and reads pick up a manifest another process replaced. Without this, two workers would
+each write their own copy of the manifest, losing the other's names, and garbage collection would
+delete modules that only the other worker's names reference.
+
+Layout of the store directory:
+    manifest.json         {"<tool name>": "<sha256 of source>", ...}
+    manifest.lock         lock file serializing mutations across processes
+    tool_<hash>.py        the tool source, exactly as registered
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+from mcp_server.code_cache import source_hash
+
+DEFAULT_PERSIST_DIR = ".tool_modules"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "manifest.lock"
+_MODULE_RE = re.compile(r"^tool_([0-9a-f]{64})\.py$")
+
+
+class ModuleStore:
+    """Deduplicating, content-addressed store of tool modules with a name -> hash manifest."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or DEFAULT_PERSIST_DIR
+        self.manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        self.lock_path = os.path.join(self.directory, LOCK_FILE)
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict[str, str]] = None
+        # (inode, mtime, size) of the manifest file last read; a change means another process replaced it.
+        self._manifest_stamp: Optional[Tuple[int, int, int]] = None
+
+    @staticmethod
+    def module_file(digest: str) -> str:
+        return f"tool_{digest}.py"
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, self.module_file(digest))
+
+    def _write_atomic(self, path: str, text: str) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def manifest(self) -> Dict[str, str]:
+        """The name -> hash manifest, re-read when the file changed since it was last read."""
+        stamp = self._stamp()
+        if self._manifest is None or stamp != self._manifest_stamp:
+            manifest = {}
+            if stamp is not None:
+                with open(self.manifest_path, "r") as f:
+                    manifest = json.load(f)
+            self._manifest, self._manifest_stamp = manifest, stamp
+        return self._manifest
+
+    def _save_manifest(self, manifest: Dict[str, str]) -> None:
+        self._write_atomic(self.manifest_path, json.dumps(manifest, indent=2, sort_keys=True))
+        self._manifest, self._manifest_stamp = manifest, self._stamp()
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, str]]:
+        """Hold the store lock (across processes where fcntl exists) and yield the manifest as on disk."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                # Never trust the cached copy here: another process may have written within the stamp's resolution.
+                self._manifest = None
+                yield dict(self.manifest())
+
+    def _store_source(self, source: str) -> str:
+        digest = source_hash(source)
+        path = self._path(digest)
+        if not os.path.exists(path):
+            self._write_atomic(path, source)
+        return digest
+
+    def _release(self, digests: Iterable[str], manifest: Dict[str, str]) -> List[str]:
+        """Delete the modules among `digests` that no entry of `manifest` references."""
+        referenced = set(manifest.values())
+        removed = []
+        for digest in set(digests) - referenced:
+            try:
+                os.unlink(self._path(digest))
+                removed.append(digest)
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def put_many(self, sources: Dict[str, str], release: bool = True) -> Dict[str, str]:
+        """
+        Store the source of several tools and update the manifest once. Returns name -> hash.
+        With release=False the modules the names pointed at before are kept; the caller releases
+        them (release()) once nothing else, such as a registry entry, refers to them.
+        """
+        with self._locked() as manifest:
+            previous = []
+            digests = {}
+            for name, source in sources.items():
+                digest = self._store_source(source)
+                old = manifest.get(name)
+                if old is not None and old != digest:
+                    previous.append(old)
+                manifest[name] = digest
+                digests[name] = digest
+            self._save_manifest(manifest)
+            if release:
+                self._release(previous, manifest)
+            return digests
+
+    def release(self, digests: Iterable[str]) -> List[str]:
+        """Delete the modules among `digests` that no tool name references any more. Returns the removed hashes."""
+        with self._locked() as manifest:
+            return self._release(digests, manifest)
+
+    def put(self, name: str, source: str) -> str:
+        """Store the source of one tool and point `name` at it. Returns the source hash."""
+        return self.put_many({name: source})[name]
+
+    def get_source(self, name: str) -> Optional[str]:
+        digest = self.manifest().get(name)
+        if digest is None:
+            return None
+        return self.read(digest)
+
+    def read(self, digest: str) -> Optional[str]:
+        """Return the source stored under `digest`, or None if it is not in the store."""
+        try:
+            with open(self._path(digest), "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def remove(self, name: str) -> None:
+        with self._locked() as manifest:
+            digest = manifest.pop(name, None)
+            if digest is None:
+                return
+            self._save_manifest(manifest)
+            self._release([digest], manifest)
+
+    def gc(self) -> List[str]:
+        """Delete every stored module that no tool name references. Returns the removed hashes."""
+        if not os.path.isdir(self.directory):
+            return []
+        with self._locked() as manifest:
+            stored = [m.group(1) for m in map(_MODULE_RE.match, os.listdir(self.directory)) if m]
+            return self._release(stored, manifest)
@@ -0,0 +1,330 @@
+"""
+Storage backends for the dynamic tool registry.
+
+The registry used to be persisted by rewriting the whole registered_tools.json on every
+add_tool_dynamically call: O(registry size) per registration, racy under concurrent requests and
+able to leave a truncated file behind after a crash. Two backends replace that:
+
+    - JournalRegistryStore (default): appends one JSON line per change to a journal next to the
+      snapshot file, and periodically compacts the journal into a new snapshot and index written
+      with atomic renames. Existing registered_tools.json files are read as the initial snapshot.
+    - SQLiteRegistryStore: one row per tool in an SQLite database in WAL mode. Worker processes
+      sharing the database also publish their non-persistent tools to each other through it, in
+      a separate table that serve_workers clears on startup (see put_many's `ephemeral`).
+
+Both expose the full definitions (load) and the compact index used for lazy startup (index).
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+TOOLS_PERSISTENCE_FILE = "registered_tools.json"
+TOOLS_SQLITE_FILE = "registered_tools.db"
+DEFAULT_COMPACT_EVERY = 1000
+
+
+def index_entry(tool_info: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of a tool definition needed to advertise it without compiling it."""
+    return {
+        "description": tool_info.get("description", ""),
+        "parameters": tool_info.get("parameters"),
+        "execution": tool_info.get("execution"),
+        "func_name": tool_info.get("func_name", ""),
+    }
+
+
+def _atomic_write_json(path: str, data: Any, **dump_kwargs: Any) -> None:
+    """Write JSON to a temporary file in the same directory and rename it over `path`."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class RegistryStore(ABC):
+    """Interface of a persistent tool registry."""
+
+    @abstractmethod
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Return the full definitions of all persisted tools."""
+
+    @abstractmethod
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        """Return the compact index (see index_entry) of all persisted tools."""
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.load().get(name)
+
+    def put(self, name: str, entry: Dict[str, Any]) -> None:
+        self.put_many({name: entry})
+
+    @abstractmethod
+    def put_many(self, entries: Dict[str, Dict[str, Any]], ephemeral: bool = False) -> None:
+        """
+        Persist several definitions with a single durable write. Ephemeral definitions are only
+        shared with the other processes using the store, and do not outlive their run.
+        """
+
+    @abstractmethod
+    def delete(self, name: str) -> None:
+        """Remove a tool from the registry."""
+
+    def changed(self) -> bool:
+        """Whether another process wrote to the store since the last call. Stores that are not shared return False."""
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+class JournalRegistryStore(RegistryStore):
+    """Snapshot file plus an append-only JSON-lines journal, compacted every `compact_every` records."""
+
+    def __init__(self, path: str = TOOLS_PERSISTENCE_FILE, compact_every: int = DEFAULT_COMPACT_EVERY, fsync: bool = True):
+        self.path = path
+        root, _ = os.path.splitext(path)
+        self.journal_path = root + ".journal"
+        self.index_path = root + ".index.json"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._journal_records = 0
+        self._journal_checked = False
+
+    def _read_json(self, path: str) -> Dict[str, Any]:
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _replay_journal(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A record torn by a crash mid-write; everything before it is intact.
+                    logger.warning(f"Skipping corrupt record in {self.journal_path}")
+
+    @staticmethod
+    def _apply(target: Dict[str, Any], record: Dict[str, Any], transform=lambda entry: entry) -> None:
+        if record.get("op") == "delete":
+            target.pop(record["name"], None)
+        else:
+            target[record["name"]] = transform(record["entry"])
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            if self._entries is None:
+                entries = self._read_json(self.path)
+                records = 0
+                for record in self._replay_journal():
+                    self._apply(entries, record)
+                    records += 1
+                self._entries = entries
+                self._journal_records = records
+            return self._entries
+
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            if self._index is None:
+                if self._entries is None and os.path.exists(self.index_path):
+                    # The index file matches the last snapshot; only the journal tail is replayed.
+                    index = self._read_json(self.index_path)
+                    records = 0
+                    for record in self._replay_journal():
+                        self._apply(index, record, index_entry)
+                        records += 1
+                    self._journal_records = records
+                else:
+                    index = {name: index_entry(info) for name, info in self.load().items()}
+                self._index = index
+            return self._index
+
+    def _append(self, records: list) -> None:
+        payload = "".join(json.dumps(record) + "\n" for record in records)
+        with open(self.journal_path, "a+") as f:
+            if not self._journal_checked:
+                # Terminate a torn last line so the new record starts on a line of its own.
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(f.tell() - 1)
+                    if f.read(1) != "\n":
+                        payload = "\n" + payload
+                self._journal_checked = True
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._journal_records += len(records)
+
+    def _record(self, records: list) -> None:
+        with self._lock:
+            self._append(records)
+            for record in records:
+                if self._entries is not None:
+                    self._apply(self._entries, record)
+                if self._index is not None:
+                    self._apply(self._index, record, index_entry)
+            if self._journal_records >= self.compact_every:
+                self.compact()
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]], ephemeral: bool = False) -> None:
+        # The journal is not shared with other processes, so ephemeral entries have nobody to reach.
+        if entries and not ephemeral:
+            self._record([{"op": "put", "name": name, "entry": entry} for name, entry in entries.items()])
+
+    def delete(self, name: str) -> None:
+        self._record([{"op": "delete", "name": name}])
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and index, then start an empty journal."""
+        with self._lock:
+            entries = self.load()
+            _atomic_write_json(self.path, entries, indent=2)
+            _atomic_write_json(self.index_path, {name: index_entry(info) for name, info in entries.items()})
+            # A crash before this point only means the journal is replayed over an up-to-date snapshot.
+            fd, empty_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.journal_path)), suffix=".tmp")
+            os.close(fd)
+            os.replace(empty_path, self.journal_path)
+            self._journal_records = 0
+            self._journal_checked = True
+
+
+class SQLiteRegistryStore(RegistryStore):
+    """
+    Registry kept in an SQLite database in WAL mode, one row per tool. Ephemeral entries live in
+    a table of their own, take precedence over persisted entries of the same name and are
+    removed by clear_ephemeral.
+    """
+
+    def __init__(self, path: str = TOOLS_SQLITE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table in ("tools", "ephemeral_tools"):
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " name TEXT PRIMARY KEY,"
+                " description TEXT,"
+                " parameters TEXT,"
+                " execution TEXT,"
+                " func_name TEXT,"
+                " entry TEXT NOT NULL)"
+            )
+        # PRAGMA data_version changes when another connection commits, e.g. another server worker.
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    # Persisted rows first, so an ephemeral row of the same name wins.
+    _ALL_ROWS = "SELECT {columns} FROM tools UNION ALL SELECT {columns} FROM ephemeral_tools"
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(self._ALL_ROWS.format(columns="name, entry")).fetchall()
+        return {name: json.loads(entry) for name, entry in rows}
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT entry FROM ephemeral_tools WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                row = self._conn.execute("SELECT entry FROM tools WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(self._ALL_ROWS.format(
+                columns="name, description, parameters, execution, func_name")).fetchall()
+        return {
+            name: {
+                "description": description or "",
+                "parameters": json.loads(parameters) if parameters else None,
+                "execution": execution,
+                "func_name": func_name or "",
+            }
+            for name, description, parameters, execution, func_name in rows
+        }
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]], ephemeral: bool = False) -> None:
+        rows = []
+        for name, entry in entries.items():
+            compact = index_entry(entry)
+            parameters = compact["parameters"]
+            rows.append((
+                name,
+                compact["description"],
+                json.dumps(parameters) if parameters is not None else None,
+                compact["execution"],
+                compact["func_name"],
+                json.dumps(entry),
+            ))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if ephemeral:
+                    self._conn.executemany("INSERT OR REPLACE INTO ephemeral_tools VALUES (?, ?, ?, ?, ?, ?)", rows)
+                else:
+                    self._conn.executemany("INSERT OR REPLACE INTO tools VALUES (?, ?, ?, ?, ?, ?)", rows)
+                    # A persisted registration replaces an ephemeral one of the same name.
+                    self._conn.executemany("DELETE FROM ephemeral_tools WHERE name = ?", [(row[0],) for row in rows])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tools WHERE name = ?", (name,))
+            self._conn.execute("DELETE FROM ephemeral_tools WHERE name = ?", (name,))
+
+    def clear_ephemeral(self) -> None:
+        """Drop the ephemeral entries, e.g. those of an earlier run of the workers."""
+        with self._lock:
+            self._conn.execute("DELETE FROM ephemeral_tools")
+
+    def changed(self) -> bool:
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            changed, self._data_version = version != self._data_version, version
+        return changed
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_registry_store(store: Union[RegistryStore, str, None]) -> RegistryStore:
+    """Build a store from an instance or a backend name ("journal" or "sqlite")."""
+    if isinstance(store, RegistryStore):
+        return store
+    if store in (None, "journal"):
+        return JournalRegistryStore(TOOLS_PERSISTENCE_FILE)
+    if store == "sqlite":
+        return SQLiteRegistryStore(TOOLS_SQLITE_FILE)
+    raise ValueError(f"Unknown registry store {store!r}; expected 'journal', 'sqlite' or a RegistryStore instance.")
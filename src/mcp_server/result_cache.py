@@ -0,0 +1,187 @@
+"""
+Opt-in result cache for idempotent tools.
+
+Tools registered with `cache=...` (see ExtendedMCP.add_tool, and ExtendedMCP.resource for
+resources) return a stored result when they are called again with the same arguments by a session with the same env_config, instead of recomputing
+or re-fetching it. The key is a SHA-256 of the tool name, the canonical JSON of the call arguments
+and a hash of the effective env overlay, so sessions configured with different credentials or
+endpoints never share results.
+
+Entries expire `ttl` seconds after they are stored; the in-memory level is an LRU of `max_size`
+entries, and an optional disk level (one JSON file per key) survives restarts and is shared by
+workers. The disk level is plain data, so a planted or corrupted file can at worst be a wrong
+result, never code to run; results that are not JSON data (or would not read back identical, e.g.
+tuples) stay in memory only. Exceptions are never cached.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+
+from mcp.server.fastmcp import Context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULT_TTL = 60.0
+DEFAULT_RESULT_CACHE_SIZE = 1024
+
+_MISSING = object()
+
+
+def env_hash(env: Mapping[str, str]) -> str:
+    """Order-independent hash of an env overlay."""
+    if not env:
+        return ""
+    return hashlib.sha256(json.dumps(sorted(env.items())).encode("utf-8")).hexdigest()
+
+
+def call_key(tool_name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any], env: Mapping[str, str]) -> str:
+    """Cache key of a call. Context arguments are per-request plumbing and are left out."""
+    arguments = {k: v for k, v in kwargs.items() if not isinstance(v, Context)}
+    positional = [a for a in args if not isinstance(a, Context)]
+    payload = json.dumps([tool_name, positional, arguments, env_hash(env)], sort_keys=True, default=repr, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """TTL + LRU cache of tool results, in memory and optionally on disk."""
+
+    def __init__(self, ttl: Optional[float] = DEFAULT_RESULT_TTL, max_size: int = DEFAULT_RESULT_CACHE_SIZE,
+                 cache_dir: Optional[str] = None):
+        # ttl=None keeps entries until they are evicted; cache_dir=None disables the disk level.
+        self.ttl = ttl
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_option(cls, option: Union[bool, float, Dict[str, Any], "ResultCache", None],
+                    cache_dir: Optional[str] = None) -> Optional["ResultCache"]:
+        """
+        Build a cache from a tool's `cache` option: True (defaults), a number (the TTL in seconds),
+        a dict of ResultCache arguments ({"ttl": ..., "max_size": ..., "disk": bool}) or an instance.
+        `cache_dir` is the server's disk location, used when the option asks for the disk level.
+        """
+        if option is None or option is False:
+            return None
+        if isinstance(option, ResultCache):
+            return option
+        if option is True:
+            return cls()
+        if isinstance(option, (int, float)):
+            return cls(ttl=float(option))
+        if isinstance(option, dict):
+            options = dict(option)
+            disk = options.pop("disk", False)
+            if disk and "cache_dir" not in options:
+                options["cache_dir"] = disk if isinstance(disk, str) else cache_dir
+            return cls(**options)
+        raise ValueError(f"Invalid cache option {option!r}; expected a bool, a TTL in seconds, a dict or a ResultCache.")
+
+    def _expires_at(self) -> Optional[float]:
+        return None if self.ttl is None else time.time() + self.ttl
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")  # type: ignore[arg-type]
+
+    def _read_disk(self, key: str) -> Any:
+        try:
+            with open(self._disk_path(key), "r") as f:
+                entry = json.load(f)
+            expires_at, value = entry["expires_at"], entry["value"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return _MISSING
+        if expires_at is not None and expires_at <= time.time():
+            return _MISSING
+        return expires_at, value
+
+    def _write_disk(self, key: str, expires_at: Optional[float], value: Any) -> None:
+        path = self._disk_path(key)
+        try:
+            data = json.dumps({"expires_at": expires_at, "value": value})
+            if json.loads(data)["value"] != value:
+                raise ValueError("the value changes in a JSON round trip")
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Result of cache key {key} is not JSON data, keeping it in memory only: {e}")
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write tool result cache entry {path}: {e}")
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for `key`, or the module's _MISSING sentinel (see `missing`)."""
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+        if self.cache_dir:
+            stored = self._read_disk(key)
+            if stored is not _MISSING:
+                expires_at, value = stored
+                self._remember(key, value, expires_at)
+                with self._lock:
+                    self.disk_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return _MISSING
+
+    def _remember(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put(self, key: str, value: Any) -> None:
+        expires_at = self._expires_at()
+        self._remember(key, value, expires_at)
+        if self.cache_dir:
+            self._write_disk(key, expires_at, value)
+
+    @staticmethod
+    def missing(value: Any) -> bool:
+        return value is _MISSING
+
+    def clear(self) -> None:
+        """Drop the in-memory entries; disk entries expire on their own."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
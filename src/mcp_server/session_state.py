@@ -0,0 +1,92 @@
+"""
+Per-session connection state.
+
+create_context used to copy every request header and query parameter into fresh dicts and
+setattr them onto the ServerSession on every call. SessionState is built once, when the SSE
+connection is accepted, from the raw ASGI scope: it keeps the header list and query string as
+they arrived and only decodes them into read-only mappings the first time they are accessed.
+The x-session-id header, the one value every session needs, is picked out of the raw header list
+directly.
+
+The x-session-id header is chosen by the client, so it only labels the session (in logs, and for
+the worker affinity of mcp_server.workers); stored config is never looked up by it. Only a
+transport that issued an id itself (see mcp_server.stateless_http) marks the state
+`server_issued` and hands over the config it stored under that id as `stored_config`.
+"""
+
+import uuid
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qsl
+
+EMPTY_MAPPING: Mapping[str, str] = MappingProxyType({})
+
+SESSION_ID_HEADER = b"x-session-id"
+CUSTOM_VARIABLE_HEADER = "x-custom-variable"
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+def _find_header(raw_headers: RawHeaders, name: bytes) -> Optional[str]:
+    # ASGI servers lower-case header names, so a plain scan is enough.
+    for key, value in raw_headers:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class SessionState:
+    """Immutable-by-convention connection data of one session, with lazily decoded views."""
+
+    __slots__ = ("session_id", "server_issued", "stored_config", "_raw_headers", "_query_string", "_headers", "_query_params")
+
+    def __init__(self, session_id: Optional[str] = None, raw_headers: Optional[RawHeaders] = None, query_string: bytes = b""):
+        self._raw_headers = raw_headers or []
+        self._query_string = query_string
+        self._headers: Optional[Mapping[str, str]] = None
+        self._query_params: Optional[Mapping[str, str]] = None
+        self.session_id = session_id or _find_header(self._raw_headers, SESSION_ID_HEADER) or uuid.uuid4().hex
+        self.server_issued = False
+        self.stored_config: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_scope(cls, scope: Mapping[str, Any]) -> "SessionState":
+        """Build the state from an ASGI scope without decoding anything but the session id."""
+        return cls(raw_headers=scope.get("headers") or [], query_string=scope.get("query_string") or b"")
+
+    def attach_issued(self, session_id: str, config: Dict[str, Any]) -> None:
+        """Bind the state to an id the server issued, with the config stored under it."""
+        self.session_id = session_id
+        self.server_issued = True
+        self.stored_config = config
+
+    @property
+    def headers(self) -> Mapping[str, str]:
+        if self._headers is None:
+            if not self._raw_headers:
+                self._headers = EMPTY_MAPPING
+            else:
+                self._headers = MappingProxyType(
+                    {key.decode("latin-1"): value.decode("latin-1") for key, value in self._raw_headers}
+                )
+        return self._headers
+
+    @property
+    def query_params(self) -> Mapping[str, str]:
+        if self._query_params is None:
+            if not self._query_string:
+                self._query_params = EMPTY_MAPPING
+            else:
+                self._query_params = MappingProxyType(dict(parse_qsl(self._query_string.decode("latin-1"), keep_blank_values=True)))
+        return self._query_params
+
+    @property
+    def custom_variable(self) -> Optional[str]:
+        return self.headers.get(CUSTOM_VARIABLE_HEADER)
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Look up one header without building the full headers view."""
+        if self._headers is not None:
+            return self._headers.get(name, default)
+        value = _find_header(self._raw_headers, name.lower().encode("latin-1"))
+        return default if value is None else value
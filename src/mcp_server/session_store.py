@@ -0,0 +1,208 @@
+"""
+Bounded per-session state store.
+
+ExtendedMCP.session_config_store used to be a plain dict keyed by request id that was never
+cleaned up, so a long-running server grew by one entry per request. BoundedSessionStore keeps at
+most `max_size` sessions (least recently used are evicted first), expires entries that have not
+been touched for `ttl` seconds, and lets the server drop a session explicitly when the client
+ends it. Counters for hits, misses and each kind of eviction are exposed via stats().
+
+SQLiteSessionStore has the same interface but keeps the entries in an SQLite database, so the
+worker processes of a multi-worker server (see mcp_server.workers) share them. Values must be
+JSON-serializable; the counters are per process.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, MutableMapping, Optional, Tuple
+
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_SESSION_TTL = 3600.0
+
+
+class BoundedSessionStore(MutableMapping):
+    """A dict-like LRU store with a per-entry idle TTL (ttl=None disables expiry)."""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SESSIONS, ttl: Optional[float] = DEFAULT_SESSION_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        self.disconnect_removals = 0
+
+    def _expired(self, stamp: float, now: float) -> bool:
+        return self.ttl is not None and now - stamp > self.ttl
+
+    def _purge_expired(self, now: float) -> None:
+        # Entries are ordered by last use, so expired ones are all at the front.
+        while self._data:
+            key, (_, stamp) = next(iter(self._data.items()))
+            if not self._expired(stamp, now):
+                break
+            del self._data[key]
+            self.ttl_evictions += 1
+
+    def __getitem__(self, key: str) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[1], now):
+                if item is not None:
+                    del self._data[key]
+                    self.ttl_evictions += 1
+                self.misses += 1
+                raise KeyError(key)
+            self._data[key] = (item[0], now)
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            self._purge_expired(now)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.lru_evictions += 1
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            del self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._data))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def discard_session(self, key: str) -> bool:
+        """Drop a session its client ended. Returns True if it had an entry."""
+        with self._lock:
+            if self._data.pop(key, None) is None:
+                return False
+            self.disconnect_removals += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "lru_evictions": self.lru_evictions,
+                "ttl_evictions": self.ttl_evictions,
+                "disconnect_removals": self.disconnect_removals,
+            }
+
+
+class SQLiteSessionStore(MutableMapping):
+    """BoundedSessionStore semantics on a table shared by every process that opens `path`."""
+
+    def __init__(self, path: str, max_size: int = DEFAULT_MAX_SESSIONS, ttl: Optional[float] = DEFAULT_SESSION_TTL):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, value TEXT NOT NULL, touched REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched)")
+        self.hits = 0
+        self.misses = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        self.disconnect_removals = 0
+
+    def _purge_expired(self, now: float) -> None:
+        if self.ttl is not None:
+            self.ttl_evictions += self._conn.execute("DELETE FROM sessions WHERE touched < ?", (now - self.ttl,)).rowcount
+
+    def __getitem__(self, key: str) -> Any:
+        # Wall-clock time, since the timestamps are compared across processes.
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, touched FROM sessions WHERE session_id = ?", (key,)).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (key,))
+                    self.ttl_evictions += 1
+                self.misses += 1
+                raise KeyError(key)
+            self._conn.execute("UPDATE sessions SET touched = ? WHERE session_id = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (key, json.dumps(value), now))
+                self._purge_expired(now)
+                excess = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_size
+                if excess > 0:
+                    self.lru_evictions += self._conn.execute(
+                        "DELETE FROM sessions WHERE session_id IN"
+                        " (SELECT session_id FROM sessions ORDER BY touched LIMIT ?)", (excess,)
+                    ).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            if self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (key,)).rowcount == 0:
+                raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter([row[0] for row in self._conn.execute("SELECT session_id FROM sessions ORDER BY touched")])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def discard_session(self, key: str) -> bool:
+        """Drop a session its client ended. Returns True if it had an entry."""
+        with self._lock:
+            if self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (key,)).rowcount == 0:
+                return False
+            self.disconnect_removals += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge_expired(time.time())
+            return {
+                "size": self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0],
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "lru_evictions": self.lru_evictions,
+                "ttl_evictions": self.ttl_evictions,
+                "disconnect_removals": self.disconnect_removals,
+                "path": self.path,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,47 @@
+"""
+Single-flight coalescing of identical concurrent tool calls.
+
+When several sessions call the same tool with the same arguments (and the same env overlay, see
+result_cache.call_key) while a first call is still running, only the first call executes; the
+others wait for it and receive its result, or its exception. The call runs in its own task, so a
+cancelled waiter does not cancel the call for everybody else.
+
+Coalescing is opt-in: idempotent tools enable it with coalesce=True on ExtendedMCP.tool/add_tool
+(coalesce_tool_calls=True enables it for every tool that does not pass coalesce=False). Tools that
+take a Context or stream chunks never coalesce, since the log messages, progress and chunks of the
+shared call reach only the session that started it.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Deduplicates concurrent awaitables by key. Must be used from a single event loop."""
+
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Task[Any]"] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def _finished(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await call() unless a call with the same key is already running, then share its outcome."""
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+            self.executed += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -0,0 +1,231 @@
+"""
+Stateless streamable-HTTP transport.
+
+With the SSE transport every client holds a stream open and posts its messages to /messages/,
+so even a single tool call costs a connection handshake and the calls of a session are pinned to
+the process owning its stream. This transport (the request/response half of the MCP
+streamable-HTTP transport) takes one JSON-RPC message or a batch per POST and answers in the
+same HTTP response:
+
+    - with json_response (the default), a JSON body holding the response (or the list of
+      responses of a batch);
+    - otherwise a text/event-stream carrying the notifications the requests emit (progress, log
+      messages) followed by their responses.
+
+Each POST is served by a short-lived server session that starts out initialized, so clients may
+skip the initialize handshake and any process behind a stateless load balancer can serve any
+call. Posts with only notifications or responses are acknowledged with 202 and dropped; requests
+from the server to the client (sampling, roots) are not supported without a stream. Requests are
+validated before the session sees them: an unknown method is answered with a METHOD_NOT_FOUND
+error and malformed params with INVALID_PARAMS, and a request the session ends without answering
+gets an INTERNAL_ERROR, so every request id of a POST receives a JSON-RPC response.
+
+Session config survives across POSTs only under an id the server issued. With a `session_store`,
+a POST carrying an initialize request gets a fresh, unguessable id in the Mcp-Session-Id response
+header, and the env_config of its initialize request is stored under that id. POSTs that present
+the id get the stored config back (ExtendedMCP's on_session_opened callback applies it); an id
+the store does not know (never issued, expired or evicted) is answered with 404, and DELETE with
+the id ends the session. Client-chosen ids such as x-session-id never select stored config.
+"""
+
+import json
+import logging
+import secrets
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union, get_args
+
+import anyio
+from pydantic import ValidationError
+from sse_starlette import EventSourceResponse
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+from mcp.types import (INTERNAL_ERROR, INVALID_PARAMS, INVALID_REQUEST, METHOD_NOT_FOUND, PARSE_ERROR, ClientRequest, ErrorData,
+                       JSONRPCError, JSONRPCMessage, JSONRPCRequest, JSONRPCResponse, RequestId)
+
+from mcp_server.lowlevel import SessionTrackingServer, connection_state
+from mcp_server.session_state import SessionState
+from mcp_server.session_store import BoundedSessionStore, SQLiteSessionStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STREAMABLE_HTTP_PATH = "/mcp"
+SESSION_ID_HEADER = "mcp-session-id"
+# Methods of the requests a client may send (the variants of ClientRequest).
+_CLIENT_METHODS = {
+    get_args(variant.model_fields["method"].annotation)[0] for variant in get_args(ClientRequest.model_fields["root"].annotation)
+}
+
+
+def _dump(message: JSONRPCMessage) -> Any:
+    return message.model_dump(by_alias=True, mode="json", exclude_none=True)
+
+
+def _error_response(code: int, message: str, status_code: int = 400) -> Response:
+    return JSONResponse({"jsonrpc": "2.0", "id": None, "error": {"code": code, "message": message}}, status_code=status_code)
+
+
+def _error_message(request_id: RequestId, code: int, message: str) -> JSONRPCMessage:
+    return JSONRPCMessage(JSONRPCError(jsonrpc="2.0", id=request_id, error=ErrorData(code=code, message=message)))
+
+
+def _validation_error(request: JSONRPCRequest) -> Optional[JSONRPCMessage]:
+    """
+    The error answering `request` if the server session could not validate it (the session would
+    fail on it rather than answer), or None for a valid request.
+    """
+    if request.method not in _CLIENT_METHODS:
+        return _error_message(request.id, METHOD_NOT_FOUND, f"Method not found: {request.method}")
+    try:
+        ClientRequest.model_validate(request.model_dump(by_alias=True, mode="json", exclude_none=True))
+    except ValidationError as e:
+        return _error_message(request.id, INVALID_PARAMS, f"Invalid params for {request.method}: {e}")
+    return None
+
+
+class StatelessHTTPTransport:
+    """ASGI endpoint serving each POSTed JSON-RPC message (or batch) with a one-off server session."""
+
+    def __init__(self, server: SessionTrackingServer, json_response: bool = True,
+                 session_store: Optional[Union[BoundedSessionStore, SQLiteSessionStore]] = None):
+        self.server = server
+        self.json_response = json_response
+        # Config of the sessions this transport issued ids for; None disables session ids.
+        self.session_store = session_store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope, receive)
+        if request.method == "DELETE" and self.session_store is not None:
+            await self._end_session(request)(scope, receive, send)
+            return
+        if request.method != "POST":
+            # Stateless: there is no server-initiated stream to GET.
+            allow = "POST, DELETE" if self.session_store is not None else "POST"
+            await Response("Method Not Allowed", status_code=405, headers={"Allow": allow})(scope, receive, send)
+            return
+        try:
+            data = json.loads(await request.body())
+        except ValueError as e:
+            await _error_response(PARSE_ERROR, f"Parse error: {e}")(scope, receive, send)
+            return
+        batch = isinstance(data, list)
+        try:
+            messages = [JSONRPCMessage.model_validate(item) for item in (data if batch else [data])]
+        except ValidationError as e:
+            await _error_response(INVALID_REQUEST, f"Invalid request: {e}")(scope, receive, send)
+            return
+        request_ids = [m.root.id for m in messages if isinstance(m.root, JSONRPCRequest)]
+        if not request_ids:
+            await Response(status_code=202)(scope, receive, send)
+            return
+        # Invalid requests are answered here and kept from the session.
+        errors: List[JSONRPCMessage] = []
+        for message in messages:
+            if isinstance(message.root, JSONRPCRequest):
+                error = _validation_error(message.root)
+                if error is not None:
+                    errors.append(error)
+        if errors:
+            rejected = {error.root.id for error in errors}
+            messages = [m for m in messages if not (isinstance(m.root, JSONRPCRequest) and m.root.id in rejected)]
+
+        state = SessionState.from_scope(scope)
+        headers: Optional[Dict[str, str]] = None
+        session_id = request.headers.get(SESSION_ID_HEADER)
+        if session_id is not None:
+            config = self.session_store.get(session_id) if self.session_store is not None else None
+            if config is None:
+                await _error_response(INVALID_REQUEST, "Session not found", 404)(scope, receive, send)
+                return
+            state.attach_issued(session_id, config)
+        else:
+            initialize = next(
+                (m.root for m in messages if isinstance(m.root, JSONRPCRequest) and m.root.method == "initialize"), None
+            )
+            if initialize is not None and self.session_store is not None:
+                session_id = secrets.token_urlsafe(32)
+                env_config = (initialize.params or {}).get("env_config")
+                config = {"env_config": env_config} if isinstance(env_config, dict) else {}
+                self.session_store[session_id] = config
+                state.attach_issued(session_id, config)
+                headers = {SESSION_ID_HEADER: session_id}
+
+        if self.json_response:
+            responses: List[Any] = []
+
+            async def collect(message: JSONRPCMessage) -> None:
+                if isinstance(message.root, (JSONRPCResponse, JSONRPCError)):
+                    responses.append(_dump(message))
+
+            for error in errors:
+                await collect(error)
+            await self._answer(messages, request_ids, state, collect)
+            # Responses in the order of the requests, as a batch if the client sent one.
+            order = {request_id: i for i, request_id in enumerate(request_ids)}
+            responses.sort(key=lambda response: order.get(response.get("id"), len(order)))
+            await JSONResponse(responses if batch else responses[0], headers=headers)(scope, receive, send)
+            return
+
+        send_stream, receive_stream = anyio.create_memory_object_stream[dict](0)
+
+        async def stream_events() -> None:
+            async def emit(message: JSONRPCMessage) -> None:
+                await send_stream.send({"event": "message", "data": json.dumps(_dump(message))})
+
+            async with send_stream:
+                for error in errors:
+                    await emit(error)
+                await self._answer(messages, request_ids, state, emit)
+
+        await EventSourceResponse(content=receive_stream, data_sender_callable=stream_events, headers=headers)(scope, receive, send)
+
+    def _end_session(self, request: Request) -> Response:
+        """DELETE: forget the config stored under the session id the client presents."""
+        assert self.session_store is not None
+        session_id = request.headers.get(SESSION_ID_HEADER)
+        if session_id is None:
+            return _error_response(INVALID_REQUEST, "Missing Mcp-Session-Id header")
+        if not self.session_store.discard_session(session_id):
+            return _error_response(INVALID_REQUEST, "Session not found", 404)
+        return Response(status_code=204)
+
+    async def _answer(self, messages: List[JSONRPCMessage], request_ids: List[RequestId], state: SessionState,
+                      emit: Callable[[JSONRPCMessage], Awaitable[None]]) -> None:
+        """Exchange the requests left in `messages`, then emit an error for every request of the POST left unanswered."""
+        pending: Set[RequestId] = {m.root.id for m in messages if isinstance(m.root, JSONRPCRequest)}
+        if pending:
+            pending = await self.exchange(messages, pending, state, emit)
+        for request_id in request_ids:
+            if request_id in pending:
+                await emit(_error_message(request_id, INTERNAL_ERROR, "The server session ended without answering the request"))
+
+    async def exchange(self, messages: List[JSONRPCMessage], request_ids: Set[RequestId], state: SessionState,
+                       emit: Callable[[JSONRPCMessage], Awaitable[None]]) -> Set[RequestId]:
+        """
+        Run `messages` through a stateless session, passing on what it sends until every request is
+        answered. Returns the ids of the requests left unanswered when the session ended.
+        """
+        to_server_send, to_server_receive = anyio.create_memory_object_stream[Union[JSONRPCMessage, Exception]](len(messages))
+        from_server_send, from_server_receive = anyio.create_memory_object_stream[JSONRPCMessage](0)
+        pending = set(request_ids)
+        token = connection_state.set(state)
+        try:
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(self._run, to_server_receive, from_server_send)
+                # The read stream stays open until the last response: closing it ends the session.
+                async with to_server_send, from_server_receive:
+                    for message in messages:
+                        await to_server_send.send(message)
+                    async for message in from_server_receive:
+                        await emit(message)
+                        if isinstance(message.root, (JSONRPCResponse, JSONRPCError)):
+                            pending.discard(message.root.id)
+                            if not pending:
+                                break
+                tg.cancel_scope.cancel()
+        finally:
+            connection_state.reset(token)
+        return pending
+
+    async def _run(self, read_stream, write_stream) -> None:
+        async with write_stream:
+            await self.server.run(read_stream, write_stream, self.server.create_initialization_options(), stateless=True)
@@ -0,0 +1,93 @@
+"""
+Streaming the output of generator tools.
+
+A tool written as a sync or async generator yields its output in chunks. ExtendedMCP sends each
+chunk to the calling client as soon as it is produced, then returns an aggregate of the chunks
+as the tool result:
+
+    - if the request carries a progressToken, as notifications/progress with the chunk count as
+      `progress` and the chunk in an extra `chunk` field (progress params allow extra fields);
+    - otherwise as a notifications/message log message (level "info", logger "tool.<name>")
+      whose data is {"tool", "index", "chunk"}.
+
+The aggregate is chosen per tool (add_tool's `aggregate` option):
+
+    - "concat" (default): the chunks joined if they are all str (or all bytes), else their list;
+    - "list": the list of chunks;
+    - "last": the last chunk only, so the server never holds more than one chunk;
+    - "none": nothing (an empty result); the client has everything from the notifications.
+
+"concat" and "list" keep every chunk until the tool finishes, but their result is complete for
+clients that ignore notifications. "last" and "none" are opt-in for tools whose output would not
+fit in memory, and only suit clients that collect the chunks from the notifications.
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+from mcp.types import ProgressNotification, ProgressNotificationParams, ServerNotification
+from pydantic_core import to_jsonable_python
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_MODES = ("concat", "list", "last", "none")
+DEFAULT_AGGREGATE = "concat"
+
+
+class ChunkAggregator:
+    """Builds a generator tool's final result from its chunks, keeping only what the mode needs."""
+
+    __slots__ = ("mode", "count", "_chunks", "_last")
+
+    def __init__(self, mode: Optional[str] = None):
+        mode = mode or DEFAULT_AGGREGATE
+        if mode not in AGGREGATE_MODES:
+            raise ValueError(f"Invalid aggregate {mode!r}; expected one of {', '.join(AGGREGATE_MODES)}.")
+        self.mode = mode
+        self.count = 0
+        self._chunks: List[Any] = []
+        self._last: Any = None
+
+    def add(self, chunk: Any) -> None:
+        self.count += 1
+        if self.mode in ("concat", "list"):
+            self._chunks.append(chunk)
+        elif self.mode == "last":
+            self._last = chunk
+
+    def result(self) -> Any:
+        if self.mode == "last":
+            return self._last
+        if self.mode == "none":
+            return None
+        chunks = self._chunks
+        if self.mode == "concat" and chunks:
+            if all(isinstance(chunk, str) for chunk in chunks):
+                return "".join(chunks)
+            if all(isinstance(chunk, bytes) for chunk in chunks):
+                return b"".join(chunks)
+        return chunks
+
+
+ChunkSender = Callable[[int, Any], Awaitable[None]]
+
+
+def chunk_sender(session: Any, tool_name: str, progress_token: Any = None) -> ChunkSender:
+    """Return an async send(index, chunk) delivering chunks to `session` as described above."""
+    logger_name = f"tool.{tool_name}"
+
+    async def send(index: int, chunk: Any) -> None:
+        data = to_jsonable_python(chunk, fallback=str)
+        try:
+            if progress_token is not None:
+                await session.send_notification(ServerNotification(ProgressNotification(
+                    method="notifications/progress",
+                    params=ProgressNotificationParams(progressToken=progress_token, progress=index + 1, chunk=data),
+                )))
+            else:
+                await session.send_log_message("info", {"tool": tool_name, "index": index, "chunk": data}, logger_name)
+        except Exception as e:
+            # The client went away; the tool still runs to completion for its final result.
+            logger.debug(f"Could not stream a chunk of {tool_name}: {e}")
+
+    return send
@@ -0,0 +1,166 @@
+"""
+AST-derived tool stubs.
+
+Importing a tool module can be expensive (standard_tools pulls in pptx and the LangChain Google
+integration), yet list_tools only needs a name, a description and an argument schema. scan_source
+reads those from a module's syntax tree without executing it:
+
+    - functions decorated with `@<server>.tool(...)` use the decorator's name and description and
+      keep its other literal keyword arguments (execution, coalesce, max_concurrency, ...);
+    - other top-level functions whose name ends with "_tool" are named without the suffix, as
+      tools.load_tools does.
+
+The JSON schema is built from the annotations and literal defaults of the parameters; annotations
+it does not understand become an unconstrained property. ExtendedMCP.add_tool_stub advertises a
+stub as a LazyTool that imports the module on first call, after which the real schema is used.
+"""
+
+import ast
+from typing import Any, Dict, List, NamedTuple, Optional
+
+TOOL_SUFFIX = "_tool"
+_CONTEXT_ANNOTATIONS = {"Context", "MCPContext"}
+
+_SIMPLE_TYPES = {
+    "str": {"type": "string"},
+    "int": {"type": "integer"},
+    "float": {"type": "number"},
+    "bool": {"type": "boolean"},
+    "bytes": {"type": "string"},
+    "list": {"type": "array", "items": {}},
+    "List": {"type": "array", "items": {}},
+    "tuple": {"type": "array", "items": {}},
+    "set": {"type": "array", "items": {}},
+    "dict": {"type": "object"},
+    "Dict": {"type": "object"},
+    "Any": {},
+}
+
+
+class ToolStub(NamedTuple):
+    """What is needed to advertise a tool and later import it."""
+    name: str
+    module: str
+    func_name: str
+    description: str
+    parameters: Dict[str, Any]
+    options: Dict[str, Any]
+
+
+def _annotation_name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def annotation_schema(node: Optional[ast.AST]) -> Dict[str, Any]:
+    """JSON schema of an annotation expression, as far as it can be known without importing."""
+    if node is None:
+        return {}
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        try:
+            return annotation_schema(ast.parse(node.value, mode="eval").body)
+        except SyntaxError:
+            return {}
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        return {"anyOf": [annotation_schema(node.left), annotation_schema(node.right)]}
+    if isinstance(node, ast.Constant) and node.value is None:
+        return {"type": "null"}
+    if isinstance(node, ast.Subscript):
+        outer = _annotation_name(node.value)
+        inner = node.slice
+        if outer == "Optional":
+            return {"anyOf": [annotation_schema(inner), {"type": "null"}]}
+        if outer == "Union" and isinstance(inner, ast.Tuple):
+            return {"anyOf": [annotation_schema(elt) for elt in inner.elts]}
+        if outer in ("list", "List", "set", "Set", "Sequence"):
+            return {"type": "array", "items": annotation_schema(inner)}
+        if outer in ("dict", "Dict", "Mapping") and isinstance(inner, ast.Tuple) and len(inner.elts) == 2:
+            return {"type": "object", "additionalProperties": annotation_schema(inner.elts[1])}
+        return dict(_SIMPLE_TYPES.get(outer or "", {}))
+    return dict(_SIMPLE_TYPES.get(_annotation_name(node) or "", {}))
+
+
+def _title(name: str) -> str:
+    return name.replace("_", " ").title()
+
+
+def function_schema(fn: ast.AST) -> Dict[str, Any]:
+    """Argument schema of a function definition, in the shape FastMCP produces."""
+    assert isinstance(fn, (ast.FunctionDef, ast.AsyncFunctionDef))
+    args = fn.args
+    positional = args.posonlyargs + args.args
+    defaults: List[Optional[ast.expr]] = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    params = list(zip(positional, defaults)) + list(zip(args.kwonlyargs, args.kw_defaults))
+    properties: Dict[str, Any] = {}
+    required = []
+    for arg, default in params:
+        if arg.arg in ("self", "cls") or _annotation_name(arg.annotation) in _CONTEXT_ANNOTATIONS:
+            continue
+        schema = {"title": _title(arg.arg), **annotation_schema(arg.annotation)}
+        if default is None:
+            required.append(arg.arg)
+        else:
+            try:
+                schema["default"] = ast.literal_eval(default)
+            except ValueError:
+                pass
+        properties[arg.arg] = schema
+    result: Dict[str, Any] = {"properties": properties, "title": f"{fn.name}Arguments", "type": "object"}
+    if required:
+        result["required"] = required
+    return result
+
+
+def _tool_decorator(fn: ast.AST) -> Optional[ast.AST]:
+    for decorator in fn.decorator_list:  # type: ignore[attr-defined]
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        if isinstance(target, ast.Attribute) and target.attr == "tool":
+            return decorator
+    return None
+
+
+def _literal_kwargs(call: ast.AST) -> Dict[str, Any]:
+    values: Dict[str, Any] = {}
+    if not isinstance(call, ast.Call):
+        return values
+    if call.args:
+        try:
+            values["name"] = ast.literal_eval(call.args[0])
+        except ValueError:
+            pass
+    for keyword in call.keywords:
+        if keyword.arg is None:
+            continue
+        try:
+            values[keyword.arg] = ast.literal_eval(keyword.value)
+        except ValueError:
+            pass
+    return values
+
+
+def scan_source(source: str, module: str, filename: str = "<unknown>") -> List[ToolStub]:
+    """Return the stubs of the tools a module would register, without executing it."""
+    tree = ast.parse(source, filename)
+    stubs = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        docstring = ast.get_docstring(node)
+        decorator = _tool_decorator(node)
+        if decorator is not None:
+            options = _literal_kwargs(decorator)
+            name = options.pop("name", None) or node.name
+            description = options.pop("description", None) or docstring or ""
+        elif node.name.endswith(TOOL_SUFFIX):
+            options = {}
+            name = node.name.removesuffix(TOOL_SUFFIX)
+            description = docstring or "No description provided."
+        else:
+            continue
+        stubs.append(ToolStub(name, module, node.name, description, function_schema(node), options))
+    return stubs
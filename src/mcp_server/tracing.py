@@ -0,0 +1,257 @@
+"""
+Lightweight span tracing of the tool-call path.
+
+A Tracer records nested spans (name, start, duration, attributes, status) in a ContextVar, so
+spans opened in the lowlevel request handler, in ExtendedMCP.call_tool and in the tool wrappers
+form one trace per request. A W3C `traceparent` sent by the client in the request's `_meta`
+continues the client's trace, which links server spans to client-side spans. The sampling
+decision is made once per trace (or taken from the traceparent flags), so tracing can stay on in
+production at a low sample rate.
+
+Finished spans go to a pluggable SpanExporter. JsonlSpanExporter appends them as JSON lines to a
+local file from a background thread, in batches, so exporting never blocks the event loop.
+
+A Tracer without an exporter is disabled and its span() returns a shared no-op context manager.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_FILE = "mcp_traces.jsonl"
+DEFAULT_SAMPLE_RATE = 1.0
+
+_TRACEPARENT_RE = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_NOOP = nullcontext()
+
+
+class Span:
+    """One timed operation. `end_ns` is None while the span is open."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], start_ns: Optional[int] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        """W3C trace context header value identifying this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "duration_ms": (end_ns - self.start_ns) / 1e6,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+# The open span of the current task; _UNSAMPLED marks a trace that was not sampled.
+_UNSAMPLED = object()
+_current_span: ContextVar[Any] = ContextVar("mcp_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    span = _current_span.get()
+    return span if isinstance(span, Span) else None
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """Return (trace_id, parent span id, sampled) from a traceparent header value."""
+    if not value:
+        return None
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if not match:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class SpanExporter(ABC):
+    """Receives every finished, sampled span."""
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Hand off a finished span. Must not block."""
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends spans to a JSON-lines file from a background thread, in batches."""
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE, max_batch: int = 512, flush_interval: float = 1.0,
+                 max_queue: int = 100000):
+        self.path = path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    self._thread.start()
+
+    def export(self, span: Span) -> None:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            with open(self.path, "a") as f:
+                f.write("".join(json.dumps(record, default=str) + "\n" for record in batch))
+            self.exported += len(batch)
+        except OSError as e:
+            self.dropped += len(batch)
+            logger.warning(f"Could not write spans to {self.path}: {e}")
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch: List[Dict[str, Any]] = []
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            while True:
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def close(self) -> None:
+        """Flush the queued spans and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+class Tracer:
+    """Creates spans and hands the sampled ones to an exporter."""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = DEFAULT_SAMPLE_RATE):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.enabled = exporter is not None and sample_rate > 0
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, traceparent: Optional[str] = None,
+             start_ns: Optional[int] = None) -> ContextManager[Optional[Span]]:
+        """
+        Open a span as a child of the current one. Without a current span a new trace is started,
+        continuing `traceparent` if one is given, and sampled according to sample_rate.
+        """
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, attributes, traceparent, start_ns)
+
+    @contextmanager
+    def _span(self, name: str, attributes: Optional[Dict[str, Any]], traceparent: Optional[str],
+              start_ns: Optional[int]) -> Iterator[Optional[Span]]:
+        parent = _current_span.get()
+        if parent is _UNSAMPLED:
+            yield None
+            return
+        if isinstance(parent, Span):
+            span = Span(name, parent.trace_id, parent.span_id, start_ns, attributes)
+        else:
+            remote = parse_traceparent(traceparent)
+            if remote is not None:
+                trace_id, parent_id, sampled = remote
+            else:
+                trace_id, parent_id, sampled = os.urandom(16).hex(), None, random.random() < self.sample_rate
+            if not sampled:
+                token = _current_span.set(_UNSAMPLED)
+                try:
+                    yield None
+                finally:
+                    _current_span.reset(token)
+                return
+            span = Span(name, trace_id, parent_id, start_ns, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self.exporter.export(span)  # type: ignore[union-attr]
+
+    def record(self, name: str, start_ns: int, attributes: Optional[Dict[str, Any]] = None) -> None:
+        """Record a finished child span of the current span that started at `start_ns` and ends now."""
+        parent = current_span()
+        if not self.enabled or parent is None:
+            return
+        span = Span(name, parent.trace_id, parent.span_id, start_ns, attributes)
+        span.end_ns = time.time_ns()
+        self.exporter.export(span)  # type: ignore[union-attr]
+
+    def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+def create_tracer(option: Union[Tracer, Dict[str, Any], str, None]) -> Tracer:
+    """
+    Build a tracer from the server's `tracing` option: None (disabled), a Tracer, a JSONL file path,
+    or a dict {"path": ..., "sample_rate": ..., "exporter": SpanExporter}.
+    """
+    if option is None:
+        return Tracer()
+    if isinstance(option, Tracer):
+        return option
+    if isinstance(option, str):
+        return Tracer(JsonlSpanExporter(option))
+    if isinstance(option, dict):
+        exporter = option.get("exporter") or JsonlSpanExporter(option.get("path", DEFAULT_TRACE_FILE))
+        return Tracer(exporter, option.get("sample_rate", DEFAULT_SAMPLE_RATE))
+    raise ValueError(f"Invalid tracing option {option!r}; expected None, a Tracer, a file path or a dict.")
@@ -0,0 +1,278 @@
+"""
+Multi-process SSE serving.
+
+A single uvicorn process runs every session on one core. serve_workers starts `workers` server
+processes, each building its own ExtendedMCP from a factory ("module:callable") and serving its
+SSE app on a Unix socket, plus a small asyncio router in the main process that owns the public
+host and port.
+
+An SSE stream stays on one worker for its whole life, so the router keeps the worker of each
+stream:
+
+    - GET on the SSE path goes to the worker chosen by the client's x-session-id header (a stable
+      hash), or else to the worker with the fewest open streams. The router reads the session_id
+      of the transport's "endpoint" event on its way through and records it.
+    - POSTs to the message path go to the worker that owns their session_id query parameter, or
+      to the worker their x-session-id hashes to.
+    - Every other route (/health, /metrics, routes added with ExtendedMCP.route) goes to the
+      x-session-id worker or round-robin.
+
+The workers share session config and the dynamic tool registry through SQLite databases in the
+shared state directory (see ExtendedMCP's `shared_state` option), so a tool added through one
+worker is advertised and callable on every worker. Each worker polls the registry and sends
+notifications/tools/list_changed to its own sessions when another worker changed it. Tools
+registered without persist are shared the same way, but only until the workers are next started.
+"""
+
+import asyncio
+import importlib
+import itertools
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from mcp_server.mcp_extension import SHARED_STATE_ENV
+from mcp_server.registry_store import TOOLS_SQLITE_FILE, SQLiteRegistryStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARED_STATE_DIR = ".mcp_shared_state"
+# Number of worker processes used by the server entry points; 1 (the default) serves in-process.
+WORKERS_ENV = "MCP_WORKERS"
+WORKER_START_TIMEOUT = 60.0
+SESSION_HEADER = "x-session-id"
+
+# Settings of the factory-built server that the router in the main process needs.
+_ROUTER_SETTINGS = ("host", "port", "sse_path", "message_path", "log_level")
+_ENDPOINT_SESSION_RE = re.compile(rb"session_id=([0-9a-fA-F]+)")
+# Hop-by-hop headers are not forwarded (RFC 7230, section 6.1).
+_HOP_HEADERS = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+                "transfer-encoding", "upgrade", "host", "content-length"}
+
+
+def _load_factory(factory: str):
+    module_name, _, attr = factory.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "get_server")
+
+
+def _run_worker(factory: str, socket_path: str, shared_state: str, log_level: Optional[str], settings_queue: Any) -> None:
+    """
+    Worker process entry point: build the server and serve its SSE app on a Unix socket. The
+    server's settings are reported to the main process, whose router serves them publicly.
+    """
+    import uvicorn
+
+    os.environ[SHARED_STATE_ENV] = shared_state
+    server = _load_factory(factory)()
+    settings_queue.put({name: getattr(server.settings, name) for name in _ROUTER_SETTINGS})
+    uvicorn.run(server.sse_app(), uds=socket_path, log_level=(log_level or server.settings.log_level).lower())
+
+
+class SessionRouter:
+    """ASGI app forwarding requests to the worker that owns their session."""
+
+    def __init__(self, socket_paths: List[str], sse_path: str = "/sse", message_path: str = "/messages/"):
+        import httpx
+
+        self.socket_paths = socket_paths
+        self.sse_path = sse_path
+        self.message_path = message_path
+        # One connection pool per worker; streams are long-lived, so the pools are not limited.
+        self.clients = [
+            httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(uds=path), base_url="http://worker",
+                              timeout=httpx.Timeout(None), limits=httpx.Limits(max_connections=None,
+                                                                               max_keepalive_connections=100))
+            for path in socket_paths
+        ]
+        self.routes: Dict[str, int] = {}
+        self.open_streams = [0] * len(socket_paths)
+        self._round_robin = itertools.cycle(range(len(socket_paths)))
+
+    def _affine_worker(self, headers: Dict[str, str]) -> Optional[int]:
+        session_id = headers.get(SESSION_HEADER)
+        if not session_id:
+            return None
+        return zlib.crc32(session_id.encode()) % len(self.clients)
+
+    def pick_worker(self, path: str, query: Dict[str, str], headers: Dict[str, str]) -> Optional[int]:
+        """The worker for a request, or None for a message of an unknown session."""
+        if path.startswith(self.message_path):
+            worker = self.routes.get(query.get("session_id", ""))
+            return worker if worker is not None else self._affine_worker(headers)
+        worker = self._affine_worker(headers)
+        if worker is not None:
+            return worker
+        if path == self.sse_path:
+            return min(range(len(self.clients)), key=self.open_streams.__getitem__)
+        return next(self._round_robin)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        from starlette.requests import Request
+        from starlette.responses import Response
+
+        request = Request(scope, receive)
+        headers = {key: value for key, value in request.headers.items() if key not in _HOP_HEADERS}
+        worker = self.pick_worker(request.url.path, dict(request.query_params), headers)
+        if worker is None:
+            await Response("Could not find session", status_code=404)(scope, receive, send)
+            return
+        if request.method == "GET" and request.url.path == self.sse_path:
+            await self._stream(worker, request, headers, receive, send)
+            return
+        client = self.clients[worker]
+        upstream = await client.request(request.method, request.url.path, params=request.url.query,
+                                        headers=headers, content=await request.body())
+        response_headers = {key: value for key, value in upstream.headers.items() if key not in _HOP_HEADERS}
+        await Response(upstream.content, status_code=upstream.status_code, headers=response_headers)(scope, receive, send)
+
+    async def _stream(self, worker: int, request, headers: Dict[str, str], receive, send) -> None:
+        """Relay an SSE stream, recording its session's worker from the endpoint event."""
+        import anyio
+        import httpx
+
+        client = self.clients[worker]
+        session_id = None
+        self.open_streams[worker] += 1
+
+        async def relay() -> None:
+            nonlocal session_id
+            async with client.stream("GET", request.url.path, params=request.url.query, headers=headers) as upstream:
+                await send({
+                    "type": "http.response.start",
+                    "status": upstream.status_code,
+                    "headers": [(key.encode(), value.encode()) for key, value in upstream.headers.items()
+                                if key not in _HOP_HEADERS],
+                })
+                async for chunk in upstream.aiter_raw():
+                    if session_id is None:
+                        match = _ENDPOINT_SESSION_RE.search(chunk)
+                        if match:
+                            session_id = match.group(1).decode()
+                            self.routes[session_id] = worker
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        try:
+            async with anyio.create_task_group() as tg:
+                async def close_on_disconnect() -> None:
+                    # Closing the upstream stream ends the session on the worker.
+                    while (await receive())["type"] != "http.disconnect":
+                        pass
+                    tg.cancel_scope.cancel()
+
+                tg.start_soon(close_on_disconnect)
+                await relay()
+                tg.cancel_scope.cancel()
+        except (OSError, httpx.HTTPError) as e:
+            logger.debug(f"SSE stream on worker {worker} ended: {e}")
+        finally:
+            self.open_streams[worker] -= 1
+            if session_id is not None:
+                self.routes.pop(session_id, None)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.gather(*(client.aclose() for client in self.clients))
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": len(self.clients), "sessions": len(self.routes), "open_streams": list(self.open_streams)}
+
+
+def _wait_for_sockets(processes: List[Any], socket_paths: List[str], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while not all(os.path.exists(path) for path in socket_paths):
+        for process in processes:
+            if not process.is_alive():
+                raise RuntimeError(f"Worker {process.name} exited with code {process.exitcode} during startup.")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Workers did not start within {timeout} seconds.")
+        time.sleep(0.05)
+
+
+def _exit_on_sigterm(signum: int, frame: Any) -> None:
+    raise SystemExit(128 + signum)
+
+
+def serve_workers(
+    factory: str = "mcp_server:get_server",
+    workers: Optional[int] = None,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    shared_state: str = DEFAULT_SHARED_STATE_DIR,
+    log_level: Optional[str] = None,
+) -> None:
+    """
+    Serve the server built by `factory` from `workers` processes (default: one per core) behind a
+    session-affine router listening on host:port. Host, port, paths and log level default to the
+    settings of the server the factory builds. Blocks until interrupted.
+    """
+    import uvicorn
+
+    workers = workers or os.cpu_count() or 1
+    shared_state = os.path.abspath(shared_state)
+    os.makedirs(shared_state, exist_ok=True)
+    # Tools an earlier run registered without persist went away with it.
+    registry = SQLiteRegistryStore(os.path.join(shared_state, TOOLS_SQLITE_FILE))
+    registry.clear_ephemeral()
+    registry.close()
+    socket_dir = tempfile.mkdtemp(prefix="mcp-workers-")
+    socket_paths = [os.path.join(socket_dir, f"worker-{i}.sock") for i in range(workers)]
+    # Workers are spawned, not forked, so none inherits the parent's event loop or open sockets.
+    context = multiprocessing.get_context("spawn")
+    settings_queue = context.Queue()
+    processes = [
+        context.Process(target=_run_worker, args=(factory, path, shared_state, log_level, settings_queue),
+                        name=f"mcp-worker-{i}", daemon=True)
+        for i, path in enumerate(socket_paths)
+    ]
+    try:
+        for process in processes:
+            process.start()
+        _wait_for_sockets(processes, socket_paths, WORKER_START_TIMEOUT)
+        # Every worker reports its settings before it binds its socket; they are built by the same factory.
+        settings = settings_queue.get(timeout=WORKER_START_TIMEOUT)
+        host = host or settings["host"]
+        port = port or settings["port"]
+        log_level = log_level or settings["log_level"]
+        logger.info(f"Serving {factory} from {workers} workers on {host}:{port}")
+        # uvicorn re-raises the SIGTERM it shut down on; exit through the finally below so the workers stop too.
+        signal.signal(signal.SIGTERM, _exit_on_sigterm)
+        uvicorn.run(SessionRouter(socket_paths, settings["sse_path"], settings["message_path"]), host=host, port=port,
+                    log_level=log_level.lower())
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                # A worker still draining an SSE stream would never finish its graceful shutdown.
+                process.kill()
+                process.join()
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+def run_sse(factory: str = "mcp_server:get_server") -> None:
+    """Serve over SSE in-process, or from MCP_WORKERS worker processes when it is above 1."""
+    workers = int(os.environ.get(WORKERS_ENV, "1"))
+    if workers > 1:
+        serve_workers(factory, workers)
+    else:
+        _load_factory(factory)().run(transport="sse")
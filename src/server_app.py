@@ -1,6 +1,6 @@
-from mcp_server import mcp
-import tools
+import logging
+from mcp_server.workers import run_sse
 if __name__ == "__main__":
-    print(mcp.settings.port)
-    print(mcp.settings.host)
-    mcp.run(transport="sse")
+    logging.basicConfig(level=logging.DEBUG)
+    # One process by default; set MCP_WORKERS to serve from several (see mcp_server.workers).
+    run_sse("mcp_server:get_server")
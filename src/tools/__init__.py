@@ -9,49 +9,187 @@ reference, and is registered with the MCP instance via mcp.add_tool.
 
 Usage:
     The load_tools(mcp) function should be called with a valid MCP instance to automatically
-    load and register all available tools in the package.
+    load and register all available tools in the package. Importing this package does not
+    register anything by itself.
+
+    register_tool_stubs(mcp) is the lazy alternative used by mcp_server.create_server: it reads the
+    tool modules' source with the ast module (see mcp_server.tool_stubs) and advertises each tool
+    with a schema derived from its signature, importing the module only when the tool is first called.
 
 Mechanism:
     - Utilizes pkgutil.walk_packages to iterate over all submodules.
     - Uses importlib.import_module to dynamically import modules.
     - Inspects each module for functions matching the "_tool" naming pattern.
-    - Registers each tool with the MCP using the provided tool configuration.
+    - Skips functions (and tool names) that are already registered, e.g. through @mcp.tool,
+      using sets of the registered function identities and names.
+    - Records the result in a discovery manifest (.tool_discovery.json in the working directory)
+      keyed by the modification times of the modules and package directories. When nothing changed,
+      the next start imports the listed modules and registers the listed functions without walking
+      and inspecting the package again.
 """
 
-import pkgutil
 import importlib
 import inspect
-from mcp_server import mcp, ExtendedMCPType
+import json
+import os
+import pkgutil
+import tempfile
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from mcp_server.tool_stubs import TOOL_SUFFIX, ToolStub, scan_source
 import logging
+if TYPE_CHECKING:
+    from mcp_server import ExtendedMCPType
 logger = logging.getLogger(__name__)
 
-def load_tools(mcp: ExtendedMCPType):
+# Kept outside the package: writing it inside a scanned directory would change the mtime it records.
+MANIFEST_PATH = ".tool_discovery.json"
+MANIFEST_VERSION = 1
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class _Registered:
+    """Identities and names of the tools registered on `mcp`, refreshed when its registry version changes."""
+
+    def __init__(self, mcp: "ExtendedMCPType"):
+        self.mcp = mcp
+        self.functions: Set[Any] = set()
+        self.names: Set[str] = set()
+        self._seen_version: Optional[str] = None
+
+    def refresh(self) -> None:
+        # The version also changes when a tool is replaced, e.g. a LazyTool by the Tool it resolved to,
+        # which leaves the tool count as it was.
+        version = self.mcp.registry_version
+        if version == self._seen_version:
+            return
+        tools = self.mcp._tool_manager._tools  # type: ignore
+        self.names.update(tools)
+        for tool in tools.values():
+            fn = getattr(tool, "fn", None)
+            if fn is not None:
+                # Registered functions are wrapped; functools.wraps keeps the original in __wrapped__.
+                self.functions.add(inspect.unwrap(fn))
+        self._seen_version = version
+
+
+def _register_module_tools(mcp: "ExtendedMCPType", module: Any, attrs: List[str], registered: _Registered) -> None:
+    registered.refresh()
+    for attr in attrs:
+        obj = getattr(module, attr, None)
+        if not inspect.isfunction(obj):
+            continue
+        tool_name = attr.removesuffix(TOOL_SUFFIX)
+        if obj in registered.functions or tool_name in registered.names:
+            logger.debug(f"Tool {tool_name} already registered, skipping.")
+            continue
+        # Register the tool with the MCP instance
+        mcp.add_tool(fn=obj, name=tool_name, description=obj.__doc__ or "No description provided.")
+        registered.functions.add(obj)
+        registered.names.add(tool_name)
+
+
+def _load_manifest() -> Optional[Dict[str, Any]]:
+    """The manifest, if it exists and every recorded directory and module is unchanged."""
+    try:
+        with open(MANIFEST_PATH, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    # A directory's mtime changes when a module is added, removed or renamed in it.
+    for path, mtime in manifest.get("dirs", {}).items():
+        if _mtime(path) != mtime:
+            return None
+    for entry in manifest.get("modules", {}).values():
+        if entry["file"] is not None and _mtime(entry["file"]) != entry["mtime"]:
+            return None
+    return manifest
+
+
+def _save_manifest(manifest: Dict[str, Any]) -> None:
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(MANIFEST_PATH)), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, MANIFEST_PATH)
+    except OSError as e:
+        logger.warning(f"Could not write the tool discovery manifest: {e}")
+
+
+def _discover() -> Tuple[List[Tuple[Any, List[str]]], Dict[str, Any]]:
+    """Walk the package. Returns the imported modules with their tool function names, and a manifest."""
+    dirs = {os.path.abspath(path): _mtime(path) for path in __path__}
+    modules = []
+    entries = {}
+    for finder, module_name, ispkg in pkgutil.walk_packages(__path__, __name__ + "."):
+        module = importlib.import_module(module_name)
+        if ispkg:
+            for path in getattr(module, "__path__", []):
+                dirs[os.path.abspath(path)] = _mtime(path)
+        attrs = [
+            name for name, obj in vars(module).items()
+            if name.endswith(TOOL_SUFFIX) and inspect.isfunction(obj)
+        ]
+        module_file = getattr(module, "__file__", None)
+        modules.append((module, attrs))
+        entries[module_name] = {"file": module_file, "mtime": _mtime(module_file) if module_file else None, "tools": attrs}
+    return modules, {"version": MANIFEST_VERSION, "dirs": dirs, "modules": entries}
+
+
+def load_tools(mcp: "ExtendedMCPType", use_manifest: bool = True):
     """
     Automatically scan modules within this package, find all functions
     whose names end with '_tool', and add them to the MCP instance via mcp.add_tool.
 
     Parameters:
         mcp: The MCP instance which maintains the list of available tools.
+        use_manifest: Reuse the discovery manifest when the package is unchanged.
     """
-    # __path__ is available in packages to list submodules
-    for finder, module_name, ispkg in pkgutil.walk_packages(__path__, __name__ + "."):
-        module = importlib.import_module(module_name)
-        for name, obj in inspect.getmembers(module):
-            for existing_tool in mcp._tool_manager.list_tools(): #type: ignore
-                if obj == existing_tool.fn:
-                    print(f"Tool {name} already registered, skipping.")
-                    break
-            if inspect.isfunction(obj) and name.endswith("_tool"):
-                tool_config = {
-                    "name": name.removesuffix("_tool"),
-                    "description": obj.__doc__ or "No description provided.",
-                    "fn": obj
-                }
-                # Register the tool with the MCP instance
-                mcp.add_tool(**tool_config)
-    print("Logged all tools in the package.") #type: ignore
-    print(mcp._tool_manager._tools.keys())
-
-load_tools(mcp)
-# This will automatically load all tools defined in this package that end with "_tool"
-# and register them with the MCP instance.
+    registered = _Registered(mcp)
+    manifest = _load_manifest() if use_manifest else None
+    if manifest is not None:
+        # Modules are imported in the recorded order so decorator registrations happen as before.
+        modules = [(importlib.import_module(name), entry["tools"]) for name, entry in manifest["modules"].items()]
+    else:
+        modules, manifest = _discover()
+        _save_manifest(manifest)
+    for module, attrs in modules:
+        _register_module_tools(mcp, module, attrs, registered)
+    logger.info(f"Logged all tools in the package: {list(mcp._tool_manager._tools.keys())}")  # type: ignore
+
+
+def scan_tool_stubs() -> List[ToolStub]:
+    """Stubs of every tool in the package, read from source without importing any module."""
+    stubs = []
+    for root_path in __path__:
+        for dirpath, dirnames, filenames in os.walk(root_path):
+            dirnames[:] = sorted(d for d in dirnames if os.path.exists(os.path.join(dirpath, d, "__init__.py")))
+            relative = os.path.relpath(dirpath, root_path)
+            package = __name__ if relative == "." else ".".join([__name__] + relative.split(os.sep))
+            for filename in sorted(filenames):
+                if not filename.endswith(".py") or (dirpath == root_path and filename == "__init__.py"):
+                    continue
+                module_name = package if filename == "__init__.py" else f"{package}.{filename[:-3]}"
+                path = os.path.join(dirpath, filename)
+                try:
+                    with open(path, "r") as f:
+                        stubs.extend(scan_source(f.read(), module_name, path))
+                except (OSError, SyntaxError, UnicodeDecodeError) as e:
+                    logger.warning(f"Could not scan {path} for tools: {e}")
+    return stubs
+
+
+def register_tool_stubs(mcp: "ExtendedMCPType"):
+    """
+    Advertise every tool in the package from its AST-derived stub. Each module is imported on
+    the first call of one of its tools.
+    """
+    for stub in scan_tool_stubs():
+        mcp.add_tool_stub(stub)
@@ -31,7 +31,8 @@ def google_search_web_tool(num_results=5):
     return func
 
 @mcp.tool(name="create_ppt",
-          description="Generates a PowerPoint presentation with provided title, content and references.")
+          description="Generates a PowerPoint presentation with provided title, content and references.",
+          execution="process", coalesce=False, max_concurrency=2, max_queue=8)
 def generate_presentation_tool(title: str, content: str, references: list):
     """
     Generates a PowerPoint presentation with a title slide and a references slide.
@@ -0,0 +1,76 @@
+"""Helpers shared by the server and client tests: isolated servers and in-memory sessions."""
+
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+import anyio
+import mcp.types as types
+from mcp import ClientSession
+from mcp.shared.memory import create_client_server_memory_streams
+
+from mcp_server.lowlevel import connection_state
+from mcp_server.mcp_extension import ExtendedMCP
+from mcp_server.registry_store import JournalRegistryStore
+from mcp_server.session_state import SessionState
+
+
+def make_server(tmp_path, **kwargs: Any) -> ExtendedMCP:
+    """An ExtendedMCP whose registry, module store and caches all live under `tmp_path`."""
+    options = {
+        "registry_store": JournalRegistryStore(os.path.join(tmp_path, "registered_tools.json")),
+        "persist_tools_dir": os.path.join(tmp_path, "persist_tools"),
+        "tool_code_cache_dir": None,
+        "tool_result_cache_dir": os.path.join(tmp_path, "results"),
+        "load_persisted_tools": False,
+        "log_level": "WARNING",
+        **kwargs,
+    }
+    return ExtendedMCP("test", **options)
+
+
+def initialize_request(env_config: Optional[dict] = None) -> types.ClientRequest:
+    params = types.InitializeRequestParams(
+        protocolVersion=types.LATEST_PROTOCOL_VERSION,
+        capabilities=types.ClientCapabilities(),
+        clientInfo=types.Implementation(name="test", version="0"),
+    )
+    if env_config is not None:
+        params.env_config = env_config  # type: ignore[attr-defined]
+    return types.ClientRequest(types.InitializeRequest(method="initialize", params=params))
+
+
+@asynccontextmanager
+async def serve_streams(server: ExtendedMCP, session_id: Optional[str] = None) -> AsyncIterator[Any]:
+    """The client ends of in-memory streams to a server session of `server`; no handshake is made."""
+    async with create_client_server_memory_streams() as (client_streams, server_streams):
+        async with anyio.create_task_group() as tg:
+            async def run_server():
+                connection_state.set(SessionState(session_id=session_id))
+                lowlevel = server._mcp_server
+                await lowlevel.run(server_streams[0], server_streams[1], lowlevel.create_initialization_options())
+
+            tg.start_soon(run_server)
+            try:
+                yield client_streams
+            finally:
+                tg.cancel_scope.cancel()
+
+
+@asynccontextmanager
+async def connect(server: ExtendedMCP, env_config: Optional[dict] = None, session_id: Optional[str] = None,
+                  **session_kwargs: Any) -> AsyncIterator[ClientSession]:
+    """An initialized client session talking to `server` over in-memory streams."""
+    async with serve_streams(server, session_id) as client_streams:
+        async with ClientSession(*client_streams, **session_kwargs) as session:
+            result = await session.send_request(initialize_request(env_config), types.InitializeResult)
+            assert result.serverInfo.name == "test"
+            await session.send_notification(
+                types.ClientNotification(types.InitializedNotification(method="notifications/initialized"))
+            )
+            yield session
+
+
+def text_of(result: types.CallToolResult) -> str:
+    """The concatenated text content of a tool result."""
+    return "".join(content.text for content in result.content if isinstance(content, types.TextContent))
@@ -0,0 +1,70 @@
+"""Admission control: bounded concurrency, FIFO queueing and -32001 rejections."""
+
+import asyncio
+
+import pytest
+from mcp.shared.exceptions import McpError
+
+from mcp_server.admission import SERVER_OVERLOADED, ConcurrencyLimiter
+
+from tests.support import connect, make_server, text_of
+
+
+def test_limiter_queues_then_rejects():
+    limiter = ConcurrencyLimiter("test", limit=1, max_queue=1)
+    order = []
+
+    async def job(n):
+        async with limiter.slot():
+            order.append(n)
+            await asyncio.sleep(0.02)
+
+    async def main():
+        first = asyncio.create_task(job(1))
+        second = asyncio.create_task(job(2))
+        await asyncio.sleep(0)
+        with pytest.raises(McpError) as rejected:
+            await job(3)
+        await asyncio.gather(first, second)
+        return rejected.value
+
+    error = asyncio.run(main())
+    assert error.error.code == SERVER_OVERLOADED
+    assert order == [1, 2]
+    stats = limiter.stats()
+    assert (stats["admitted"], stats["rejected"], stats["active"], stats["queued"]) == (2, 1, 0, 0)
+
+
+def test_cancelled_waiters_leave_the_queue():
+    limiter = ConcurrencyLimiter("test", limit=1, max_queue=2)
+
+    async def main():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.release()
+
+    asyncio.run(main())
+    assert limiter.stats()["active"] == 0 and limiter.stats()["queued"] == 0
+
+
+def test_overloaded_tools_answer_with_a_json_rpc_error(tmp_path):
+    server = make_server(tmp_path)
+
+    @server.tool(max_concurrency=1, max_queue=0)
+    async def busy() -> str:
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        async with connect(server) as session:
+            return await asyncio.gather(session.call_tool("busy", {}), session.call_tool("busy", {}),
+                                        return_exceptions=True)
+
+    first, second = asyncio.run(main())
+    assert text_of(first) == "done"
+    assert isinstance(second, McpError)
+    assert second.error.code == SERVER_OVERLOADED
+    assert server.admission_stats()["tools"]["busy"]["rejected"] == 1
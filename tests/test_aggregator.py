@@ -0,0 +1,181 @@
+"""Aggregating client: namespaced routing, slow and failed servers, and servers that die."""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+from mcp.shared.exceptions import McpError
+
+from config import ClientSessionConfig, SSEConnection, ServerConnection
+from mcp_client.aggregator import MCPAggregator
+from mcp_client.detailed_client_sse import NaviClientSession, open_mcp_session
+from mcp_server.mcp_extension import ExtendedMCP
+
+from tests.support import make_server, serve_streams, text_of
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REMOTE_SERVER = '''
+import sys
+from mcp_server.mcp_extension import ExtendedMCP
+
+server = ExtendedMCP("remote", host="127.0.0.1", port=int(sys.argv[1]), log_level="WARNING",
+                     load_persisted_tools=False, tool_code_cache_dir=None)
+
+@server.tool()
+async def wait(seconds: float) -> str:
+    import asyncio
+    await asyncio.sleep(seconds)
+    return "waited"
+
+server.run(transport="sse")
+'''
+
+
+@asynccontextmanager
+async def memory_session(server, context):
+    async with serve_streams(server) as streams:
+        async with NaviClientSession(*streams, config_params=context) as session:
+            await session.initialize()
+            yield session
+
+
+def opener(transport, connection_params, session_params, context):
+    """In-memory sessions for ExtendedMCP instances, the real transports for everything else."""
+    if isinstance(connection_params, ExtendedMCP):
+        return memory_session(connection_params, context)
+    if isinstance(connection_params, Exception):
+        raise connection_params
+    return open_mcp_session(transport, connection_params, session_params, context)
+
+
+def echo_server(tmp_path, name):
+    server = make_server(tmp_path / name)
+
+    @server.tool()
+    def echo(text: str) -> str:
+        return f"{name}: {text}"
+
+    return server
+
+
+def local(name, server):
+    return ServerConnection(name=name, transport="stdio", connection_params=server)
+
+
+def test_tools_are_namespaced_and_routed(tmp_path):
+    servers = [local("docs", echo_server(tmp_path, "docs")), local("code", echo_server(tmp_path, "code")),
+               local("broken", OSError("no such server"))]
+
+    async def main():
+        async with MCPAggregator(servers, opener=opener) as aggregator:
+            names = [tool.name for tool in await aggregator.list_tools()]
+            schemas = await aggregator.anthropic_tools()
+            result = await aggregator.call_tool("code__echo", {"text": "hi"})
+            with pytest.raises(ValueError, match="Unknown tool"):
+                await aggregator.call_tool("docs__missing", {})
+            with pytest.raises(RuntimeError, match="MCP server broken is not connected \\(failed\\)"):
+                await aggregator.call_tool("broken__echo", {})
+            return names, schemas, result, aggregator.status()
+
+    names, schemas, result, status = asyncio.run(main())
+    assert sorted(names) == ["code__echo", "docs__echo"]
+    assert sorted(schema["name"] for schema in schemas) == sorted(names)
+    assert text_of(result) == "code: hi"
+    assert status["broken"]["status"] == "failed" and status["broken"]["error"] == "no such server"
+    assert status["docs"] == {"transport": "stdio", "status": "connected", "tools": 1, "error": None}
+
+
+def test_server_names_must_not_contain_the_separator(tmp_path):
+    servers = [local("a", echo_server(tmp_path, "a")), local("a__b", echo_server(tmp_path, "a__b"))]
+    with pytest.raises(ValueError, match="must not contain the separator '__': \\['a__b'\\]"):
+        MCPAggregator(servers, opener=opener)
+    # Another separator makes the same names unambiguous.
+    assert MCPAggregator(servers, separator="--", opener=opener).namespaced("a__b", "x") == "a__b--x"
+
+
+def test_slow_servers_join_once_connected(tmp_path):
+    slow = echo_server(tmp_path, "slow")
+
+    @asynccontextmanager
+    async def slow_opener(transport, connection_params, session_params, context):
+        if connection_params is slow:
+            await asyncio.sleep(0.3)
+        async with memory_session(connection_params, context) as session:
+            yield session
+
+    async def main():
+        aggregator = MCPAggregator([local("fast", echo_server(tmp_path, "fast")), local("slow", slow)],
+                                   opener=slow_opener, connect_timeout=0.05)
+        try:
+            await aggregator.connect()
+            before = sorted(tool.name for tool in await aggregator.list_tools())
+            await asyncio.sleep(0.5)
+            after = sorted(tool.name for tool in await aggregator.list_tools())
+            return before, after
+        finally:
+            await aggregator.close()
+
+    before, after = asyncio.run(main())
+    assert before == ["fast__echo"]
+    assert after == ["fast__echo", "slow__echo"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_calls_to_a_killed_server_are_rejected_quickly(tmp_path):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT_DIR, "src"))
+    process = subprocess.Popen([sys.executable, "-c", REMOTE_SERVER, str(port)], cwd=str(tmp_path), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            assert process.poll() is None, "the remote server exited during startup"
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=1)
+                break
+            except httpx.HTTPError:
+                assert time.monotonic() < deadline, "the remote server did not start"
+                time.sleep(0.1)
+
+        remote = ServerConnection(name="remote", transport="sse", connection_params=SSEConnection(
+            url=f"http://127.0.0.1:{port}/sse", timeout=5, sse_read_timeout=300))
+        servers = [remote, local("local", echo_server(tmp_path, "local"))]
+
+        async def main():
+            async with MCPAggregator(servers, ClientSessionConfig(), opener=opener) as aggregator:
+                assert aggregator.status()["remote"]["status"] == "connected"
+                in_flight = asyncio.create_task(aggregator.call_tool("remote__wait", {"seconds": 30}))
+                await asyncio.sleep(0.2)
+                process.kill()
+                start = time.monotonic()
+                with pytest.raises(McpError, match="Connection closed"):
+                    await in_flight
+                for _ in range(100):
+                    if aggregator.status()["remote"]["status"] == "failed":
+                        break
+                    await asyncio.sleep(0.02)
+                with pytest.raises(RuntimeError) as rejected:
+                    await aggregator.call_tool("remote__wait", {"seconds": 0})
+                elapsed = time.monotonic() - start
+                healthy = await aggregator.call_tool("local__echo", {"text": "still here"})
+                return rejected.value, elapsed, healthy, [tool.name for tool in await aggregator.list_tools()]
+
+        rejected, elapsed, healthy, names = asyncio.run(main())
+        assert str(rejected) == "MCP server remote is not connected (failed)."
+        assert elapsed < 5
+        assert text_of(healthy) == "local: still here"
+        assert names == ["local__echo"]
+    finally:
+        process.kill()
+        process.wait()
@@ -0,0 +1,64 @@
+"""Bulk registration of dynamic tools: per-definition results, one write and one list_changed."""
+
+import asyncio
+import os
+
+import mcp.types as types
+
+from tests.support import connect, make_server, text_of
+
+
+def definition(name, body="return 'ok'"):
+    return {"name": name, "func_name": name, "description": f"Tool {name}.", "persist": True,
+            "code": f"def {name}() -> str:\n    {body}\n"}
+
+
+def test_bulk_registration_reports_each_definition(tmp_path):
+    server = make_server(tmp_path, tool_code_cache_dir=str(tmp_path / "code_cache"))
+    definitions = [definition("bulk_one"), {"description": "no name"}, definition("bulk_broken", "return ("),
+                   definition("bulk_two", "return 'two'")]
+    notifications = []
+
+    async def on_message(message):
+        if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+            notifications.append(message)
+
+    async def main():
+        async with connect(server, message_handler=on_message) as session:
+            results = await server.add_tools_bulk(definitions)
+            called = text_of(await session.call_tool("bulk_two", {}))
+            await asyncio.sleep(0.05)
+            return results, called
+
+    try:
+        results, called = asyncio.run(main())
+    finally:
+        server.tool_executor.shutdown()
+    assert [result["status"] for result in results] == ["success", "error", "error", "success"]
+    assert "compile" in results[2]["message"]
+    assert called == "two"
+    assert len(notifications) == 1
+    assert sorted(server.registry_store.load()) == ["bulk_one", "bulk_two"]
+    assert len(os.listdir(tmp_path / "code_cache")) == 2
+
+
+def test_duplicate_names_replace_the_running_tool(tmp_path):
+    server = make_server(tmp_path)
+    server.add_tool_dynamically("dup", "dup", "First.", code="def dup() -> str:\n    return 'first'\n")
+
+    async def main():
+        async with connect(server) as session:
+            results = await server.add_tools_bulk([definition("dup", "return 'second'"), definition("dup", "return 'third'")])
+            return results, text_of(await session.call_tool("dup", {}))
+
+    results, called = asyncio.run(main())
+    assert [result["status"] for result in results] == ["success", "success"]
+    # The process serves what was persisted last, as a restart would.
+    assert called == "third"
+    restarted = make_server(tmp_path, load_persisted_tools=True)
+
+    async def after_restart():
+        async with connect(restarted) as session:
+            return text_of(await session.call_tool("dup", {}))
+
+    assert asyncio.run(after_restart()) == "third"
@@ -0,0 +1,87 @@
+"""Single-flight coalescing: opt-in, keyed by env, and never for Context-taking or streaming tools."""
+
+import asyncio
+
+from mcp.server.fastmcp import Context
+
+from mcp_server.single_flight import SingleFlight
+
+from tests.support import connect, make_server, text_of
+
+
+def test_single_flight_shares_one_execution():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["done"] * 3
+    assert runs == [1]
+    assert flight.stats() == {"executed": 1, "coalesced": 2, "in_flight": 0}
+
+
+def run_sessions(server, tool, env_configs, logs=None):
+    """Call `tool` concurrently from one session per env_config; returns the results in order."""
+    async def call(index, env_config):
+        async def on_log(params):
+            logs.setdefault(index, []).append(params.data)
+
+        async with connect(server, env_config=env_config, logging_callback=on_log) as session:
+            return text_of(await session.call_tool(tool, {"message": "hi"}))
+
+    async def main():
+        return await asyncio.gather(*(call(i, env) for i, env in enumerate(env_configs)))
+
+    return asyncio.run(main())
+
+
+def test_tools_do_not_coalesce_by_default(tmp_path):
+    server = make_server(tmp_path)
+
+    @server.tool()
+    async def slow(message: str) -> str:
+        await asyncio.sleep(0.05)
+        return message
+
+    assert run_sessions(server, "slow", [None, None]) == ["hi", "hi"]
+    assert server.coalescing_stats() == {}
+
+
+def test_opted_in_tools_coalesce_per_env(tmp_path):
+    server = make_server(tmp_path)
+
+    @server.tool(coalesce=True)
+    async def slow(message: str) -> str:
+        await asyncio.sleep(0.05)
+        return message
+
+    run_sessions(server, "slow", [{"USER": "a"}, {"USER": "a"}, {"USER": "b"}])
+    assert server.coalescing_stats()["slow"]["executed"] == 2
+    assert server.coalescing_stats()["slow"]["coalesced"] == 1
+
+
+def test_context_tools_never_coalesce_across_sessions(tmp_path):
+    """Each session must get the log messages of its own call."""
+    server = make_server(tmp_path, coalesce_tool_calls=True)
+
+    @server.tool(coalesce=True)
+    async def echo(message: str, context: Context) -> str:
+        await context.info(f"info for {message}")
+        await asyncio.sleep(0.05)
+        return message
+
+    @server.tool()
+    async def stream(message: str):
+        yield message
+
+    logs = {}
+    assert run_sessions(server, "echo", [None, None], logs) == ["hi", "hi"]
+    assert logs == {0: ["info for hi"], 1: ["info for hi"]}
+    assert "echo" not in server.coalescing_stats()
+    assert "stream" not in server.coalescing_stats()
@@ -0,0 +1,43 @@
+"""Content-hash code cache for dynamically registered tool source."""
+
+import os
+
+from mcp_server.code_cache import CodeCache
+
+SOURCE = "import math\n\ndef circle_area(r):\n    return math.pi * r * r\n"
+
+
+def test_functions_are_reused_in_memory(tmp_path):
+    cache = CodeCache(str(tmp_path))
+    first = cache.load_function(SOURCE, "circle_area")
+    assert first(1) > 3.14
+    assert cache.load_function(SOURCE, "circle_area") is first
+    assert cache.stats() == {"size": 1, "hits": 1, "disk_hits": 0, "misses": 1}
+
+
+def test_compiled_code_is_read_back_from_disk(tmp_path):
+    CodeCache(str(tmp_path)).load_function(SOURCE, "circle_area")
+    assert len(os.listdir(tmp_path)) == 1
+
+    fresh = CodeCache(str(tmp_path))
+    assert fresh.load_function(SOURCE, "circle_area")(2) > 12.5
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_corrupt_entries_are_recompiled(tmp_path):
+    CodeCache(str(tmp_path)).load_function(SOURCE, "circle_area")
+    (entry,) = os.listdir(tmp_path)
+    with open(os.path.join(tmp_path, entry), "wb") as f:
+        f.write(b"not a code object")
+
+    fresh = CodeCache(str(tmp_path))
+    assert fresh.load_function(SOURCE, "circle_area")(1) > 3.14
+    assert fresh.stats()["disk_hits"] == 0
+
+
+def test_memory_level_is_bounded_and_disk_level_optional():
+    cache = CodeCache(None, max_functions=2)
+    for n in range(3):
+        assert cache.load_function(f"def f():\n    return {n}\n", "f")() == n
+    assert cache.stats()["size"] == 2
+    assert cache.load_function("x = 1\n", "f") is None
@@ -0,0 +1,46 @@
+"""Per-call environment overlay: each session's env_config is visible to its own tool calls only."""
+
+import asyncio
+import os
+
+from mcp_server.env_overlay import current_env, env_overlay, freeze_env_config, get_env, merge_env
+
+from tests.support import connect, make_server, text_of
+
+
+def test_overlay_is_scoped_to_the_block():
+    with env_overlay(freeze_env_config({"OVERLAY_TEST_KEY": "inner"})):
+        assert get_env("OVERLAY_TEST_KEY") == "inner"
+        with env_overlay(freeze_env_config({"OVERLAY_TEST_OTHER": 1})):
+            assert dict(current_env()) == {"OVERLAY_TEST_KEY": "inner", "OVERLAY_TEST_OTHER": "1"}
+    assert get_env("OVERLAY_TEST_KEY", "unset") == "unset"
+    assert "OVERLAY_TEST_KEY" not in os.environ
+
+
+def test_merge_env_prefers_the_override_and_avoids_copies():
+    base = freeze_env_config({"A": "1", "B": "2"})
+    override = freeze_env_config({"B": "3"})
+    assert dict(merge_env(base, override)) == {"A": "1", "B": "3"}
+    assert merge_env(base, freeze_env_config(None)) is base
+
+
+def test_concurrent_sessions_see_their_own_env(tmp_path):
+    """Interleaved calls from two sessions never see each other's env_config, nor change os.environ."""
+    server = make_server(tmp_path)
+
+    @server.tool()
+    async def whoami() -> str:
+        await asyncio.sleep(0.01)
+        return get_env("OVERLAY_TEST_USER", "nobody")
+
+    async def calls(user):
+        async with connect(server, env_config={"OVERLAY_TEST_USER": user}) as session:
+            return [text_of(await session.call_tool("whoami", {})) for _ in range(5)]
+
+    async def main():
+        return await asyncio.gather(calls("alice"), calls("bob"))
+
+    alice, bob = asyncio.run(main())
+    assert alice == ["alice"] * 5
+    assert bob == ["bob"] * 5
+    assert "OVERLAY_TEST_USER" not in os.environ
@@ -0,0 +1,76 @@
+"""Execution policies: sync tools run inline unless they opt in to a pool, and keep their env overlay."""
+
+import asyncio
+import threading
+
+import pytest
+
+from mcp_server.env_overlay import freeze_env_config, get_env
+from mcp_server.executors import ExecutionPolicy, ToolExecutor
+
+from tests.support import connect, make_server, text_of
+
+
+def read_env(key):
+    return get_env(key, "unset")
+
+
+def test_executor_carries_the_env_into_each_policy():
+    executor = ToolExecutor(max_threads=2, max_processes=1)
+    env = freeze_env_config({"EXECUTOR_TEST_KEY": "value"})
+
+    async def main():
+        return [await executor.run(policy, read_env, env, ("EXECUTOR_TEST_KEY",), {}) for policy in ExecutionPolicy]
+
+    try:
+        assert asyncio.run(main()) == ["value"] * 3
+        stats = executor.stats()
+        assert stats["thread"]["completed"] == 1
+        assert stats["process"]["completed"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match="Unknown execution policy"):
+        ExecutionPolicy.coerce("fiber", ExecutionPolicy.INLINE)
+
+
+def test_sync_tools_run_inline_by_default(tmp_path):
+    """Only tools that declare execution="thread" leave the event loop thread."""
+    server = make_server(tmp_path)
+
+    @server.tool()
+    def default_tool() -> str:
+        return threading.current_thread().name
+
+    @server.tool(execution="thread")
+    def threaded_tool() -> str:
+        return f"{threading.current_thread().name} {get_env('EXECUTOR_TEST_USER', 'unset')}"
+
+    async def main():
+        loop_thread = threading.current_thread().name
+        async with connect(server, env_config={"EXECUTOR_TEST_USER": "alice"}) as session:
+            inline = text_of(await session.call_tool("default_tool", {}))
+            threaded = text_of(await session.call_tool("threaded_tool", {}))
+        return loop_thread, inline, threaded
+
+    try:
+        loop_thread, inline, threaded = asyncio.run(main())
+    finally:
+        server.tool_executor.shutdown()
+    assert inline == loop_thread
+    thread_name, user = threaded.split()
+    assert thread_name.startswith("mcp-tool")
+    assert user == "alice"
+    assert server.executor_stats()["thread"]["completed"] == 1
+
+
+def test_async_tools_cannot_be_offloaded(tmp_path):
+    server = make_server(tmp_path)
+
+    async def async_tool() -> str:
+        return "ok"
+
+    with pytest.raises(ValueError, match="must use the inline execution policy"):
+        server.add_tool(async_tool, execution="thread")
@@ -0,0 +1,114 @@
+"""NaviClientSession handshake: env_config on initialize, cached results and message ordering."""
+
+import asyncio
+import uuid
+from datetime import timedelta
+
+import anyio
+import mcp.types as types
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.shared.memory import create_client_server_memory_streams
+
+from mcp_client.detailed_client_sse import NaviClientSession
+from mcp_server.env_overlay import get_env
+
+from tests.support import make_server, serve_streams, text_of
+
+
+class RecordingStream:
+    """A write stream recording the method of every message sent through it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.methods = []
+
+    async def send(self, message):
+        self.methods.append(getattr(message.root, "method", None))
+        await self.stream.send(message)
+
+    async def __aenter__(self):
+        await self.stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self.stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def env_server(tmp_path):
+    server = make_server(tmp_path)
+
+    @server.tool()
+    def read_key() -> str:
+        return get_env("HANDSHAKE_KEY", "unset")
+
+    return server
+
+
+def test_cached_handshakes_write_initialize_before_initialized(tmp_path):
+    server = env_server(tmp_path)
+    server_key = f"memory://{uuid.uuid4()}"
+
+    async def session_run(value):
+        async with serve_streams(server) as (read, write):
+            recorder = RecordingStream(write)
+            async with NaviClientSession(read, recorder, config_params={"HANDSHAKE_KEY": value},
+                                         server_key=server_key) as session:
+                result = await session.initialize()
+                text = text_of(await session.call_tool("read_key", {}))
+                if session._initialize_task is not None:
+                    await session._initialize_task
+                return result, text, recorder.methods, dict(session._response_streams)
+
+    async def main():
+        return await session_run("first"), await session_run("second")
+
+    (first, first_text, first_methods, _), (second, second_text, second_methods, leftover) = asyncio.run(main())
+    assert first_text == "first" and second_text == "second"
+    assert first_methods[:2] == second_methods[:2] == ["initialize", "notifications/initialized"]
+    # The second handshake returned the cached result; the background answer refreshed it.
+    assert second is first
+    assert server_key in NaviClientSession.server_capabilities_cache
+    assert leftover == {}
+
+
+def fake_server(respond):
+    """Run a NaviClientSession initialize against `respond(request)`, which plays the server."""
+
+    async def main():
+        async with create_client_server_memory_streams() as ((client_read, client_write), (server_read, server_write)):
+            async def serve():
+                message = await server_read.receive()
+                reply = respond(message.root)
+                if reply is not None:
+                    await server_write.send(types.JSONRPCMessage(reply))
+                await anyio.sleep_forever()
+
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(serve)
+                try:
+                    async with NaviClientSession(client_read, client_write,
+                                                 read_timeout_seconds=timedelta(seconds=0.1)) as session:
+                        with pytest.raises(McpError) as error:
+                            await session.initialize()
+                        return error.value, dict(session._response_streams)
+                finally:
+                    tg.cancel_scope.cancel()
+
+    return asyncio.run(main())
+
+
+def test_error_responses_raise_mcp_errors():
+    error, leftover = fake_server(lambda request: types.JSONRPCError(
+        jsonrpc="2.0", id=request.id, error=types.ErrorData(code=types.INVALID_PARAMS, message="bad env_config")))
+    assert error.error.code == types.INVALID_PARAMS and error.error.message == "bad env_config"
+    assert leftover == {}
+
+
+def test_unanswered_initialize_times_out():
+    error, leftover = fake_server(lambda request: None)
+    assert error.error.code == 408
+    assert leftover == {}
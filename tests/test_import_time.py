@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""Import-time budget for the server and tool packages.
+
+Each check runs in a fresh interpreter, so modules imported by other tests do not hide the cost.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Generous enough for slow CI machines, tight enough to catch an eager import of the server stack.
+IMPORT_BUDGET_SECONDS = 0.5
+CREATE_SERVER_BUDGET_SECONDS = 5.0
+HEAVY_MODULES = ["pptx", "langchain_google_community", "langchain_core", "tools.standard_tools"]
+
+
+def run_probe(code, tmp_path):
+    """Run `code` in a fresh interpreter with src on the path and return the JSON it prints."""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_import_has_no_side_effects(tmp_path):
+    """Importing mcp_server and tools builds no server, configures no logging and stays within budget."""
+    result = run_probe(
+        "import json, logging, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import mcp_server, tools\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(json.dumps({'elapsed': elapsed,\n"
+        "                  'root_handlers': len(logging.getLogger().handlers),\n"
+        "                  'loaded': [m for m in ('mcp_server.mcp_server_sse', 'mcp') if m in sys.modules]}))\n",
+        tmp_path,
+    )
+    assert result["loaded"] == []
+    assert result["root_handlers"] == 0
+    assert result["elapsed"] < IMPORT_BUDGET_SECONDS
+
+
+def test_create_server_defers_tool_imports(tmp_path):
+    """create_server advertises the package's tools without importing their modules."""
+    result = run_probe(
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "from mcp_server import create_server\n"
+        "server = create_server()\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(json.dumps({'elapsed': elapsed,\n"
+        "                  'tools': sorted(server._tool_manager._tools),\n"
+        f"                  'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n",
+        tmp_path,
+    )
+    assert result["loaded"] == []
+    assert "create_ppt" in result["tools"]
+    assert result["elapsed"] < CREATE_SERVER_BUDGET_SECONDS
@@ -0,0 +1,133 @@
+"""Lazy tools: off-loop resolution and stub options applied from registration."""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+from mcp.server.fastmcp.tools import Tool
+from mcp.shared.exceptions import McpError
+
+from mcp_server.admission import SERVER_OVERLOADED
+from mcp_server.lazy_tools import LazyTool
+from mcp_server.tool_stubs import ToolStub
+
+from tests.support import connect, make_server, text_of
+
+MODULE = '''
+import asyncio
+
+async def slow_tool(ms: int) -> str:
+    await asyncio.sleep(ms / 1000)
+    return "done"
+'''
+
+
+def test_resolution_runs_once_off_the_event_loop():
+    loads = []
+
+    def loader():
+        loads.append(threading.get_ident())
+        time.sleep(0.05)
+
+        def hello() -> str:
+            return "hello"
+        return Tool.from_function(hello)
+
+    tool = LazyTool.create("hello", "", {"type": "object", "properties": {}}, loader)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(tool.run({}) for _ in range(3)))
+        ticking.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+    assert results == ["hello"] * 3
+    assert len(loads) == 1 and loads[0] != threading.get_ident()
+    # The loop kept running while the loader slept.
+    assert ticks > 2
+
+
+@pytest.fixture
+def stub_module(tmp_path, monkeypatch):
+    module_name = f"lazy_stub_{os.getpid()}_{time.monotonic_ns()}"
+    (tmp_path / f"{module_name}.py").write_text(MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield module_name
+    sys.modules.pop(module_name, None)
+
+
+def test_stub_limits_and_cache_apply_before_the_first_import(tmp_path, stub_module):
+    server = make_server(tmp_path)
+    parameters = {"type": "object", "properties": {"ms": {"type": "integer"}}, "required": ["ms"]}
+    options = {"max_concurrency": 1, "max_queue": 0, "cache": {"ttl": 60}}
+    server.add_tool_stub(ToolStub("slow", stub_module, "slow_tool", "Wait.", parameters, options))
+    limiter, cache = server.tool_limiters["slow"], server.result_caches["slow"]
+    assert stub_module not in sys.modules
+
+    async def main():
+        async with connect(server) as client:
+            return await asyncio.gather(
+                client.call_tool("slow", {"ms": 50}),
+                client.call_tool("slow", {"ms": 60}),
+                return_exceptions=True,
+            )
+
+    first, second = asyncio.run(main())
+    assert text_of(first) == "done"
+    assert isinstance(second, McpError) and second.error.code == SERVER_OVERLOADED
+    # The import kept the stub's limiter and cache rather than starting new ones.
+    assert server.tool_limiters["slow"] is limiter and server.result_caches["slow"] is cache
+    assert cache.stats()["misses"] == 1
+
+
+DECORATED_MODULE = '''
+from {host} import server
+
+calls = []
+
+@server.tool(cache={{"ttl": 60}}, max_concurrency=2)
+def lookup_tool(key: str) -> str:
+    calls.append(key)
+    return key.upper()
+'''
+
+
+def test_decorator_registrations_keep_the_stub_cache_and_limiter(tmp_path, stub_module, monkeypatch):
+    server = make_server(tmp_path)
+    host = f"{stub_module}_host"
+    monkeypatch.setitem(sys.modules, host, types.SimpleNamespace(server=server))
+    (tmp_path / f"{stub_module}.py").write_text(DECORATED_MODULE.format(host=host))
+    parameters = {"type": "object", "properties": {"key": {"type": "string"}}, "required": ["key"]}
+    options = {"cache": {"ttl": 60}, "max_concurrency": 2}
+    server.add_tool_stub(ToolStub("lookup_tool", stub_module, "lookup_tool", "Look up.", parameters, options))
+    limiter, cache = server.tool_limiters["lookup_tool"], server.result_caches["lookup_tool"]
+
+    async def main():
+        async with connect(server) as client:
+            return [text_of(await client.call_tool("lookup_tool", {"key": "a"})) for _ in range(2)]
+
+    assert asyncio.run(main()) == ["A", "A"]
+    assert server.tool_limiters["lookup_tool"] is limiter and server.result_caches["lookup_tool"] is cache
+    assert sys.modules[stub_module].calls == ["a"]
+    assert (cache.stats()["misses"], cache.stats()["hits"]) == (1, 1)
+
+
+def test_stub_with_an_unknown_execution_policy_is_rejected_at_registration(tmp_path):
+    server = make_server(tmp_path)
+    stub = ToolStub("bad", "nowhere", "bad", "", {"type": "object"}, {"execution": "gpu"})
+    with pytest.raises(ValueError, match="Unknown execution policy"):
+        server.add_tool_stub(stub)
+    assert server._tool_manager.get_tool("bad") is None
@@ -0,0 +1,51 @@
+"""Versioned tools/list responses: notModified revalidation and per-process registry epochs."""
+
+import asyncio
+
+from mcp_client.tool_catalogue import ToolCatalogue
+
+from tests.support import connect, make_server
+
+
+def add_echo(server, name="echo"):
+    def echo(text: str) -> str:
+        return text
+    server.add_tool(echo, name=name)
+
+
+def test_unchanged_registry_answers_not_modified(tmp_path):
+    server = make_server(tmp_path)
+    add_echo(server)
+    catalogue = ToolCatalogue()
+
+    async def main():
+        async with connect(server) as client:
+            first = await catalogue.refresh(client)
+            again = await catalogue.refresh(client)
+            add_echo(server, "echo_two")
+            changed = await catalogue.refresh(client)
+            return first, again, changed
+
+    first, again, changed = asyncio.run(main())
+    assert again is first
+    assert catalogue.not_modified == 1
+    assert "echo_two" in [tool.name for tool in changed]
+    assert catalogue.version == server.registry_version
+
+
+def test_versions_of_another_process_never_match(tmp_path):
+    # Two servers with the same registration history stand in for a restart or another worker.
+    servers = [make_server(tmp_path / name) for name in ("one", "two")]
+    for server in servers:
+        add_echo(server)
+    assert servers[0].registry_version != servers[1].registry_version
+    catalogue = ToolCatalogue()
+
+    async def main():
+        for server in servers:
+            async with connect(server) as client:
+                await catalogue.refresh(client)
+
+    asyncio.run(main())
+    assert catalogue.listings == 2 and catalogue.not_modified == 0
+    assert catalogue.version == servers[1].registry_version
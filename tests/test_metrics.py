@@ -0,0 +1,44 @@
+"""Per-tool metrics and their Prometheus text rendering."""
+
+import asyncio
+
+import pytest
+
+from mcp_server.metrics import Histogram
+
+from tests.support import connect, make_server
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert [count for _, count in histogram.cumulative()] == [2, 3, 4]
+    assert histogram.count == 4 and histogram.sum == pytest.approx(2.65)
+
+
+def test_tool_calls_are_counted_and_rendered(tmp_path):
+    server = make_server(tmp_path)
+
+    @server.tool()
+    def ok() -> str:
+        return "ok"
+
+    @server.tool()
+    def broken() -> str:
+        raise ValueError("broken")
+
+    async def main():
+        async with connect(server) as session:
+            await session.call_tool("ok", {})
+            await session.call_tool("ok", {})
+            await session.call_tool("broken", {})
+            return server.render_metrics()
+
+    text = asyncio.run(main())
+    assert 'mcp_tool_calls_total{tool="ok"} 2' in text
+    assert 'mcp_tool_errors_total{tool="broken"} 1' in text
+    assert 'mcp_tool_latency_seconds_count{tool="ok"} 2' in text
+    assert 'mcp_tool_latency_seconds_bucket{tool="ok",le="+Inf"} 2' in text
+    assert "mcp_sessions 1" in text
+    assert "# TYPE mcp_tool_latency_seconds histogram" in text
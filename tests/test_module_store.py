@@ -0,0 +1,62 @@
+"""Content-addressed module store for persisted tool source."""
+
+import os
+
+import tools
+from mcp_server.module_store import ModuleStore
+
+SOURCE_A = "def a_tool():\n    return 'a'\n"
+SOURCE_B = "def b_tool():\n    return 'b'\n"
+
+
+def stored_modules(store):
+    return sorted(name for name in os.listdir(store.directory) if name.startswith("tool_"))
+
+
+def test_identical_source_is_stored_once(tmp_path):
+    store = ModuleStore(str(tmp_path))
+    digests = store.put_many({"first": SOURCE_A, "second": SOURCE_A})
+    assert digests["first"] == digests["second"]
+    assert len(stored_modules(store)) == 1
+    assert store.get_source("second") == SOURCE_A
+
+
+def test_unreferenced_modules_are_released(tmp_path):
+    store = ModuleStore(str(tmp_path))
+    store.put_many({"first": SOURCE_A, "second": SOURCE_A})
+    store.put("first", SOURCE_B)
+    assert len(stored_modules(store)) == 2  # SOURCE_A is still used by "second"
+    store.remove("second")
+    assert stored_modules(store) == [ModuleStore.module_file(store.manifest()["first"])]
+
+    with open(os.path.join(tmp_path, ModuleStore.module_file("0" * 64)), "w") as f:
+        f.write("orphan = True\n")
+    assert store.gc() == ["0" * 64]
+    assert ModuleStore(str(tmp_path)).get_source("first") == SOURCE_B
+
+
+def test_default_store_is_outside_the_tools_package(tmp_path, monkeypatch):
+    """The tool walkers must never pick up stored modules as tools."""
+    monkeypatch.chdir(tmp_path)
+    store = ModuleStore()
+    store.put("stored", SOURCE_A)
+    package_dirs = [os.path.abspath(path) for path in tools.__path__]
+    assert not any(os.path.abspath(store.directory).startswith(path) for path in package_dirs)
+    assert "a" not in {stub.name for stub in tools.scan_tool_stubs()}
+
+
+def test_stores_sharing_a_directory_keep_each_others_entries(tmp_path):
+    # Two worker processes each hold their own ModuleStore on the same directory.
+    first, second = ModuleStore(str(tmp_path)), ModuleStore(str(tmp_path))
+    first.manifest()
+    second.put("b", SOURCE_B)
+    first.put("a", SOURCE_A)
+    assert sorted(ModuleStore(str(tmp_path)).manifest()) == ["a", "b"]
+    assert first.get_source("b") == SOURCE_B
+
+    # Garbage collection in one must not delete the modules the other's names reference.
+    assert first.gc() == []
+    assert second.get_source("b") == SOURCE_B
+    second.remove("a")
+    assert first.manifest() == {"b": second.manifest()["b"]}
+    assert stored_modules(first) == [ModuleStore.module_file(first.manifest()["b"])]
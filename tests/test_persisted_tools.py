@@ -0,0 +1,52 @@
+"""Persisted dynamic tools are advertised from the index at startup and compiled on first call."""
+
+import asyncio
+
+import pytest
+
+from mcp_server.lazy_tools import LazyTool
+
+from tests.support import connect, make_server, text_of
+
+CODE = "def shout(text: str) -> str:\n    return text.upper() + '!'\n"
+
+
+def test_persisted_tools_load_lazily(tmp_path):
+    make_server(tmp_path).add_tool_dynamically("shout", "shout", "Shout the text.", persist=True, code=CODE)
+
+    restarted = make_server(tmp_path, load_persisted_tools=True)
+    tool = restarted._tool_manager.get_tool("shout")
+    assert isinstance(tool, LazyTool) and not tool.resolved
+    assert tool.parameters["properties"]["text"]["type"] == "string"
+
+    async def main():
+        async with connect(restarted) as session:
+            listed = [tool.name for tool in (await session.list_tools()).tools]
+            return listed, text_of(await session.call_tool("shout", {"text": "hi"}))
+
+    listed, result = asyncio.run(main())
+    assert "shout" in listed
+    assert result == "HI!"
+    assert not isinstance(restarted._tool_manager.get_tool("shout"), LazyTool)
+
+
+def test_failed_registry_writes_keep_the_previous_module(tmp_path, monkeypatch):
+    make_server(tmp_path).add_tool_dynamically("shout", "shout", "Shout the text.", persist=True, code=CODE)
+
+    updating = make_server(tmp_path)
+
+    def fail(entries, ephemeral=False):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(updating.registry_store, "put_many", fail)
+    with pytest.raises(OSError, match="disk full"):
+        updating.add_tool_dynamically("shout", "shout", "Shout the text.", persist=True,
+                                      code="def shout(text: str) -> str:\n    return text\n")
+
+    restarted = make_server(tmp_path, load_persisted_tools=True)
+
+    async def main():
+        async with connect(restarted) as session:
+            return text_of(await session.call_tool("shout", {"text": "hi"}))
+
+    assert asyncio.run(main()) == "HI!"
@@ -0,0 +1,99 @@
+"""Journaled and SQLite registry stores: replay, compaction, torn records and change detection."""
+
+import json
+import os
+
+import pytest
+
+from mcp_server.registry_store import JournalRegistryStore, SQLiteRegistryStore
+
+
+def entry(description, code=""):
+    return {"func_name": "f", "description": description, "config": {}, "code": code,
+            "parameters": {"type": "object", "properties": {}}}
+
+
+def test_journal_replays_puts_and_deletes(tmp_path):
+    path = str(tmp_path / "registry.json")
+    store = JournalRegistryStore(path, fsync=False)
+    store.put("a", entry("first"))
+    store.put_many({"b": entry("second"), "a": entry("replaced")})
+    store.delete("b")
+
+    reopened = JournalRegistryStore(path, fsync=False)
+    assert reopened.load() == {"a": entry("replaced")}
+    assert reopened.index()["a"]["description"] == "replaced"
+    assert not os.path.exists(path)  # nothing was compacted yet
+
+
+def test_journal_compacts_into_a_snapshot_and_index(tmp_path):
+    path = str(tmp_path / "registry.json")
+    store = JournalRegistryStore(path, compact_every=3, fsync=False)
+    for n in range(4):
+        store.put(f"tool{n}", entry(f"tool {n}", code="x" * 1000))
+
+    with open(path) as f:
+        assert sorted(json.load(f)) == ["tool0", "tool1", "tool2"]
+    with open(store.index_path) as f:
+        index = json.load(f)
+    assert "code" not in index["tool0"]
+    with open(store.journal_path) as f:
+        assert len(f.readlines()) == 1
+
+    # The index is read from the index file plus the journal tail, without the snapshot.
+    reopened = JournalRegistryStore(path, fsync=False)
+    assert sorted(reopened.index()) == ["tool0", "tool1", "tool2", "tool3"]
+    assert reopened._entries is None
+
+
+def test_journal_skips_a_torn_record(tmp_path):
+    path = str(tmp_path / "registry.json")
+    store = JournalRegistryStore(path, fsync=False)
+    store.put("a", entry("kept"))
+    with open(store.journal_path, "a") as f:
+        f.write('{"op": "put", "name": "b", "entr')
+
+    reopened = JournalRegistryStore(path, fsync=False)
+    assert list(reopened.load()) == ["a"]
+    reopened.put("c", entry("after the torn record"))
+    assert sorted(JournalRegistryStore(path, fsync=False).load()) == ["a", "c"]
+
+
+@pytest.mark.parametrize("backend", ["journal", "sqlite"])
+def test_backends_agree(tmp_path, backend):
+    if backend == "journal":
+        store = JournalRegistryStore(str(tmp_path / "registry.json"), fsync=False)
+    else:
+        store = SQLiteRegistryStore(str(tmp_path / "registry.db"))
+    store.put_many({"a": entry("a"), "b": entry("b")})
+    store.delete("a")
+    assert store.load() == {"b": entry("b")}
+    assert store.get("b") == entry("b")
+    assert store.index()["b"]["parameters"] == entry("b")["parameters"]
+    store.close()
+
+
+def test_sqlite_detects_changes_by_other_connections(tmp_path):
+    path = str(tmp_path / "registry.db")
+    first, second = SQLiteRegistryStore(path), SQLiteRegistryStore(path)
+    assert not first.changed()
+    second.put("a", entry("from the other worker"))
+    assert first.changed()
+    assert not first.changed()
+    assert first.get("a")["description"] == "from the other worker"
+    first.close()
+    second.close()
+
+
+def test_sqlite_ephemeral_entries_shadow_persisted_ones_until_cleared(tmp_path):
+    store = SQLiteRegistryStore(str(tmp_path / "registry.db"))
+    store.put_many({"a": entry("persisted"), "b": entry("persisted")})
+    store.put_many({"a": entry("ephemeral"), "c": entry("ephemeral")}, ephemeral=True)
+    assert store.get("a") == entry("ephemeral")
+    assert {name: item["description"] for name, item in store.index().items()} == \
+        {"a": "ephemeral", "b": "persisted", "c": "ephemeral"}
+    # Persisting a name again replaces its ephemeral entry.
+    store.put("c", entry("persisted"))
+    store.clear_ephemeral()
+    assert store.load() == {"a": entry("persisted"), "b": entry("persisted"), "c": entry("persisted")}
+    store.close()
@@ -0,0 +1,92 @@
+"""Opt-in result cache: TTL/LRU levels, the JSON disk level and session-aware keys."""
+
+import asyncio
+import os
+import pickle
+import time
+
+from mcp_server.env_overlay import freeze_env_config, get_env
+from mcp_server.result_cache import ResultCache, call_key
+
+from tests.support import connect, make_server, text_of
+
+
+def test_entries_expire_and_are_evicted():
+    cache = ResultCache(ttl=0.05, max_size=2)
+    for key in "abc":
+        cache.put(key, key.upper())
+    assert cache.missing(cache.get("a"))
+    assert cache.get("c") == "C"
+    time.sleep(0.1)
+    assert cache.missing(cache.get("c"))
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
+
+
+def test_keys_depend_on_arguments_and_env_but_not_their_order():
+    env_a, env_b = freeze_env_config({"KEY": "a", "OTHER": "x"}), freeze_env_config({"KEY": "b", "OTHER": "x"})
+    assert call_key("t", (), {"x": 1, "y": 2}, env_a) == call_key("t", (), {"y": 2, "x": 1}, env_a)
+    assert call_key("t", (), {"x": 1}, env_a) != call_key("t", (), {"x": 1}, env_b)
+    assert call_key("t", (), {"x": 1}, env_a) != call_key("u", (), {"x": 1}, env_a)
+
+
+def test_disk_level_holds_json_data_only(tmp_path):
+    cache = ResultCache(ttl=60, cache_dir=str(tmp_path))
+    cache.put("k" * 64, {"items": [1, "two"]})
+    cache.put("t" * 64, (1, 2))  # a tuple would read back as a list
+    cache.put("o" * 64, object())
+    files = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert files == ["k" * 64 + ".json"]
+
+    fresh = ResultCache(ttl=60, cache_dir=str(tmp_path))
+    assert fresh.get("k" * 64) == {"items": [1, "two"]}
+    assert fresh.stats()["disk_hits"] == 1
+    assert fresh.missing(fresh.get("t" * 64))
+
+
+def test_disk_level_never_unpickles(tmp_path):
+    """A pickle planted where an entry would be is ignored rather than loaded."""
+    key = "p" * 64
+    os.makedirs(tmp_path / key[:2])
+    for suffix in (".json", ".pkl"):
+        with open(tmp_path / key[:2] / f"{key}{suffix}", "wb") as f:
+            f.write(pickle.dumps((None, "planted")))
+    cache = ResultCache(cache_dir=str(tmp_path))
+    assert cache.missing(cache.get(key))
+
+
+def test_cached_tools_and_resources_are_keyed_per_session_env(tmp_path):
+    server = make_server(tmp_path)
+    calls = []
+
+    @server.tool(cache={"ttl": 60, "disk": True})
+    def lookup(query: str) -> str:
+        calls.append(query)
+        if query == "fail":
+            raise ValueError("not cached")
+        return f"{query} for {get_env('RESULT_CACHE_USER', 'nobody')}"
+
+    @server.resource("resource://cached/{name}", cache=60)
+    def cached_resource(name: str) -> str:
+        calls.append(f"resource {name}")
+        return f"resource {name}"
+
+    async def session_calls(user):
+        async with connect(server, env_config={"RESULT_CACHE_USER": user}) as session:
+            results = [text_of(await session.call_tool("lookup", {"query": "q"})) for _ in range(2)]
+            results += [(await session.call_tool("lookup", {"query": "fail"})).isError for _ in range(2)]
+            for _ in range(2):
+                contents = (await session.read_resource("resource://cached/x")).contents
+                results.append(contents[0].text)
+            return results
+
+    async def main():
+        return [await session_calls("alice"), await session_calls("bob")]
+
+    alice, bob = asyncio.run(main())
+    assert alice == ["q for alice", "q for alice", True, True, "resource x", "resource x"]
+    assert bob[:2] == ["q for bob", "q for bob"]
+    assert calls == ["q", "fail", "fail", "resource x", "q", "fail", "fail", "resource x"]
+    stats = server.result_cache_stats()
+    assert stats["lookup"]["hits"] == 2
+    assert stats["resource resource://cached/{name}"]["hits"] == 2
@@ -0,0 +1,148 @@
+"""Client session pool: reuse per key, session-param identity, context changes and cross-session isolation."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from mcp_client.session_pool import SessionPool, pool_key
+from mcp_server.env_overlay import get_env
+
+from tests.support import connect, make_server, text_of
+
+
+class FakeSession:
+    def __init__(self, context):
+        self.session_config = context
+        self.closed = False
+
+    async def send_ping(self):
+        pass
+
+    async def change_context(self, context):
+        self.session_config = context
+
+
+def fake_opener(opened):
+    @asynccontextmanager
+    async def opener(transport, connection_params, session_params, context):
+        session = FakeSession(context)
+        opened.append(session)
+        try:
+            yield session
+        finally:
+            session.closed = True
+    return opener
+
+
+def test_pool_key_tells_callbacks_apart():
+    async def first(params):
+        pass
+
+    async def second(params):
+        pass
+
+    class Handler:
+        async def on_log(self, params):
+            pass
+
+    handler = Handler()
+    assert pool_key("sse", {"url": "u"}, None, {"logging_callback": first}) == \
+        pool_key("sse", {"url": "u"}, None, {"logging_callback": first})
+    assert pool_key("sse", {"url": "u"}, None, {"logging_callback": first}) != \
+        pool_key("sse", {"url": "u"}, None, {"logging_callback": second})
+    # Bound methods are new objects on every access, but bind the same handler.
+    assert pool_key("sse", {"url": "u"}, None, {"logging_callback": handler.on_log}) == \
+        pool_key("sse", {"url": "u"}, None, {"logging_callback": handler.on_log})
+    assert pool_key("sse", {"url": "u"}, {"a": "1"}) != pool_key("sse", {"url": "u"}, {"a": "2"})
+
+
+def test_sessions_are_reused_only_for_the_same_session_params():
+    opened = []
+
+    async def log_a(params):
+        pass
+
+    async def log_b(params):
+        pass
+
+    async def main():
+        pool = SessionPool(fake_opener(opened), idle_timeout=None)
+        for callback in (log_a, log_a, log_b):
+            async with pool.session("sse", {"url": "u"}, {"logging_callback": callback}, {"k": "v"}):
+                pass
+        stats = pool.stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(main())
+    assert (stats["opened"], stats["reused"], stats["keys"]) == (2, 1, 2)
+    assert all(session.closed for session in opened)
+
+
+def test_sessions_with_a_changed_context_are_not_lent_again():
+    opened = []
+
+    async def main():
+        pool = SessionPool(fake_opener(opened), idle_timeout=None)
+        async with pool.session("sse", {"url": "u"}, None, {"tenant": "a"}) as session:
+            await session.change_context({"tenant": "b"})
+        async with pool.session("sse", {"url": "u"}, None, {"tenant": "a"}) as session:
+            context = session.session_config
+        await pool.close()
+        return context
+
+    assert asyncio.run(main()) == {"tenant": "a"}
+    assert len(opened) == 2 and opened[0].closed
+
+
+def test_borrowers_with_different_contexts_never_share_a_session(tmp_path):
+    server = make_server(tmp_path)
+
+    @server.tool()
+    async def whoami() -> str:
+        await asyncio.sleep(0.01)
+        return get_env("POOL_TEST_TENANT", "unset")
+
+    def opener(transport, connection_params, session_params, context):
+        return connect(server, env_config=context)
+
+    async def borrow(pool, tenant):
+        async with pool.session("memory", {}, None, {"POOL_TEST_TENANT": tenant}) as session:
+            return text_of(await session.call_tool("whoami", {}))
+
+    async def main():
+        pool = SessionPool(opener, max_size=2, idle_timeout=None)
+        tenants = ["a", "b"] * 4
+        seen = await asyncio.gather(*(borrow(pool, tenant) for tenant in tenants))
+        stats = pool.stats()
+        await pool.close()
+        return tenants, seen, stats
+
+    tenants, seen, stats = asyncio.run(main())
+    assert seen == tenants
+    assert stats["keys"] == 2 and stats["opened"] <= 4
+
+
+def test_failed_pre_opens_wake_waiting_borrowers():
+    opened, attempts = [], []
+    open_fake = fake_opener(opened)
+
+    @asynccontextmanager
+    async def opener(*open_args):
+        attempts.append(open_args)
+        if len(attempts) == 2:
+            # The pre-open of the second min_size session fails while a borrower waits for its slot.
+            await asyncio.sleep(0.05)
+            raise OSError("server unavailable")
+        async with open_fake(*open_args) as session:
+            yield session
+
+    async def main():
+        pool = SessionPool(opener, min_size=2, max_size=2, idle_timeout=None)
+        async with pool.session("sse", {"url": "u"}, None):
+            async with asyncio.timeout(1):
+                async with pool.session("sse", {"url": "u"}, None):
+                    pass
+        await pool.close()
+
+    asyncio.run(main())
+    assert (len(attempts), len(opened)) == (3, 2)
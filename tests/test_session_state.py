@@ -0,0 +1,42 @@
+"""SessionState: connection data built once from the ASGI scope and decoded lazily."""
+
+import pytest
+
+from mcp_server.session_state import SessionState
+
+
+def scope(headers, query_string=b""):
+    return {"type": "http", "headers": headers, "query_string": query_string}
+
+
+def test_session_id_comes_from_the_header_without_decoding_the_rest():
+    state = SessionState.from_scope(scope([(b"x-session-id", b"abc"), (b"x-custom-variable", b"v")], b"a=1&b="))
+    assert state.session_id == "abc"
+    assert state._headers is None and state._query_params is None
+    assert state.header("X-Custom-Variable") == "v"
+    assert state._headers is None
+    assert state.custom_variable == "v"
+    assert dict(state.query_params) == {"a": "1", "b": ""}
+    assert not state.server_issued and state.stored_config is None
+
+
+def test_views_are_read_only_and_built_once():
+    state = SessionState.from_scope(scope([(b"accept", b"*/*")]))
+    assert state.headers is state.headers
+    with pytest.raises(TypeError):
+        state.headers["accept"] = "text/html"  # type: ignore[index]
+
+
+def test_sessions_without_an_id_header_get_a_fresh_one():
+    first, second = SessionState.from_scope(scope([])), SessionState()
+    assert first.session_id != second.session_id
+    assert len(first.session_id) == 32
+    assert dict(first.headers) == {} and dict(first.query_params) == {}
+
+
+def test_issued_ids_carry_their_stored_config():
+    state = SessionState.from_scope(scope([(b"x-session-id", b"client-chosen")]))
+    state.attach_issued("issued-id", {"env_config": {"KEY": "value"}})
+    assert state.session_id == "issued-id"
+    assert state.server_issued
+    assert state.stored_config == {"env_config": {"KEY": "value"}}
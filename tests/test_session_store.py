@@ -0,0 +1,65 @@
+"""Bounded session config stores, and which sessions may see stored config."""
+
+import asyncio
+import time
+
+from mcp_server.env_overlay import get_env
+from mcp_server.session_store import BoundedSessionStore, SQLiteSessionStore
+
+from tests.support import connect, make_server, text_of
+
+
+def test_least_recently_used_sessions_are_evicted():
+    store = BoundedSessionStore(max_size=2, ttl=None)
+    store["a"], store["b"] = {"n": 1}, {"n": 2}
+    assert store["a"] == {"n": 1}  # "b" is now the least recently used
+    store["c"] = {"n": 3}
+    assert sorted(store) == ["a", "c"]
+    assert store.stats()["lru_evictions"] == 1
+
+
+def test_idle_sessions_expire():
+    store = BoundedSessionStore(max_size=10, ttl=0.05)
+    store["a"] = {}
+    time.sleep(0.1)
+    assert store.get("a") is None
+    stats = store.stats()
+    assert stats["size"] == 0 and stats["ttl_evictions"] == 1
+
+
+def test_discarded_sessions_are_counted():
+    store = BoundedSessionStore()
+    store["a"] = {}
+    assert store.discard_session("a")
+    assert not store.discard_session("a")
+    assert store.stats()["disconnect_removals"] == 1
+
+
+def test_sqlite_store_is_shared_and_bounded(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first, second = SQLiteSessionStore(path, max_size=2), SQLiteSessionStore(path, max_size=2)
+    first["a"] = {"env_config": {"KEY": "a"}}
+    assert second["a"] == {"env_config": {"KEY": "a"}}
+    second["b"], second["c"] = {}, {}
+    assert "a" not in first
+    assert second.discard_session("b")
+    assert list(first) == ["c"]
+    first.close()
+    second.close()
+
+
+def test_client_chosen_session_ids_never_select_stored_config(tmp_path):
+    """A client presenting another session's id as x-session-id must not get that session's config."""
+    server = make_server(tmp_path)
+    server.session_config_store["victim"] = {"env_config": {"SESSION_STORE_SECRET": "s3cret"}}
+
+    @server.tool()
+    def read_secret() -> str:
+        return get_env("SESSION_STORE_SECRET", "unset")
+
+    async def main():
+        async with connect(server, session_id="victim") as session:
+            return text_of(await session.call_tool("read_secret", {}))
+
+    assert asyncio.run(main()) == "unset"
+    assert "victim" in server.session_config_store
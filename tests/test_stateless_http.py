@@ -0,0 +1,160 @@
+"""Stateless streamable-HTTP transport: one POST per exchange, with server-issued session ids."""
+
+import asyncio
+import json
+
+import httpx
+from mcp.server.fastmcp import Context
+from mcp.types import INTERNAL_ERROR, INVALID_PARAMS, INVALID_REQUEST, METHOD_NOT_FOUND, PARSE_ERROR
+
+from mcp_server.env_overlay import get_env
+from mcp_server.stateless_http import SESSION_ID_HEADER, StatelessHTTPTransport
+
+from tests.support import make_server
+
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": 1, "method": "initialize",
+    "params": {"protocolVersion": "2025-03-26", "capabilities": {}, "clientInfo": {"name": "test", "version": "0"},
+               "env_config": {"STATELESS_TEST_KEY": "issued"}},
+}
+
+
+def call(request_id, name, arguments=None):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call", "params": {"name": name, "arguments": arguments or {}}}
+
+
+def serve(tmp_path):
+    server = make_server(tmp_path)
+
+    @server.tool()
+    def read_key() -> str:
+        return get_env("STATELESS_TEST_KEY", "unset")
+
+    transport = httpx.ASGITransport(app=server.streamable_http_app())
+    return server, httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def result_text(response):
+    return response.json()["result"]["content"][0]["text"]
+
+
+def test_calls_need_no_handshake(tmp_path):
+    async def main():
+        _, client = serve(tmp_path)
+        async with client:
+            single = await client.post("/mcp", json=call(1, "read_key"))
+            batch = await client.post("/mcp", json=[call("b", "read_key"), {"jsonrpc": "2.0", "id": "a", "method": "tools/list"}])
+            notification = await client.post("/mcp", json={"jsonrpc": "2.0", "method": "notifications/initialized"})
+            get = await client.get("/mcp")
+        return single, batch, notification, get
+
+    single, batch, notification, get = asyncio.run(main())
+    assert result_text(single) == "unset"
+    assert SESSION_ID_HEADER not in single.headers
+    assert [response["id"] for response in batch.json()] == ["b", "a"]
+    assert notification.status_code == 202
+    assert get.status_code == 405
+
+
+def test_session_config_follows_the_issued_id_only(tmp_path):
+    async def main():
+        server, client = serve(tmp_path)
+        async with client:
+            initialized = await client.post("/mcp", json=INITIALIZE)
+            session_id = initialized.headers[SESSION_ID_HEADER]
+            with_id = await client.post("/mcp", json=call(2, "read_key"), headers={SESSION_ID_HEADER: session_id})
+            # The legacy client-chosen header selects nothing.
+            spoofed = await client.post("/mcp", json=call(3, "read_key"), headers={"x-session-id": session_id})
+            unknown = await client.post("/mcp", json=call(4, "read_key"), headers={SESSION_ID_HEADER: "guessed"})
+            deleted = await client.delete("/mcp", headers={SESSION_ID_HEADER: session_id})
+            after_delete = await client.post("/mcp", json=call(5, "read_key"), headers={SESSION_ID_HEADER: session_id})
+        return server, session_id, with_id, spoofed, unknown, deleted, after_delete
+
+    server, session_id, with_id, spoofed, unknown, deleted, after_delete = asyncio.run(main())
+    assert len(session_id) >= 32
+    assert result_text(with_id) == "issued"
+    assert result_text(spoofed) == "unset"
+    assert unknown.status_code == 404
+    assert deleted.status_code == 204
+    assert after_delete.status_code == 404
+    assert session_id not in server.session_config_store
+
+
+def test_event_stream_responses_carry_notifications_first(tmp_path):
+    server = make_server(tmp_path)
+
+    @server.tool()
+    async def chatty(ctx: Context) -> str:
+        await ctx.info("working")
+        return "done"
+
+    async def main():
+        transport = httpx.ASGITransport(app=server.streamable_http_app(json_response=False))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/mcp", json=call(1, "chatty"))
+
+    response = asyncio.run(main())
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = [json.loads(line[len("data:"):]) for line in response.text.splitlines() if line.startswith("data:")]
+    assert [message.get("method") for message in messages] == ["notifications/message", None]
+    assert messages[0]["params"]["data"] == "working"
+    assert messages[1]["id"] == 1 and messages[1]["result"]["content"][0]["text"] == "done"
+
+
+def test_malformed_posts_get_json_rpc_errors(tmp_path):
+    async def main():
+        _, client = serve(tmp_path)
+        async with client:
+            garbage = await client.post("/mcp", content=b"{not json", headers={"content-type": "application/json"})
+            invalid = await client.post("/mcp", json={"jsonrpc": "2.0", "id": 1})
+        return garbage, invalid
+
+    garbage, invalid = asyncio.run(main())
+    assert garbage.status_code == 400 and garbage.json()["error"]["code"] == PARSE_ERROR
+    assert invalid.status_code == 400 and invalid.json()["error"]["code"] == INVALID_REQUEST
+
+
+def test_invalid_requests_get_json_rpc_errors_next_to_valid_ones(tmp_path):
+    async def main():
+        _, client = serve(tmp_path)
+        async with client:
+            bogus = await client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "bogus/method"})
+            batch = await client.post("/mcp", json=[
+                {"jsonrpc": "2.0", "id": "a", "method": "tools/call", "params": {"arguments": {}}},
+                call("b", "read_key"),
+            ])
+        return bogus, batch
+
+    bogus, batch = asyncio.run(main())
+    assert bogus.status_code == 200
+    assert bogus.json()["id"] == 1 and bogus.json()["error"]["code"] == METHOD_NOT_FOUND
+    missing_name, valid = batch.json()
+    assert missing_name["id"] == "a" and missing_name["error"]["code"] == INVALID_PARAMS
+    assert valid["id"] == "b" and valid["result"]["content"][0]["text"] == "unset"
+
+
+def test_requests_the_session_leaves_unanswered_get_errors(tmp_path, monkeypatch):
+    async def exchange(self, messages, request_ids, state, emit):
+        return set(request_ids)
+
+    monkeypatch.setattr(StatelessHTTPTransport, "exchange", exchange)
+
+    async def main():
+        _, client = serve(tmp_path)
+        async with client:
+            return await client.post("/mcp", json=call(7, "read_key"))
+
+    response = asyncio.run(main())
+    assert response.json()["id"] == 7 and response.json()["error"]["code"] == INTERNAL_ERROR
+
+
+def test_sse_app_serves_the_endpoint_too(tmp_path):
+    server = make_server(tmp_path)
+
+    async def main():
+        transport = httpx.ASGITransport(app=server.sse_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/list"})
+
+    response = asyncio.run(main())
+    assert response.status_code == 200 and response.json()["result"]["tools"] == []
@@ -0,0 +1,75 @@
+"""Generator tools: streamed chunks, progress tokens and the aggregate result."""
+
+import asyncio
+
+import mcp.types as types
+import pytest
+
+from mcp_server.streaming import ChunkAggregator
+
+from tests.support import connect, make_server, text_of
+
+
+def streaming_server(tmp_path, **options):
+    server = make_server(tmp_path)
+
+    @server.tool(**options)
+    def letters(count: int):
+        for i in range(count):
+            yield "abcdefghij"[i]
+
+    return server
+
+
+def call_collecting(server, request):
+    notifications = []
+
+    async def on_message(message):
+        if isinstance(message, types.ServerNotification):
+            notifications.append(message.root)
+
+    async def main():
+        async with connect(server, message_handler=on_message) as client:
+            result = await client.send_request(types.ClientRequest(request), types.CallToolResult)
+            # Notifications are handled in order, but give the last one time to reach the handler.
+            await asyncio.sleep(0.01)
+            return result
+
+    return asyncio.run(main()), notifications
+
+
+def call_request(name, arguments, progress_token=None):
+    meta = types.RequestParams.Meta(progressToken=progress_token) if progress_token is not None else None
+    return types.CallToolRequest(method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments, _meta=meta))
+
+
+def test_chunks_stream_as_log_messages_and_make_up_the_whole_result(tmp_path):
+    result, notifications = call_collecting(streaming_server(tmp_path), call_request("letters", {"count": 3}))
+    assert text_of(result) == "abc"
+    logged = [n.params.data for n in notifications if isinstance(n, types.LoggingMessageNotification)]
+    assert logged == [{"tool": "letters", "index": i, "chunk": "abc"[i]} for i in range(3)]
+
+
+def test_progress_tokens_get_progress_notifications(tmp_path):
+    server = streaming_server(tmp_path, aggregate="last")
+    result, notifications = call_collecting(server, call_request("letters", {"count": 2}, progress_token="job"))
+    assert text_of(result) == "b"
+    progress = [n.params for n in notifications if isinstance(n, types.ProgressNotification)]
+    assert [(p.progressToken, p.progress, p.model_extra["chunk"]) for p in progress] == [("job", 1, "a"), ("job", 2, "b")]
+
+
+def test_aggregate_modes():
+    def aggregate(mode, chunks):
+        aggregator = ChunkAggregator(mode)
+        for chunk in chunks:
+            aggregator.add(chunk)
+        return aggregator.result()
+
+    assert aggregate(None, ["a", "b"]) == "ab"
+    assert aggregate("last", ["a", "b"]) == "b"
+    assert aggregate("concat", [b"a", b"b"]) == b"ab"
+    assert aggregate("concat", ["a", 1]) == ["a", 1]
+    assert aggregate("list", ["a", "b"]) == ["a", "b"]
+    assert aggregate("none", ["a"]) is None
+    with pytest.raises(ValueError, match="Invalid aggregate"):
+        ChunkAggregator("sum")
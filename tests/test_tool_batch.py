@@ -0,0 +1,80 @@
+"""Pipelined tool call batches: bounded windows, ordering and per-call failures."""
+
+import asyncio
+
+import pytest
+
+from mcp_client.tool_batch import call_tools, call_tools_as_completed
+
+from tests.support import connect, make_server, text_of
+
+
+def batch_server(tmp_path):
+    server = make_server(tmp_path)
+    running = {"now": 0, "max": 0}
+
+    @server.tool()
+    async def nap(ms: int, tag: int = 0) -> str:
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        try:
+            await asyncio.sleep(ms / 1000)
+        finally:
+            running["now"] -= 1
+        return f"{tag}"
+
+    return server, running
+
+
+def test_outcomes_keep_call_order_within_the_window(tmp_path):
+    server, running = batch_server(tmp_path)
+    calls = [("nap", {"ms": 20 - i, "tag": i}) for i in range(12)]
+
+    async def main():
+        async with connect(server) as client:
+            return await call_tools(client, calls, window=4)
+
+    outcomes = asyncio.run(main())
+    assert [text_of(outcome.result) for outcome in outcomes] == [str(i) for i in range(12)]
+    assert all(outcome.ok and outcome.elapsed > 0 for outcome in outcomes)
+    assert running["max"] == 4
+
+
+def test_failures_stay_with_their_call(tmp_path):
+    server, _ = batch_server(tmp_path)
+    calls = [
+        ("nap", {"ms": 1, "tag": 1}),
+        {"name": "missing", "arguments": {}},
+        ("nap", {"ms": 500, "tag": 3}),
+        ("nap", {"ms": "not a number"}),
+    ]
+
+    async def main():
+        async with connect(server) as client:
+            return await call_tools(client, calls, timeout=0.2)
+
+    ok, missing, slow, invalid = asyncio.run(main())
+    assert ok.ok and text_of(ok.result) == "1"
+    assert missing.error is None and missing.result.isError
+    assert isinstance(slow.error, asyncio.TimeoutError) and not slow.ok
+    assert invalid.result.isError
+
+
+def test_as_completed_yields_in_completion_order(tmp_path):
+    server, _ = batch_server(tmp_path)
+    calls = [("nap", {"ms": ms, "tag": ms}) for ms in (60, 10, 30)]
+
+    async def main():
+        async with connect(server) as client:
+            return [outcome.index async for outcome in call_tools_as_completed(client, calls)]
+
+    assert asyncio.run(main()) == [1, 2, 0]
+
+
+def test_window_must_be_positive():
+    async def main():
+        async for _ in call_tools_as_completed(None, [], window=0):
+            pass
+
+    with pytest.raises(ValueError, match="at least 1"):
+        asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Client tool catalogue: served from memory until tools/list_changed, revalidated with notModified."""
+
+import asyncio
+
+from mcp_client.detailed_client_sse import NaviClientSession
+from mcp_client.tool_catalogue import ToolCatalogue
+
+from tests.support import connect, make_server, serve_streams
+
+
+def add_tool(server, name):
+    def tool(text: str) -> str:
+        return text
+    server.add_tool(tool, name=name, description=f"The {name} tool.")
+
+
+def test_lookups_are_served_from_memory_until_the_list_changes(tmp_path):
+    server = make_server(tmp_path)
+    add_tool(server, "first")
+    catalogue = ToolCatalogue()
+
+    async def wait_until_stale():
+        for _ in range(100):
+            if catalogue.stale:
+                return
+            await asyncio.sleep(0.01)
+
+    async def main():
+        async with connect(server, message_handler=catalogue.handle_message) as client:
+            schemas = await catalogue.anthropic_tools(client)
+            again = await catalogue.anthropic_tools(client)
+            listings_before = catalogue.listings
+            add_tool(server, "second")
+            await server.notify_tools_list_changed()
+            await wait_until_stale()
+            changed = await catalogue.anthropic_tools(client)
+            return schemas, again, listings_before, changed
+
+    schemas, again, listings_before, changed = asyncio.run(main())
+    assert again is schemas and listings_before == 1
+    assert schemas == [{"name": "first", "description": "The first tool.", "input_schema": schemas[0]["input_schema"]}]
+    assert [schema["name"] for schema in changed] == ["first", "second"]
+    assert catalogue.stats()["listings"] == 2
+
+
+def test_invalidated_but_unchanged_catalogues_are_revalidated_cheaply(tmp_path):
+    server = make_server(tmp_path)
+    add_tool(server, "first")
+    catalogue = ToolCatalogue()
+
+    async def main():
+        async with connect(server) as client:
+            tools = await catalogue.list_tools(client)
+            catalogue.invalidate()
+            return tools, await catalogue.list_tools(client)
+
+    tools, revalidated = asyncio.run(main())
+    assert revalidated is tools
+    assert (catalogue.listings, catalogue.not_modified, catalogue.stale) == (2, 1, False)
+
+
+def test_navi_sessions_invalidate_their_catalogue(tmp_path):
+    server = make_server(tmp_path)
+    add_tool(server, "first")
+
+    async def main():
+        async with serve_streams(server) as streams:
+            async with NaviClientSession(*streams) as session:
+                await session.initialize()
+                before = [tool.name for tool in await session.tools()]
+                add_tool(server, "second")
+                await server.notify_tools_list_changed()
+                for _ in range(100):
+                    if session.tool_catalogue.stale:
+                        break
+                    await asyncio.sleep(0.01)
+                return before, [tool.name for tool in await session.tools()]
+
+    before, after = asyncio.run(main())
+    assert before == ["first"] and after == ["first", "second"]
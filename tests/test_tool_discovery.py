@@ -0,0 +1,98 @@
+"""Tool discovery in the tools package: the discovery manifest and AST-derived stubs."""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+import tools
+
+from tests.support import connect, make_server, text_of
+
+MODULE = '''
+def greet_tool(name: str, excited: bool = False) -> str:
+    """Greet someone."""
+    return f"Hello {name}" + ("!" if excited else "")
+
+def helper(x):
+    return x
+'''
+
+
+@pytest.fixture
+def tool_package(tmp_path, monkeypatch):
+    """Point the tools package at a scratch directory holding one tool module."""
+    package_dir = tmp_path / "package"
+    package_dir.mkdir()
+    module_name = f"discovery_{os.getpid()}_{time.monotonic_ns()}"
+    (package_dir / f"{module_name}.py").write_text(MODULE)
+    monkeypatch.setattr(tools, "__path__", [str(package_dir)])
+    # The manifest goes to its default location, the working directory.
+    monkeypatch.chdir(tmp_path)
+    yield package_dir, module_name
+    sys.modules.pop(f"tools.{module_name}", None)
+
+
+def test_manifest_skips_the_walk_until_the_package_changes(tmp_path, tool_package, monkeypatch):
+    package_dir, module_name = tool_package
+    tools.load_tools(make_server(tmp_path / "first"))
+    assert os.path.exists(tools.MANIFEST_PATH)
+
+    def walk(*args, **kwargs):
+        raise AssertionError("the package should not be walked again")
+
+    monkeypatch.setattr(tools, "_discover", walk)
+    server = make_server(tmp_path / "second")
+    tools.load_tools(server)
+    assert server._tool_manager.get_tool("greet") is not None
+    assert server._tool_manager.get_tool("helper") is None
+
+    # A new module changes the directory's mtime and invalidates the manifest.
+    time.sleep(0.01)
+    (package_dir / "added.py").write_text("def other_tool():\n    return 1\n")
+    with pytest.raises(AssertionError, match="walked again"):
+        tools.load_tools(make_server(tmp_path / "third"))
+
+
+def test_the_default_manifest_lives_outside_the_tools_package():
+    manifest = os.path.abspath(tools.MANIFEST_PATH)
+    for path in tools.__path__:
+        assert os.path.commonpath([manifest, os.path.abspath(path)]) != os.path.abspath(path)
+
+
+def test_resolved_stubs_refresh_the_registered_functions(tmp_path, tool_package):
+    _, module_name = tool_package
+    server = make_server(tmp_path)
+    tools.register_tool_stubs(server)
+    registered = tools._Registered(server)
+    registered.refresh()
+
+    async def main():
+        async with connect(server) as session:
+            await session.call_tool("greet", {"name": "Ada"})
+
+    # Resolving the stub replaces the LazyTool with the real tool; the tool count stays the same.
+    asyncio.run(main())
+    registered.refresh()
+    assert sys.modules[f"tools.{module_name}"].greet_tool in registered.functions
+
+
+def test_stubs_advertise_tools_and_import_on_first_call(tmp_path, tool_package):
+    _, module_name = tool_package
+    (stub,) = tools.scan_tool_stubs()
+    assert (stub.name, stub.module) == ("greet", f"tools.{module_name}")
+    assert stub.parameters["properties"]["excited"] == {"title": "Excited", "type": "boolean", "default": False}
+    assert stub.parameters["required"] == ["name"]
+    assert f"tools.{module_name}" not in sys.modules
+
+    server = make_server(tmp_path)
+    tools.register_tool_stubs(server)
+
+    async def main():
+        async with connect(server) as session:
+            return text_of(await session.call_tool("greet", {"name": "Ada", "excited": True}))
+
+    assert asyncio.run(main()) == "Hello Ada!"
+    assert f"tools.{module_name}" in sys.modules
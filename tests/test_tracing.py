@@ -0,0 +1,77 @@
+"""Span tracing: nesting, traceparent continuation, sampling and the JSONL exporter."""
+
+import asyncio
+import json
+
+from mcp_server.tracing import JsonlSpanExporter, SpanExporter, Tracer, parse_traceparent
+
+from tests.support import connect, make_server
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+TRACEPARENT = f"00-{TRACE_ID}-b7ad6b7169203331-01"
+
+
+class ListExporter(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def test_spans_nest_and_continue_the_remote_trace():
+    exporter = ListExporter()
+    tracer = Tracer(exporter)
+    with tracer.span("outer", traceparent=TRACEPARENT):
+        with tracer.span("inner", {"k": "v"}):
+            pass
+    inner, outer = exporter.spans
+    assert outer.trace_id == inner.trace_id == TRACE_ID
+    assert outer.parent_id == "b7ad6b7169203331"
+    assert inner.parent_id == outer.span_id
+    assert inner.attributes == {"k": "v"}
+
+
+def test_unsampled_traces_export_nothing():
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_rate=0.0)
+    with tracer.span("outer") as span:
+        assert span is None
+    unsampled_parent = TRACEPARENT[:-2] + "00"
+    with Tracer(exporter).span("remote", traceparent=unsampled_parent) as span:
+        assert span is None
+    assert exporter.spans == []
+    assert parse_traceparent("garbage") is None
+
+
+def test_errors_mark_the_span():
+    exporter = ListExporter()
+    try:
+        with Tracer(exporter).span("failing"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert exporter.spans[0].status == "error"
+    assert exporter.spans[0].attributes["error"] == "ValueError: boom"
+
+
+def test_tool_calls_are_traced_to_jsonl(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    server = make_server(tmp_path, tracing={"exporter": JsonlSpanExporter(str(path), flush_interval=0.01)})
+
+    @server.tool()
+    def traced() -> str:
+        return "ok"
+
+    async def main():
+        async with connect(server) as session:
+            await session.call_tool("traced", {})
+
+    asyncio.run(main())
+    server.tracer.close()
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    by_name = {span["name"]: span for span in spans}
+    assert {"mcp.request", "mcp.tool.run", "mcp.tool.body", "mcp.serialize"} <= set(by_name)
+    assert by_name["mcp.request"]["attributes"]["method"] == "tools/call"
+    assert by_name["mcp.request"]["parent_id"] is None
+    assert len({span["trace_id"] for span in spans}) == 1
@@ -0,0 +1,188 @@
+"""Multi-worker serving: session-affine routing, factory settings and cross-worker tool registration."""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import zlib
+
+import httpx
+import mcp.types as types
+import pytest
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from mcp_server.workers import SESSION_HEADER, SessionRouter
+
+from tests.support import connect, make_server, text_of
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_ENV = "WORKERS_TEST_STATE"
+PORT_ENV = "WORKERS_TEST_PORT"
+DOUBLE_TOOL = {
+    "name": "double",
+    "description": "Double a number.",
+    "code": "def double(x: int) -> int:\n    return 2 * x\n",
+}
+
+
+def build_server():
+    """Worker factory: the default server on the port and state directory the test chose."""
+    from mcp_server.mcp_server_sse import create_server
+
+    state = os.environ[STATE_ENV]
+    os.makedirs(os.path.join(state, "pids"), exist_ok=True)
+    open(os.path.join(state, "pids", f"{os.getpid()}.pid"), "w").close()
+    return create_server({
+        "host": "127.0.0.1",
+        "port": int(os.environ[PORT_ENV]),
+        "log_level": "WARNING",
+        "persist_tools_dir": os.path.join(state, "modules"),
+        "tool_code_cache_dir": None,
+        "tool_result_cache_dir": os.path.join(state, "results"),
+    }, tools=None)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def session_for_worker(worker: int, workers: int) -> str:
+    return next(f"session-{i}" for i in range(1000) if zlib.crc32(f"session-{i}".encode()) % workers == worker)
+
+
+def test_router_keeps_sessions_on_their_worker():
+    router = SessionRouter(["/tmp/a.sock", "/tmp/b.sock"])
+    router.routes["abc"] = 1
+    assert router.pick_worker("/messages/", {"session_id": "abc"}, {}) == 1
+    assert router.pick_worker("/messages/", {"session_id": "unknown"}, {}) is None
+    session = session_for_worker(0, 2)
+    assert router.pick_worker("/sse", {}, {SESSION_HEADER: session}) == 0
+    router.open_streams[:] = [3, 1]
+    assert router.pick_worker("/sse", {}, {}) == 1
+
+
+def test_poller_announces_tools_registered_by_another_worker(tmp_path):
+    state = str(tmp_path / "shared")
+    options = {"registry_store": None, "shared_state": state, "persist_tools_dir": os.path.join(state, "modules")}
+    registering, other = make_server(tmp_path / "one", **options), make_server(tmp_path / "two", **options)
+    changes = []
+
+    async def on_message(message):
+        if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+            changes.append(message)
+
+    async def main():
+        poller = asyncio.create_task(other.poll_shared_registry(interval=0.02))
+        try:
+            async with connect(other, message_handler=on_message) as client:
+                registering.add_tool_dynamically("double", "", "Double a number.", {}, False, DOUBLE_TOOL["code"])
+                for _ in range(100):
+                    if changes:
+                        break
+                    await asyncio.sleep(0.02)
+                return await client.call_tool("double", {"x": 21})
+        finally:
+            poller.cancel()
+
+    result = asyncio.run(main())
+    assert len(changes) == 1
+    assert text_of(result) == "42"
+
+
+def test_tools_that_are_not_persisted_are_shared_only_until_the_next_start(tmp_path):
+    state = str(tmp_path / "shared")
+    options = {"registry_store": None, "shared_state": state, "persist_tools_dir": os.path.join(state, "modules"),
+               "load_persisted_tools": True}
+    registering = make_server(tmp_path / "one", **options)
+    registering.add_tool_dynamically("double", "", "Double a number.", {}, False, DOUBLE_TOOL["code"])
+    registering.add_tool_dynamically("triple", "", "Triple a number.", {}, True,
+                                     "def triple(x: int) -> int:\n    return 3 * x\n")
+    running = make_server(tmp_path / "two", **options)
+    assert running._tool_manager.get_tool("double") is not None
+    assert running._tool_manager.get_tool("triple") is not None
+    assert registering.module_store.manifest().keys() == {"triple"}
+
+    # What serve_workers does before it starts the workers again.
+    registering.registry_store.clear_ephemeral()
+    restarted = make_server(tmp_path / "three", **options)
+    assert restarted._tool_manager.get_tool("double") is None
+    assert restarted._tool_manager.get_tool("triple") is not None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="workers serve on Unix sockets")
+def test_workers_serve_on_the_factory_port_and_share_tools(tmp_path):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(ROOT_DIR, "src"), ROOT_DIR]),
+               **{STATE_ENV: str(tmp_path), PORT_ENV: str(port)})
+    code = ("import sys\nfrom mcp_server.workers import serve_workers\n"
+            "serve_workers('tests.test_workers:build_server', workers=2, shared_state=sys.argv[1])\n")
+    process = subprocess.Popen([sys.executable, "-c", code, str(tmp_path / "shared")], cwd=str(tmp_path), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            assert process.poll() is None, "serve_workers exited during startup"
+            try:
+                httpx.get(f"{base_url}/health", timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                assert time.monotonic() < deadline, "workers did not start"
+                time.sleep(0.1)
+
+        async def main():
+            changes = []
+
+            async def on_message(message):
+                if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+                    changes.append(message)
+
+            headers = {SESSION_HEADER: session_for_worker(1, 2)}
+            async with sse_client(f"{base_url}/sse", headers=headers) as (read, write):
+                async with ClientSession(read, write, message_handler=on_message) as client:
+                    await client.initialize()
+                    # Registered on worker 0; worker 1 learns about it from the shared registry.
+                    async with httpx.AsyncClient() as http:
+                        response = await http.post(f"{base_url}/dynamic/add_tool", json=DOUBLE_TOOL,
+                                                   headers={SESSION_HEADER: session_for_worker(0, 2)})
+                        assert response.json()["status"] == "success"
+                    for _ in range(100):
+                        if changes:
+                            break
+                        await asyncio.sleep(0.05)
+                    tools = await client.list_tools()
+                    result = await client.call_tool("double", {"x": 4})
+            return changes, [tool.name for tool in tools.tools], result
+
+        changes, names, result = asyncio.run(main())
+        assert changes, "worker 1 did not announce the tool registered on worker 0"
+        assert "double" in names
+        assert text_of(result) == "8"
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    # The workers stop with the router.
+    pids = [int(name.split(".")[0]) for name in os.listdir(tmp_path / "pids")]
+    assert len(pids) == 2
+    for pid in pids:
+        deadline = time.monotonic() + 10
+        while alive(pid):
+            assert time.monotonic() < deadline, f"worker {pid} outlived the router"
+            time.sleep(0.1)